@@ -6,27 +6,44 @@ import aiofiles
 import configparser
 import asyncio
 import time
-import zipfile
-import io
 import shutil
 import json
-from typing import List
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
+from typing import List, Optional
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.responses import FileResponse, StreamingResponse, HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import uuid
 
-from sources.llm_provider import Provider
+from sources.provider_registry import ProviderRegistry
+from sources.http_clients import client_pool
+from sources.response_cache import configure_response_cache, get_response_cache
+from sources.hedging import hedge_policy, parse_alternates
+from sources.rate_limiter import rate_limiter, request_session
+from sources.usage import usage_tracker
+from sources.model_registry import model_registry
+from sources.summarizer import summarizer
+from sources.async_provider import AsyncProvider
 from sources.interaction import Interaction
+from sources.router import AgentRouter
 from sources.agents import CasualAgent, CoderAgent, FileAgent, PlannerAgent, BrowserAgent
 from sources.browser import Browser, create_driver
 from sources.utility import pretty_print
 from sources.logger import Logger
 from sources.schemas import QueryRequest, QueryResponse
 from sources.workspace_manager import WorkspaceManager
+from sources.file_index import get_file_index
+from sources.zip_stream import ZipStreamWriter, ZipEntryCache
+from sources.file_reader import (file_etag, etag_matches, parse_range, iter_bytes, read_text_page, line_index,
+                                 MAX_PAGE_BYTES, MAX_PAGE_LINES)
 from sources.realtime import ws_manager
+from sources.subscriptions import Subscription, parse_topics
+from sources.ws_encoding import negotiate as negotiate_encoding, decode as decode_frame
+from sources.session_manager import SessionManager, DEFAULT_SESSION_ID
+from sources.job_queue import JobQueue
+from sources.startup import profiler, LazyComponent
+from sources.metrics import registry as metrics_registry
 from pydantic import BaseModel
 
 class ModelConfigUpdate(BaseModel):
@@ -72,40 +89,51 @@ if not os.path.exists(work_dir_path):
     print(f"[Agent Dzeck AI] Created work directory: {work_dir_path}")
 print(f"[Agent Dzeck AI] Work directory: {work_dir_path}")
 
+file_index = get_file_index(work_dir_path)
 workspace_mgr = WorkspaceManager(base_dir=work_dir_path)
+preview_state = {"version": 0}
+zip_cache = ZipEntryCache(max_bytes=config.getint('MAIN', 'zip_cache_mb', fallback=256) * 1024 * 1024)
+ws_manager.max_queue = config.getint('MAIN', 'ws_queue_size', fallback=256)
+ws_manager.max_lag = config.getfloat('MAIN', 'ws_max_lag', fallback=10.0)
+ws_manager.send_timeout = config.getfloat('MAIN', 'ws_send_timeout', fallback=5.0)
+ws_manager.event_log.max_per_session = config.getint('MAIN', 'ws_replay_size', fallback=500)
+client_pool.configure(
+    max_connections=config.getint('MAIN', 'http_max_connections', fallback=20),
+    max_keepalive=config.getint('MAIN', 'http_max_keepalive', fallback=10),
+    keepalive_expiry=config.getfloat('MAIN', 'http_keepalive_expiry', fallback=60.0),
+    connect_timeout=config.getfloat('MAIN', 'http_connect_timeout', fallback=10.0),
+    read_timeout=config.getfloat('MAIN', 'http_read_timeout', fallback=120.0),
+    http2=config.getboolean('MAIN', 'http2', fallback=True),
+)
+configure_response_cache(
+    config.getboolean('MAIN', 'llm_cache', fallback=False),
+    path=os.path.join("memory_store", "llm_cache.sqlite3"),
+    ttl=config.getfloat('MAIN', 'llm_cache_ttl', fallback=86400.0),
+    max_bytes=config.getint('MAIN', 'llm_cache_mb', fallback=64) * 1024 * 1024,
+)
+hedge_policy.configure(
+    enabled=config.getboolean('MAIN', 'hedge_requests', fallback=True),
+    quantile=config.getfloat('MAIN', 'hedge_quantile', fallback=0.9),
+    budget_ratio=config.getfloat('MAIN', 'hedge_budget', fallback=0.1),
+    alternates=parse_alternates(config.get('MAIN', 'hedge_alternates', fallback="")),
+)
+usage_tracker.configure(
+    os.path.join("memory_store", "llm_usage.sqlite3") if config.getboolean('MAIN', 'llm_usage_log', fallback=True) else None)
+rate_limiter.configure(
+    enabled=config.getboolean('MAIN', 'rate_limit', fallback=True),
+    rpm={name: config.getfloat('MAIN', f'{name}_rpm') for name in ("groq", "huggingface")
+         if config.has_option('MAIN', f'{name}_rpm')},
+)
+model_registry.load_overrides(config['MODELS'] if config.has_section('MODELS') else None)
+model_registry.preload(wait=False)
 
 api.mount("/workspace", StaticFiles(directory=work_dir_path, html=True), name="workspace")
 
-def initialize_system():
-    stealth_mode = config.getboolean('BROWSER', 'stealth_mode')
-    personality_folder = "jarvis" if config.getboolean('MAIN', 'jarvis_personality') else "base"
-    languages = config["MAIN"]["languages"].split(' ')
-    
-    headless = config.getboolean('BROWSER', 'headless_browser')
-    if is_running_in_docker() and not headless:
-        print("\n" + "*" * 70)
-        print("*** WARNING: Detected Docker environment - forcing headless_browser=True ***")
-        print("*** INFO: To see the browser, run 'python cli.py' on your host machine ***")
-        print("*" * 70 + "\n")
-        sys.stdout.flush()
-        logger.warning("Detected Docker environment - forcing headless_browser=True")
-        headless = True
-    
-    provider = Provider(
-        provider_name=config["MAIN"]["provider_name"],
-        model=config["MAIN"]["provider_model"],
-        server_address=config["MAIN"]["provider_server_address"],
-        is_local=config.getboolean('MAIN', 'is_local')
-    )
-    logger.info(f"Provider initialized: {provider.provider_name} ({provider.model})")
-
-    browser = Browser(
-        create_driver(headless=headless, stealth_mode=stealth_mode, lang=languages[0]),
-        anticaptcha_manual_install=stealth_mode
-    )
-    logger.info("Browser initialized")
+shared_components = {}
+provider_registry = ProviderRegistry()
 
-    agents = [
+def build_agents(provider, browser, personality_folder: str, session_id: str = DEFAULT_SESSION_ID) -> list:
+    return [
         CasualAgent(
             name=config["MAIN"]["agent_name"],
             prompt_path=f"prompts/{personality_folder}/casual_agent.txt",
@@ -129,42 +157,197 @@ def initialize_system():
         PlannerAgent(
             name="Planner",
             prompt_path=f"prompts/{personality_folder}/planner_agent.txt",
-            provider=provider, verbose=False, browser=browser, ws_manager=ws_manager
+            provider=provider, verbose=False, browser=browser, ws_manager=ws_manager,
+            session_id=session_id
         )
     ]
-    logger.info("Agents initialized")
 
-    interaction = Interaction(
-        agents,
-        tts_enabled=config.getboolean('MAIN', 'speak'),
-        stt_enabled=config.getboolean('MAIN', 'listen'),
-        recover_last_session=config.getboolean('MAIN', 'recover_last_session'),
-        langs=languages
+def initialize_system():
+    stealth_mode = config.getboolean('BROWSER', 'stealth_mode')
+    personality_folder = "jarvis" if config.getboolean('MAIN', 'jarvis_personality') else "base"
+    languages = config["MAIN"]["languages"].split(' ')
+    
+    headless = config.getboolean('BROWSER', 'headless_browser')
+    if is_running_in_docker() and not headless:
+        print("\n" + "*" * 70)
+        print("*** WARNING: Detected Docker environment - forcing headless_browser=True ***")
+        print("*** INFO: To see the browser, run 'python cli.py' on your host machine ***")
+        print("*" * 70 + "\n")
+        sys.stdout.flush()
+        logger.warning("Detected Docker environment - forcing headless_browser=True")
+        headless = True
+    
+    with profiler.track("provider"):
+        provider = provider_registry.activate(
+            config["MAIN"]["provider_name"],
+            config["MAIN"]["provider_model"],
+            config["MAIN"]["provider_server_address"],
+            is_local=config.getboolean('MAIN', 'is_local')
+        )
+    logger.info(f"Provider initialized: {provider.provider_name} ({provider.model})")
+
+    # Chrome only starts when an agent first touches the browser.
+    browser = LazyComponent(
+        "browser",
+        lambda: Browser(
+            create_driver(headless=headless, stealth_mode=stealth_mode, lang=languages[0]),
+            anticaptcha_manual_install=stealth_mode
+        ),
+        profiler
     )
+
+    # Router models and agents do not depend on each other.
+    components = profiler.run_parallel({
+        "router": lambda: AgentRouter([], supported_language=languages),
+        "agents": lambda: build_agents(provider, browser, personality_folder),
+    })
+    agents = components["agents"]
+    logger.info("Agents initialized")
+
+    with profiler.track("interaction"):
+        interaction = Interaction(
+            agents,
+            tts_enabled=config.getboolean('MAIN', 'speak'),
+            stt_enabled=config.getboolean('MAIN', 'listen'),
+            recover_last_session=config.getboolean('MAIN', 'recover_last_session'),
+            langs=languages,
+            router=components["router"]
+        )
     logger.info("Interaction initialized")
+    shared_components.update({
+        "provider": provider,
+        "async_provider": AsyncProvider(provider) if config.getboolean('MAIN', 'async_llm', fallback=True) else None,
+        "browser": browser,
+        "router": interaction.router,
+        "languages": languages,
+        "personality_folder": personality_folder,
+    })
     return interaction
 
+def create_session_interaction(session_id: str) -> Interaction:
+    """
+    Build the agents and memories of a new client session.
+    Provider, browser and router classifiers are shared with the default session.
+    """
+    if not shared_components:
+        raise RuntimeError("System not initialized")
+    agents = build_agents(shared_components["provider"],
+                          shared_components["browser"],
+                          shared_components["personality_folder"],
+                          session_id)
+    logger.info(f"Agents initialized for session {session_id}")
+    return Interaction(
+        agents,
+        tts_enabled=False,
+        stt_enabled=False,
+        recover_last_session=False,
+        langs=shared_components["languages"],
+        router=shared_components["router"]
+    )
+
 try:
     interaction = initialize_system()
 except Exception as e:
     logger.error(f"Failed to initialize system: {str(e)}")
     print(f"[Agent Dzeck AI] FATAL: Failed to initialize system: {str(e)}")
     interaction = None
-is_generating = False
-query_resp_history = []
+
+event_loop = {"loop": None}
+
+@api.on_event("startup")
+async def remember_event_loop():
+    event_loop["loop"] = asyncio.get_running_loop()
+
+def schedule_coroutine(coro) -> None:
+    """Run a coroutine on the server event loop, from the loop thread or from a worker thread."""
+    try:
+        asyncio.get_running_loop().create_task(coro)
+    except RuntimeError:
+        loop = event_loop["loop"]
+        if loop is None or loop.is_closed():
+            coro.close()
+            return
+        asyncio.run_coroutine_threadsafe(coro, loop)
+
+def attach_session_hooks(session) -> None:
+    """
+    Forward streamed LLM tokens of a session to the WebSocket and to SSE listeners,
+    and track agent status changes in the session's versioned answer state.
+    """
+    def on_token(agent, delta: str) -> None:
+        session.partial_answer = agent.streamed_answer
+        asyncio.create_task(ws_manager.send_token(agent.agent_name, delta, session.session_id))
+        for queue in session.token_queues:
+            queue.put_nowait(("token", {"agent_name": agent.agent_name, "delta": delta}))
+
+    def on_status(agent, status: str) -> None:
+        session.answer_state.update(status=status, agent_name=agent.agent_name)
+
+    session.answer_state.update(done="true", answer="", reasoning="", agent_name="None",
+                                success="false", blocks={}, status="Agent siap")
+    session.answer_state.on_change = lambda version, changes: schedule_coroutine(
+        ws_manager.send_answer_update(session.session_id, version, changes))
+    session.interaction.set_stream_handler(on_token)
+    session.interaction.set_status_handler(on_status)
+    session.interaction.set_async_provider(shared_components.get("async_provider"))
+
+def apply_model_to_sessions(provider) -> None:
+    for session in session_mgr.sessions.values():
+        session.interaction.set_model_name(provider.get_model_name())
+
+provider_registry.on_swap.append(apply_model_to_sessions)
+
+def notify_session_evicted(session) -> None:
+    schedule_coroutine(ws_manager.send_status(
+        "system", "Sesi ditutup karena server mencapai batas sesi. Kirim pesan baru untuk memulai sesi baru.",
+        0.0, session_id=session.session_id))
+
+session_mgr = SessionManager(
+    create_session_interaction,
+    max_sessions=config.getint('MAIN', 'max_sessions', fallback=16),
+    idle_timeout=config.getfloat('MAIN', 'session_idle_timeout', fallback=3600.0),
+    save_on_evict=config.getboolean('MAIN', 'save_session'),
+    on_register=attach_session_hooks,
+    on_evict=notify_session_evicted
+)
+if interaction is not None:
+    session_mgr.register(DEFAULT_SESSION_ID, interaction)
 
 
 @api.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await ws_manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, resume_from: Optional[int] = None,
+                             epoch: Optional[str] = None, session_id: str = DEFAULT_SESSION_ID,
+                             types: Optional[str] = None, agents: Optional[str] = None,
+                             encoding: Optional[str] = None):
+    """
+    Realtime events for the given session(s): session_id is a comma separated list or "*".
+    types and agents optionally narrow the events further; a {"type": "subscribe"} message
+    with sessions/types/agents replaces the subscription later on.
+    encoding=msgpack (or the agentic.msgpack subprotocol) switches to binary MessagePack frames.
+    """
+    subscription = Subscription(sessions=parse_topics(session_id) or {DEFAULT_SESSION_ID},
+                                types=parse_topics(types), agents=parse_topics(agents))
+    encoding, subprotocol = negotiate_encoding(encoding, websocket.scope.get("subprotocols", []))
+    await ws_manager.connect(websocket, resume_from=resume_from, epoch=epoch, subscription=subscription,
+                             encoding=encoding, subprotocol=subprotocol)
     try:
         while True:
-            data = await websocket.receive_text()
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
             try:
-                msg = json.loads(data)
+                msg = decode_frame(frame.get("bytes") or frame.get("text") or "", encoding)
+                if not isinstance(msg, dict):
+                    continue
                 if msg.get("type") == "ping":
-                    await websocket.send_text(json.dumps({"type": "pong", "timestamp": time.time()}))
-            except json.JSONDecodeError:
+                    await ws_manager.send_personal(websocket, {"type": "pong", "timestamp": time.time()})
+                elif msg.get("type") == "subscribe":
+                    subscription = Subscription(sessions=parse_topics(msg.get("sessions")) or {DEFAULT_SESSION_ID},
+                                                types=parse_topics(msg.get("types")),
+                                                agents=parse_topics(msg.get("agents")))
+                    ws_manager.subscribe(websocket, subscription)
+                    await ws_manager.send_personal(websocket, {"type": "subscribed", **subscription.jsonify()})
+            except ValueError:
                 pass
     except WebSocketDisconnect:
         ws_manager.disconnect(websocket)
@@ -172,6 +355,18 @@ async def websocket_endpoint(websocket: WebSocket):
         ws_manager.disconnect(websocket)
 
 
+SESSIONS_GAUGE = metrics_registry.gauge("agent_sessions", "Client sessions by state.", ["state"])
+SESSIONS_GAUGE.set_function(lambda: len(session_mgr.sessions), state="open")
+SESSIONS_GAUGE.set_function(session_mgr.generating_count, state="generating")
+JOBS_GAUGE = metrics_registry.gauge("agent_jobs", "Queued and running jobs.", ["state"])
+JOBS_GAUGE.set_function(lambda: job_queue.get_stats()["queued"], state="queued")
+JOBS_GAUGE.set_function(lambda: len(job_queue.running), state="running")
+
+@api.get("/metrics")
+async def metrics():
+    return PlainTextResponse(metrics_registry.expose(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @api.get("/screenshot")
 async def get_screenshot():
     logger.info("Screenshot endpoint called")
@@ -188,7 +383,8 @@ async def get_screenshot():
 async def health_check():
     logger.info("Health check endpoint called")
     if interaction is None:
-        return {"status": "degraded", "version": "0.2.0", "error": "System not fully initialized. Check API key configuration."}
+        return {"status": "degraded", "version": "0.2.0", "error": "System not fully initialized. Check API key configuration.",
+                "components": profiler.get_status()}
     return {
         "status": "healthy",
         "version": "0.2.0",
@@ -197,73 +393,82 @@ async def health_check():
             "workspace_manager": True,
             "live_preview": True,
             "realtime_status": True,
-        }
+            "multi_session": True,
+            "jobs": True,
+        },
+        "sessions": session_mgr.get_stats(),
+        "jobs": job_queue.get_stats(),
+        "realtime": ws_manager.get_stats(),
+        "provider": provider_registry.get_stats(),
+        "http_clients": client_pool.get_stats(),
+        "llm_cache": get_response_cache().get_stats() if get_response_cache() is not None else None,
+        "hedging": hedge_policy.get_stats(),
+        "rate_limits": rate_limiter.get_stats(),
+        "summarizer": summarizer.get_stats(),
+        "token_counting": {k: v for k, v in model_registry.get_stats().items() if k != "models"},
+        "components": profiler.get_status(),
     }
 
 @api.get("/is_active")
-async def is_active():
+async def is_active(session_id: str = DEFAULT_SESSION_ID):
     logger.info("Is active endpoint called")
     if interaction is None:
         return {"is_active": False, "error": "System not initialized. Check OPENAI_API_KEY."}
-    return {"is_active": interaction.is_active}
+    session = session_mgr.get(session_id)
+    if session is None:
+        return {"is_active": False}
+    return {"is_active": session.interaction.is_active}
 
 @api.get("/stop")
-async def stop():
-    global is_generating
-    logger.info("Stop endpoint called")
-    if interaction is None or interaction.current_agent is None:
+async def stop(session_id: str = DEFAULT_SESSION_ID):
+    logger.info(f"Stop endpoint called for session {session_id}")
+    session = session_mgr.get(session_id)
+    if session is None or session.interaction.current_agent is None:
         return JSONResponse(status_code=503, content={"error": "System not initialized"})
-    interaction.current_agent.request_stop()
-    is_generating = False
-    await ws_manager.send_status("system", "Dihentikan", 0.0, "Proses dihentikan oleh pengguna")
+    session.interaction.current_agent.request_stop()
+    session.set_generating(False)
+    session.answer_state.update(done="true", status="Dihentikan")
+    await ws_manager.send_status("system", "Dihentikan", 0.0, "Proses dihentikan oleh pengguna", session_id=session_id)
     return JSONResponse(status_code=200, content={"status": "stopped"})
 
-@api.post("/new_chat")
-async def new_chat():
-    global query_resp_history, is_generating
-    logger.info("New chat endpoint called")
-    is_generating = False
-    query_resp_history = []
-    if interaction is not None:
-        if config.getboolean('MAIN', 'save_session'):
-            interaction.save_session()
-        interaction.last_answer = None
-        interaction.last_reasoning = None
-        interaction.last_query = None
-        interaction.current_agent = None
-        for agent in interaction.agents:
-            agent.memory.reset()
-            agent.blocks_result = []
-            agent.stop = False
-            agent.success = True
-            agent.last_answer = ""
-            agent.last_reasoning = ""
+def reset_session_state(session, clear_current_agent: bool = True) -> None:
+    session.set_generating(False)
+    session.query_resp_history = []
+    session_interaction = session.interaction
+    if config.getboolean('MAIN', 'save_session'):
+        session_interaction.save_session()
+    session_interaction.last_answer = None
+    session_interaction.last_reasoning = None
+    session_interaction.last_query = None
+    if clear_current_agent:
+        session_interaction.current_agent = None
+    for agent in session_interaction.agents:
+        agent.memory.reset()
+        agent.blocks_result = []
+        agent.stop = False
+        agent.success = True
+        agent.last_answer = ""
+        agent.last_reasoning = ""
+        if clear_current_agent:
             agent.status_message = "Siap"
-    await ws_manager.send_status("system", "Chat baru dimulai", 0.0)
+    session.answer_state.update(done="true", answer="", reasoning="", success="false", blocks={},
+                                agent_name="None" if clear_current_agent else session.answer_state.state.get("agent_name"))
+
+@api.post("/new_chat")
+async def new_chat(session_id: str = DEFAULT_SESSION_ID):
+    logger.info(f"New chat endpoint called for session {session_id}")
+    session = session_mgr.get(session_id)
+    if session is not None:
+        reset_session_state(session)
+    await ws_manager.send_status("system", "Chat baru dimulai", 0.0, session_id=session_id)
     return JSONResponse(status_code=200, content={"status": "new_chat_created"})
 
 @api.post("/new_project")
-async def new_project():
-    global query_resp_history, is_generating
-    logger.info("New project endpoint called - clearing work_dir and resetting all state")
-    is_generating = False
-    query_resp_history = []
-
-    if interaction is not None:
-        if config.getboolean('MAIN', 'save_session'):
-            interaction.save_session()
-        interaction.last_answer = None
-        interaction.last_reasoning = None
-        interaction.last_query = None
-        interaction.current_agent = None
-        for agent in interaction.agents:
-            agent.memory.reset()
-            agent.blocks_result = []
-            agent.stop = False
-            agent.success = True
-            agent.last_answer = ""
-            agent.last_reasoning = ""
-            agent.status_message = "Siap"
+async def new_project(session_id: str = DEFAULT_SESSION_ID):
+    logger.info(f"New project endpoint called for session {session_id} - clearing work_dir and resetting state")
+    session = session_mgr.get(session_id)
+    if session is not None:
+        reset_session_state(session)
 
     cleared_files = 0
     try:
@@ -285,36 +490,33 @@ async def new_project():
     except Exception as e:
         logger.error(f"Failed to clear work_dir: {e}")
 
-    await ws_manager.send_status("system", "Project baru dimulai", 0.0)
+    await ws_manager.send_status("system", "Project baru dimulai", 0.0, session_id=session_id)
     return JSONResponse(status_code=200, content={
         "status": "new_project_created",
         "cleared_files": cleared_files
     })
 
 @api.post("/clear_history")
-async def clear_history():
-    global query_resp_history
-    logger.info("Clear history endpoint called")
-    query_resp_history = []
-    if interaction is not None:
-        if config.getboolean('MAIN', 'save_session'):
-            interaction.save_session()
-        interaction.last_answer = None
-        interaction.last_reasoning = None
-        interaction.last_query = None
-        for agent in interaction.agents:
-            agent.memory.reset()
-            agent.blocks_result = []
-            agent.stop = False
-            agent.success = True
-            agent.last_answer = ""
-            agent.last_reasoning = ""
+async def clear_history(session_id: str = DEFAULT_SESSION_ID):
+    logger.info(f"Clear history endpoint called for session {session_id}")
+    session = session_mgr.get(session_id)
+    if session is not None:
+        reset_session_state(session, clear_current_agent=False)
     return JSONResponse(status_code=200, content={"status": "history_cleared"})
 
 @api.get("/latest_answer")
-async def get_latest_answer():
-    global query_resp_history
-    if interaction is None or interaction.current_agent is None:
+async def get_latest_answer(session_id: str = DEFAULT_SESSION_ID, since: int = None, timeout: float = 25.0):
+    """
+    Current answer state of a session. With since=N the request is held until the state
+    version exceeds N or timeout seconds pass (long-poll); the response carries the version to pass next.
+    """
+    session = session_mgr.get(session_id)
+    if session is not None and since is not None:
+        await session.answer_state.wait(since, min(max(timeout, 0.0), 60.0))
+    session_interaction = session.interaction if session is not None else None
+    version = session.answer_state.version if session is not None else 0
+    uid = f"{session_id}:{version}"
+    if session_interaction is None or session_interaction.current_agent is None:
         return JSONResponse(status_code=200, content={
             "done": "true",
             "answer": "",
@@ -323,52 +525,58 @@ async def get_latest_answer():
             "success": "false",
             "blocks": {},
             "status": "Agent siap" if interaction is not None else "Sistem memulai...",
-            "uid": str(uuid.uuid4())
+            "uid": uid,
+            "version": version
         })
 
-    if not is_generating:
-        status_msg = interaction.current_agent.get_status_message if interaction.current_agent else "Siap"
+    current_agent = session_interaction.current_agent
+    if not session.is_generating:
         return JSONResponse(status_code=200, content={
             "done": "true",
             "answer": "",
             "reasoning": "",
-            "agent_name": interaction.current_agent.agent_name if interaction.current_agent else "None",
+            "agent_name": current_agent.agent_name,
             "success": "true",
             "blocks": {},
-            "status": status_msg,
-            "uid": str(uuid.uuid4())
+            "status": current_agent.get_status_message,
+            "uid": uid,
+            "version": version
         })
 
     return JSONResponse(status_code=200, content={
         "done": "false",
         "answer": "",
+        "partial_answer": session.partial_answer,
         "reasoning": "",
-        "agent_name": interaction.current_agent.agent_name if interaction.current_agent else "None",
+        "agent_name": current_agent.agent_name,
         "success": "false",
         "blocks": {},
-        "status": interaction.current_agent.get_status_message if interaction.current_agent else "Memproses...",
-        "uid": str(uuid.uuid4())
+        "status": current_agent.get_status_message,
+        "uid": uid,
+        "version": version
     })
 
-async def think_wrapper(interaction, query):
+async def think_wrapper(interaction, query, session_id: str = DEFAULT_SESSION_ID):
+    request_session.set(session_id)
     try:
         interaction.last_query = query
         logger.info("Agents request is being processed")
-        await ws_manager.send_status("system", "Memproses permintaan...", 0.1, query[:100])
+        await ws_manager.send_status("system", "Memproses permintaan...", 0.1, query[:100], session_id=session_id)
 
-        agent = interaction.router.select_agent(query)
+        # Router classification is model inference; running it on the loop would stall every session.
+        agent = await asyncio.to_thread(interaction.router.select_agent, query)
         if agent:
-            await ws_manager.send_agent_switch(agent.agent_name, agent.type)
+            await ws_manager.send_agent_switch(agent.agent_name, agent.type, session_id=session_id)
 
-        success = await interaction.think()
+        success = await interaction.think(agent)
         if not success:
             interaction.last_answer = "Error: No answer from agent"
             interaction.last_reasoning = "Error: No reasoning from agent"
             interaction.last_success = False
-            await ws_manager.send_status("system", "Gagal memproses", 1.0)
+            await ws_manager.send_status("system", "Gagal memproses", 1.0, session_id=session_id)
         else:
             interaction.last_success = True
-            await ws_manager.send_status("system", "Selesai", 1.0)
+            await ws_manager.send_status("system", "Selesai", 1.0, session_id=session_id)
         pretty_print(interaction.last_answer)
         interaction.speak_answer()
         return success
@@ -377,13 +585,12 @@ async def think_wrapper(interaction, query):
         interaction.last_answer = f"Error: {str(e)}"
         interaction.last_reasoning = f"Error: {str(e)}"
         interaction.last_success = False
-        await ws_manager.send_status("system", f"Error: {str(e)[:100]}", 1.0)
+        await ws_manager.send_status("system", f"Error: {str(e)[:100]}", 1.0, session_id=session_id)
         raise e
 
 @api.post("/query", response_model=QueryResponse)
 async def process_query(request: QueryRequest):
-    global is_generating, query_resp_history
-    logger.info(f"Processing query: {request.query}")
+    logger.info(f"Processing query for session {request.session_id}: {request.query}")
     query_resp = QueryResponse(
         done="false",
         answer="",
@@ -398,39 +605,50 @@ async def process_query(request: QueryRequest):
         query_resp.answer = "System not initialized. Please check your API key configuration."
         query_resp.done = "true"
         return JSONResponse(status_code=503, content=query_resp.jsonify())
-    if is_generating:
-        logger.warning("Another query is being processed, please wait.")
+    try:
+        session = await session_mgr.get_or_create_async(request.session_id)
+    except Exception as e:
+        logger.warning(f"Cannot open session {request.session_id}: {str(e)}")
+        query_resp.answer = f"Sesi tidak dapat dibuat: {str(e)}"
+        query_resp.done = "true"
+        return JSONResponse(status_code=503, content=query_resp.jsonify())
+    if session.is_generating:
+        logger.warning(f"Another query is being processed in session {session.session_id}, please wait.")
         return JSONResponse(status_code=429, content=query_resp.jsonify())
+    session_interaction = session.interaction
 
     try:
-        is_generating = True
-        success = await think_wrapper(interaction, request.query)
-        is_generating = False
+        session.set_generating(True)
+        session.partial_answer = ""
+        session.answer_state.update(done="false", answer="", reasoning="", success="false", blocks={},
+                                    status="Memproses permintaan...")
+        success = await think_wrapper(session_interaction, request.query, session.session_id)
+        session.set_generating(False)
 
         if not success:
-            query_resp.answer = interaction.last_answer or ""
-            query_resp.reasoning = interaction.last_reasoning or ""
+            query_resp.answer = session_interaction.last_answer or ""
+            query_resp.reasoning = session_interaction.last_reasoning or ""
             return JSONResponse(status_code=400, content=query_resp.jsonify())
 
-        if interaction.current_agent:
-            blocks_json = {f'{i}': block.jsonify() for i, block in enumerate(interaction.current_agent.get_blocks_result())}
+        if session_interaction.current_agent:
+            blocks_json = {f'{i}': block.jsonify() for i, block in enumerate(session_interaction.current_agent.get_blocks_result())}
         else:
             logger.error("No current agent found")
             blocks_json = {}
             query_resp.answer = "Error: No current agent"
             return JSONResponse(status_code=400, content=query_resp.jsonify())
 
-        formatted_answer = interaction.current_agent.get_formatted_answer()
+        formatted_answer = session_interaction.current_agent.get_formatted_answer()
         if not formatted_answer or formatted_answer.strip() == "":
-            formatted_answer = interaction.last_answer or ""
+            formatted_answer = session_interaction.last_answer or ""
 
         logger.info(f"Answer: {formatted_answer}")
         logger.info(f"Blocks: {blocks_json}")
         query_resp.done = "true"
         query_resp.answer = formatted_answer
-        query_resp.reasoning = interaction.last_reasoning or ""
-        query_resp.agent_name = interaction.current_agent.agent_name
-        query_resp.success = str(interaction.last_success)
+        query_resp.reasoning = session_interaction.last_reasoning or ""
+        query_resp.agent_name = session_interaction.current_agent.agent_name
+        query_resp.success = str(session_interaction.last_success)
         query_resp.blocks = blocks_json
         
         query_resp_dict = {
@@ -442,14 +660,14 @@ async def process_query(request: QueryRequest):
             "status": query_resp.status,
             "uid": query_resp.uid
         }
-        query_resp_history.append(query_resp_dict)
+        session.query_resp_history.append(query_resp_dict)
 
-        await _check_and_notify_preview()
+        await _check_and_notify_preview(session.session_id)
 
         logger.info("Query processed successfully")
         return JSONResponse(status_code=200, content=query_resp.jsonify())
     except Exception as e:
-        is_generating = False
+        session.set_generating(False)
         error_msg = str(e)
         logger.error(f"An error occurred: {error_msg}")
         if "402" in error_msg or "payment" in error_msg.lower() or "credit" in error_msg.lower() or "depleted" in error_msg.lower():
@@ -469,39 +687,163 @@ async def process_query(request: QueryRequest):
         query_resp.done = "true"
         return JSONResponse(status_code=200, content=query_resp.jsonify())
     finally:
-        is_generating = False
+        session.set_generating(False)
+        session.answer_state.update(done="true", answer=query_resp.answer, reasoning=query_resp.reasoning,
+                                    agent_name=query_resp.agent_name, success=query_resp.success,
+                                    blocks=query_resp.blocks)
         logger.info("Processing finished")
         if config.getboolean('MAIN', 'save_session'):
-            interaction.save_session()
+            session_interaction.save_session()
+
+
+@api.post("/query/stream")
+async def process_query_stream(request: QueryRequest):
+    """
+    Server-Sent Events variant of /query.
+    Emits a `token` event per streamed LLM delta and a final `done` event carrying the /query response.
+    """
+    if interaction is None:
+        return await process_query(request)
+    try:
+        session = await session_mgr.get_or_create_async(request.session_id)
+    except Exception:
+        return await process_query(request)
+
+    async def run_query() -> dict:
+        response = await process_query(request)
+        return json.loads(response.body)
+
+    return StreamingResponse(
+        session.stream_events(run_query),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
-async def _check_and_notify_preview():
+async def run_job(job) -> tuple:
+    """Run a queued job through /query, waiting for its session to be free first."""
+    request = QueryRequest(query=job.query, tts_enabled=False, session_id=job.session_id)
+    session = session_mgr.get(job.session_id)
     try:
-        files = []
-        all_files = []
-        for root, dirs, fnames in os.walk(work_dir_path):
-            dirs[:] = [d for d in dirs if d not in ('__pycache__', 'node_modules', '.git', '.cache')]
-            for fname in fnames:
-                rel = os.path.relpath(os.path.join(root, fname), work_dir_path)
-                all_files.append(rel)
-                if fname.endswith('.html'):
-                    files.append(rel)
-
-        for f in all_files:
-            await ws_manager.send_file_update("create", f)
+        if session is not None:
+            await session.wait_idle()
+        response = await process_query(request)
+    except asyncio.CancelledError:
+        session = session_mgr.get(job.session_id)
+        if session is not None:
+            for agent in session.interaction.agents:
+                agent.request_stop()
+        raise
+    result = json.loads(response.body)
+    # process_query reports most errors as a 200 carrying success "false".
+    success = response.status_code == 200 and str(result.get("success")).lower() == "true"
+    if not success:
+        job.error = result.get("answer") or f"HTTP {response.status_code}"
+    return success, result
+
+async def notify_job(job) -> None:
+    payload = job.jsonify()
+    payload["position"] = job_queue.position(job)
+    await ws_manager.send_job_update(payload)
+
+job_queue = JobQueue(
+    run_job,
+    concurrency=config.getint('MAIN', 'job_workers', fallback=2),
+    max_queue=config.getint('MAIN', 'job_queue_size', fallback=32),
+    on_update=notify_job
+)
+
+
+@api.post("/jobs")
+async def submit_job(request: QueryRequest):
+    """
+    Queue a query and return immediately. Progress is pushed over /ws as `job` events.
+    """
+    if interaction is None:
+        return JSONResponse(status_code=503, content={"error": "System not initialized. Please check your API key configuration."})
+    try:
+        job = await job_queue.submit(request.session_id or DEFAULT_SESSION_ID, request.query)
+    except RuntimeError as e:
+        logger.warning(f"Job rejected: {str(e)}")
+        return JSONResponse(status_code=429, content={"error": "Antrean penuh. Silakan coba lagi nanti.", "detail": str(e)})
+    logger.info(f"Job {job.job_id} queued for session {job.session_id}")
+    return JSONResponse(status_code=202, content={
+        "job_id": job.job_id,
+        "status": job.status,
+        "position": job_queue.position(job),
+        "status_url": f"/jobs/{job.job_id}",
+    })
+
+@api.get("/jobs")
+async def job_stats():
+    return JSONResponse(status_code=200, content=job_queue.get_stats())
+
+@api.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    content = job.jsonify()
+    content["position"] = job_queue.position(job)
+    return JSONResponse(status_code=200, content=content)
 
+@api.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    if not await job_queue.cancel(job_id):
+        return JSONResponse(status_code=404, content={"error": "Job not found or already finished"})
+    return JSONResponse(status_code=200, content={"job_id": job_id, "status": "cancelling"})
+
+
+async def _check_and_notify_preview(session_id: str = ""):
+    try:
+        file_index.sync(force=True)
+        version, changes = file_index.changes_since(preview_state["version"])
+        if changes is None:
+            changes = [("create", f) for f in file_index.paths()]
+        preview_state["version"] = version
+
+        await ws_manager.send_file_updates(changes)
+
+        files = file_index.by_extension('.html')
         if files:
             main_file = "index.html" if "index.html" in files else files[0]
-            await ws_manager.send_preview_ready(f"/api/preview/{main_file}", "static_html")
-            logger.info(f"Preview ready: /api/preview/{main_file}, total files: {len(all_files)}")
-        elif all_files:
-            logger.info(f"Files created but no HTML: {all_files}")
+            await ws_manager.send_preview_ready(f"/api/preview/{main_file}", "static_html", session_id=session_id)
+            logger.info(f"Preview ready: /api/preview/{main_file}, changed files: {len(changes)}")
+        elif changes:
+            logger.info(f"Files changed but no HTML: {[f for _, f in changes]}")
     except Exception as e:
         logger.error(f"Error in _check_and_notify_preview: {e}")
 
 
+def conditional_file_response(request: Request, full_path: str, media_type: str, headers: dict = None):
+    """
+    Serve a file honouring If-None-Match (304) and a single byte Range (206/416).
+    """
+    st = os.stat(full_path)
+    etag = file_etag(st)
+    headers = dict(headers or {})
+    headers.update({"ETag": etag, "Accept-Ranges": "bytes"})
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, st.st_size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{st.st_size}"
+            return Response(status_code=416, headers=headers)
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(iter_bytes(full_path, start, end), status_code=206,
+                                     media_type=media_type, headers=headers)
+    return FileResponse(full_path, media_type=media_type, headers=headers, stat_result=st)
+
+
 @api.get("/api/preview/{file_path:path}")
-async def serve_preview(file_path: str):
+async def serve_preview(file_path: str, request: Request):
     abs_work_dir = os.path.abspath(work_dir_path)
     full_path = os.path.abspath(os.path.join(abs_work_dir, file_path))
     if not full_path.startswith(abs_work_dir):
@@ -528,24 +870,14 @@ async def serve_preview(file_path: str):
     }
     media_type = content_types.get(ext, 'application/octet-stream')
     
-    return FileResponse(
-        full_path,
-        media_type=media_type,
-        headers={"Cache-Control": "no-cache, no-store, must-revalidate"}
-    )
+    # no-cache still lets the browser keep the asset; it revalidates with the ETag and gets a 304
+    return conditional_file_response(request, full_path, media_type, {"Cache-Control": "no-cache"})
 
 
 @api.get("/api/preview-files")
 async def list_preview_files():
-    html_files = []
-    all_files = []
-    for root, dirs, fnames in os.walk(work_dir_path):
-        dirs[:] = [d for d in dirs if d not in ('__pycache__', 'node_modules', '.git', '.cache')]
-        for fname in fnames:
-            rel = os.path.relpath(os.path.join(root, fname), work_dir_path)
-            all_files.append(rel)
-            if fname.endswith('.html'):
-                html_files.append(rel)
+    html_files = file_index.by_extension('.html')
+    all_files = file_index.paths()
     main_file = None
     if html_files:
         main_file = "index.html" if "index.html" in html_files else html_files[0]
@@ -565,31 +897,13 @@ async def download_project_zip():
     if not os.path.isdir(work_dir):
         return JSONResponse(status_code=404, content={"error": "Belum ada project yang dibuat. Minta AI untuk membuat project terlebih dahulu."})
     
-    files_found = False
-    for root, dirs, files in os.walk(work_dir):
-        dirs[:] = [d for d in dirs if d not in ('__pycache__', 'node_modules', '.git', '.cache')]
-        if files:
-            files_found = True
-            break
-    
-    if not files_found:
+    if not file_index.has_files():
         return JSONResponse(status_code=404, content={"error": "Folder project kosong. Minta AI untuk membuat kode terlebih dahulu."})
 
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        for root, dirs, files in os.walk(work_dir):
-            dirs[:] = [d for d in dirs if d not in ('__pycache__', 'node_modules', '.git', '.cache')]
-            for file in files:
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, work_dir)
-                try:
-                    zf.write(file_path, arcname)
-                except Exception:
-                    pass
-    
-    zip_buffer.seek(0)
+    files = [(os.path.join(work_dir, entry.path), entry.path) for entry in file_index.files()]
+    writer = ZipStreamWriter(cache=zip_cache)
     return StreamingResponse(
-        zip_buffer,
+        writer.stream(files),
         media_type="application/zip",
         headers={"Content-Disposition": "attachment; filename=agent-dzeck-project.zip"}
     )
@@ -600,22 +914,18 @@ async def list_project_files():
     if not os.path.isdir(work_dir):
         return JSONResponse(status_code=200, content={"files": [], "total": 0})
     
-    files_list = []
-    for root, dirs, files in os.walk(work_dir):
-        dirs[:] = [d for d in dirs if d not in ('__pycache__', 'node_modules', '.git', '.cache')]
-        for file in files:
-            file_path = os.path.join(root, file)
-            rel_path = os.path.relpath(file_path, work_dir)
-            try:
-                size = os.path.getsize(file_path)
-                files_list.append({"name": rel_path, "size": size})
-            except Exception:
-                pass
-    
+    files_list = [{"name": entry.path, "size": entry.size} for entry in file_index.files()]
     return JSONResponse(status_code=200, content={"files": files_list, "total": len(files_list)})
 
 @api.get("/api/file-content/{file_path:path}")
-async def get_file_content(file_path: str):
+async def get_file_content(file_path: str, request: Request, offset: int = 0, length: int = MAX_PAGE_BYTES,
+                           line: int = None, lines: int = 500):
+    """
+    Return one page of a file as JSON: a byte window (offset/length) or, when line is given, a line window.
+    Pages are capped at MAX_PAGE_BYTES and MAX_PAGE_LINES; follow next_offset or next_line for the rest.
+    A line page cut inside an overlong line has next_line null and continues by next_offset.
+    Range headers are ignored here; /api/preview serves raw byte ranges.
+    """
     work_dir = work_dir_path
     full_path = os.path.join(work_dir, file_path)
     if not full_path.startswith(os.path.abspath(work_dir)):
@@ -623,13 +933,34 @@ async def get_file_content(file_path: str):
     if not os.path.isfile(full_path):
         return JSONResponse(status_code=404, content={"error": "File not found"})
     try:
-        with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
-        return JSONResponse(status_code=200, content={
+        st = os.stat(full_path)
+        etag = file_etag(st)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        if line is not None:
+            page = await asyncio.to_thread(line_index.read_lines, full_path, line,
+                                           min(max(1, lines), MAX_PAGE_LINES), MAX_PAGE_BYTES)
+            return JSONResponse(status_code=200, headers=headers, content={
+                "file": file_path,
+                "content": page.content,
+                "size": st.st_size,
+                "line": page.start_line,
+                "lines": page.line_count,
+                "next_line": page.next_line,
+                "next_offset": page.next_offset,
+                "truncated": not page.eof,
+                "etag": etag,
+            })
+        page = await asyncio.to_thread(read_text_page, full_path, offset, min(max(0, length), MAX_PAGE_BYTES))
+        return JSONResponse(status_code=200, headers=headers, content={
             "file": file_path,
-            "content": content[:100000],
-            "size": os.path.getsize(full_path),
-            "truncated": len(content) > 100000,
+            "content": page.content,
+            "size": st.st_size,
+            "offset": page.offset,
+            "next_offset": page.next_offset,
+            "truncated": not page.eof,
+            "etag": etag,
         })
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -710,6 +1041,21 @@ async def memory_stats():
     })
 
 
+@api.get("/api/usage")
+async def llm_usage(group_by: str = "", since: Optional[float] = None, session_id: str = "", recent: int = 20):
+    """
+    Live per (provider, model, agent, prompt) totals since start; with group_by (comma-separated:
+    provider, model, agent_type, prompt, session_id, plan, plan_step, outcome, cached) the
+    persisted history is aggregated instead, optionally filtered by since (unix time) and session_id.
+    """
+    content = {"totals": usage_tracker.summary(), "recent": usage_tracker.recent[-recent:] if recent > 0 else [],
+               "stats": usage_tracker.get_stats()}
+    if group_by:
+        columns = [c.strip() for c in group_by.split(",") if c.strip()]
+        content["groups"] = await asyncio.to_thread(usage_tracker.query, columns, since, session_id or None)
+    return JSONResponse(status_code=200, content=content)
+
+
 @api.get("/api/config/models")
 async def get_model_config():
     models_by_provider = {
@@ -742,6 +1088,9 @@ async def get_model_config():
     current_provider = config["MAIN"]["provider_name"]
     current_model = config["MAIN"]["provider_model"]
 
+    for info in models_by_provider.values():
+        info["context_windows"] = {m: model_registry.get(m).context_window for m in info["models"]}
+
     return JSONResponse(status_code=200, content={
         "current_provider": current_provider,
         "current_model": current_model,
@@ -757,6 +1106,30 @@ async def update_model_config(request: ModelConfigUpdate):
     if not provider_name or not model:
         return JSONResponse(status_code=400, content={"error": "provider_name and model are required"})
 
+    if interaction is not None:
+        # Swap the provider under the live agents; browser, router models and memories are kept.
+        try:
+            provider_registry.activate(
+                provider_name,
+                model,
+                config["MAIN"]["provider_server_address"],
+                is_local=config.getboolean('MAIN', 'is_local')
+            )
+        except Exception as e:
+            return JSONResponse(status_code=400, content={
+                "error": f"Failed to switch provider: {str(e)}"
+            })
+        config["MAIN"]["provider_name"] = provider_name
+        config["MAIN"]["provider_model"] = model
+        with open('config.ini', 'w') as f:
+            config.write(f)
+        await ws_manager.send_status("system", f"Model diganti ke {model}", 1.0)
+        return JSONResponse(status_code=200, content={
+            "status": "updated",
+            "provider": provider_name,
+            "model": model
+        })
+
     config["MAIN"]["provider_name"] = provider_name
     config["MAIN"]["provider_model"] = model
 
@@ -765,6 +1138,8 @@ async def update_model_config(request: ModelConfigUpdate):
 
     try:
         interaction = initialize_system()
+        session_mgr.clear()
+        session_mgr.register(DEFAULT_SESSION_ID, interaction)
         await ws_manager.send_status("system", f"Model diganti ke {model}", 1.0)
         return JSONResponse(status_code=200, content={
             "status": "updated",
@@ -788,7 +1163,26 @@ if os.path.isdir(FRONTEND_BUILD_DIR):
             return FileResponse(file_path)
         return FileResponse(os.path.join(FRONTEND_BUILD_DIR, "index.html"))
 
+def profile_startup(output_path: str = "startup_profile.json") -> None:
+    """Load the lazy components too, then print and save the per-component timing breakdown."""
+    if interaction is not None:
+        for name, load in (("browser", lambda: shared_components["browser"].get()),
+                           ("translator", lambda: interaction.router.lang_analysis.load_model()),
+                           ("summarizer", summarizer.load)):
+            try:
+                load()
+            except Exception as e:
+                logger.warning(f"Profiling {name} failed: {str(e)}")
+    print(profiler.report())
+    with open(output_path, 'w') as f:
+        json.dump(profiler.get_status(), f, indent=2)
+    print(f"[Agent Dzeck AI] Startup profile written to {output_path}")
+
 if __name__ == "__main__":
+    if "--profile-startup" in sys.argv:
+        profile_startup()
+        sys.exit(0)
+
     try:
         import install_deps
         install_deps.install_requirements()
@@ -800,4 +1194,5 @@ if __name__ == "__main__":
     else:
         print("[Agent Dzeck AI] Starting on host machine...")
     
-    uvicorn.run(api, host="0.0.0.0", port=5000)
+    uvicorn.run(api, host="0.0.0.0", port=5000,
+                ws_per_message_deflate=config.getboolean('MAIN', 'ws_compression', fallback=True))
@@ -10,12 +10,15 @@ from sources.interaction import Interaction
 from sources.agents import Agent, CoderAgent, CasualAgent, FileAgent, PlannerAgent, BrowserAgent, McpAgent
 from sources.browser import Browser, create_driver
 from sources.utility import pretty_print
+from sources.model_registry import model_registry
 
 import warnings
 warnings.filterwarnings("ignore")
 
 config = configparser.ConfigParser()
 config.read('config.ini')
+model_registry.load_overrides(config['MODELS'] if config.has_section('MODELS') else None)
+model_registry.preload(wait=False)
 
 async def main():
     pretty_print("Initializing...", color="status")
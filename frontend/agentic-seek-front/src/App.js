@@ -37,12 +37,17 @@ function App() {
   const [activeAgentType, setActiveAgentType] = useState(null);
   const messagesEndRef = useRef(null);
   const wsRef = useRef(null);
+  const wsSeqRef = useRef(0);
+  const wsEpochRef = useRef(null);
   const previewIframeRef = useRef(null);
 
   const connectWebSocket = useCallback(() => {
     const wsProtocol = window.location.protocol === "https:" ? "wss:" : "ws:";
     const wsHost = BACKEND_URL ? new URL(BACKEND_URL).host : window.location.host;
-    const wsUrl = `${wsProtocol}//${wsHost}/ws`;
+    const resumeParams = wsEpochRef.current
+      ? `?resume_from=${wsSeqRef.current}&epoch=${wsEpochRef.current}`
+      : "";
+    const wsUrl = `${wsProtocol}//${wsHost}/ws${resumeParams}`;
 
     try {
       const ws = new WebSocket(wsUrl);
@@ -63,7 +68,21 @@ function App() {
       ws.onmessage = (event) => {
         try {
           const msg = JSON.parse(event.data);
+          if (typeof msg.seq === "number" && msg.seq > wsSeqRef.current) {
+            wsSeqRef.current = msg.seq;
+          }
           switch (msg.type) {
+            case "hello":
+              if (wsEpochRef.current !== msg.epoch) {
+                wsSeqRef.current = msg.latest_seq;
+              }
+              wsEpochRef.current = msg.epoch;
+              break;
+            case "resync":
+              wsSeqRef.current = msg.latest_seq;
+              fetchPreviewFiles();
+              fetchProjectFiles();
+              break;
             case "status":
               setStatus(msg.status || "");
               setRealtimeProgress(msg.progress || 0);
@@ -241,14 +260,26 @@ function App() {
     }
   };
 
-  const fetchLatestAnswer = useCallback(async () => {
+  const answerVersionRef = useRef(0);
+  // Read by the long-poll, so new messages do not restart it while a request is in flight.
+  const messagesRef = useRef(messages);
+  useEffect(() => {
+    messagesRef.current = messages;
+  }, [messages]);
+
+  const fetchLatestAnswer = useCallback(async (signal) => {
     try {
-      const res = await axios.get(`${BACKEND_URL}/latest_answer`);
+      const res = await axios.get(`${BACKEND_URL}/latest_answer`, {
+        params: { since: answerVersionRef.current, timeout: 25 },
+        timeout: 35000,
+        signal,
+      });
       const data = res.data;
+      if (typeof data.version === "number") answerVersionRef.current = data.version;
       updateData(data);
-      if (!data.answer || data.answer.trim() === "") return;
+      if (!data.answer || data.answer.trim() === "") return true;
       const normalizedNewAnswer = normalizeAnswer(data.answer);
-      const answerExists = messages.some(
+      const answerExists = messagesRef.current.some(
         (msg) => normalizeAnswer(msg.content) === normalizedNewAnswer
       );
       if (!answerExists) {
@@ -268,10 +299,13 @@ function App() {
         fetchPreviewFiles();
         fetchProjectFiles();
       }
+      return true;
     } catch (error) {
+      if (axios.isCancel(error)) return false;
       console.error("Error fetching latest answer:", error);
+      return false;
     }
-  }, [messages, fetchPreviewFiles, fetchProjectFiles]);
+  }, [fetchPreviewFiles, fetchProjectFiles]);
 
   useEffect(() => {
     checkHealth();
@@ -290,12 +324,21 @@ function App() {
   }, [fetchModelConfig, connectWebSocket, fetchPreviewFiles, fetchProjectFiles]);
 
   useEffect(() => {
-    const pollInterval = setInterval(() => {
-      if (isLoading) {
-        fetchLatestAnswer();
+    if (!isLoading) return;
+    // Long-poll: each request is held by the server until the answer state changes.
+    let active = true;
+    const controller = new AbortController();
+    const poll = async () => {
+      while (active) {
+        const ok = await fetchLatestAnswer(controller.signal);
+        if (active) await new Promise((resolve) => setTimeout(resolve, ok ? 250 : 3000));
       }
-    }, 5000);
-    return () => clearInterval(pollInterval);
+    };
+    poll();
+    return () => {
+      active = false;
+      controller.abort();
+    };
   }, [isLoading, fetchLatestAnswer]);
 
   useEffect(() => {
@@ -0,0 +1,59 @@
+"""
+Measure per-call latency of a fresh HTTP client per request (the old provider behaviour)
+against the pooled keep-alive client used by sources.http_clients.
+
+    python scripts/bench_http_clients.py --url https://api.groq.com/openai/v1/models -n 20
+
+Set GROQ_API_KEY to benchmark an authenticated endpoint; the response status does not matter,
+only connection setup and round-trip time are measured.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+
+import httpx
+from sources.http_clients import ProviderClientPool
+
+
+def summarize(name: str, samples: list) -> None:
+    samples = sorted(samples)
+    p90 = samples[min(len(samples) - 1, int(len(samples) * 0.9))]
+    print(f"{name:<14} mean {statistics.mean(samples) * 1000:8.1f} ms   "
+          f"p50 {statistics.median(samples) * 1000:8.1f} ms   p90 {p90 * 1000:8.1f} ms")
+
+
+def run(url: str, count: int, headers: dict) -> None:
+    fresh = []
+    for _ in range(count):
+        start = time.perf_counter()
+        with httpx.Client() as client:
+            client.get(url, headers=headers)
+        fresh.append(time.perf_counter() - start)
+
+    pool = ProviderClientPool()
+    client = pool._httpx_client()
+    client.get(url, headers=headers)  # warm the pool: the first call pays the handshake once
+    pooled = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.get(url, headers=headers)
+        pooled.append(time.perf_counter() - start)
+    client.close()
+
+    summarize("fresh client", fresh)
+    summarize("pooled client", pooled)
+    saved = statistics.median(fresh) - statistics.median(pooled)
+    print(f"saved per call (p50): {saved * 1000:.1f} ms, http2={pool.get_stats()['http2']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs per-call HTTP clients.")
+    parser.add_argument("--url", default="https://api.groq.com/openai/v1/models")
+    parser.add_argument("-n", "--count", type=int, default=20)
+    args = parser.parse_args()
+    api_key = os.getenv("GROQ_API_KEY")
+    run(args.url, args.count, {"Authorization": f"Bearer {api_key}"} if api_key else {})
@@ -6,11 +6,14 @@ import random
 import time
 
 import asyncio
+import contextvars
 from concurrent.futures import ThreadPoolExecutor
 
 from sources.memory import Memory
 from sources.utility import pretty_print
 from sources.schemas import executorResult
+from sources.metrics import timed, AGENT_LLM_SECONDS
+from sources.usage import usage_scope
 
 random.seed(time.time())
 
@@ -45,11 +48,29 @@ class Agent():
         self.success = True
         self.last_answer = ""
         self.last_reasoning = ""
+        self.status_handler = None
         self.status_message = "Belum dimulai"
         self.stop = False
         self.verbose = verbose
         self.executor = ThreadPoolExecutor(max_workers=1)
+        self.stream_handler = None
+        self.streamed_answer = ""
+        self.async_llm = None
+        self.llm_task = None
+        self.stopped_task = None
+        self.prompt_name = ""
     
+    @property
+    def status_message(self) -> str:
+        return self._status_message
+
+    @status_message.setter
+    def status_message(self, value: str) -> None:
+        self._status_message = value
+        handler = getattr(self, "status_handler", None)
+        if handler is not None:
+            handler(self, value)
+
     @property
     def get_agent_name(self) -> str:
         return self.agent_name
@@ -120,12 +141,45 @@ class Agent():
         except Exception as e:
             raise e
     
+    def set_stream_handler(self, handler: Callable) -> None:
+        """
+        Set the callback receiving (agent, delta) for each streamed LLM token.
+        Only llm_request(stream=True) calls are streamed. The callback is invoked on the
+        event loop thread. None disables streaming.
+        """
+        self.stream_handler = handler
+
+    def set_status_handler(self, handler: Callable) -> None:
+        """
+        Set the callback receiving (agent, status) whenever status_message changes.
+        It may be invoked from the executor thread.
+        """
+        self.status_handler = handler
+
+    def set_async_provider(self, async_provider) -> None:
+        """
+        Send LLM requests through an AsyncProvider on the event loop instead of the executor.
+        None restores the blocking provider path.
+        """
+        self.async_llm = async_provider
+
+    def set_model_name(self, model: str) -> None:
+        """
+        Update the model the memory sizes its context for after a provider swap.
+        """
+        if self.memory is not None:
+            self.memory.model_provider = model
+
     def request_stop(self) -> None:
         """
         Request the agent to stop.
         """
         self.stop = True
         self.status_message = "Dihentikan"
+        task = self.llm_task
+        if task is not None and not task.done():
+            self.stopped_task = task
+            task.get_loop().call_soon_threadsafe(task.cancel)
     
     @abstractmethod
     def process(self, prompt, speech_module) -> str:
@@ -157,20 +211,99 @@ class Agent():
         end_idx = text.rfind(end_tag)+8
         return text[start_idx:end_idx]
     
-    async def llm_request(self) -> Tuple[str, str]:
+    async def llm_request(self, stream: bool = False) -> Tuple[str, str]:
         """
         Asynchronously ask the LLM to process the prompt.
+        Args:
+            stream (bool): Forward tokens to the stream handler. Only for passes whose text is the
+                answer shown to the user; plans, search queries and navigation steps stay internal.
         """
         self.status_message = "Sedang berpikir..."
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, self.sync_llm_request)
+        # needs_compression() and get() count tokens over the whole memory, which must not run on the event loop.
+        if self.memory is not None and await asyncio.to_thread(self.memory.needs_compression):
+            # Over budget with summaries still running: sending now would overflow the context.
+            await self.memory.wait_for_compression_async()
+        stream = stream and self.stream_handler is not None
+        with usage_scope(agent_type=self.type, prompt=self.prompt_name):
+            if self.async_llm is not None and self.async_llm.supports():
+                return await self.async_llm_request(stream)
+            loop = asyncio.get_event_loop()
+            # Run in a copy of the caller's context so rate limiting and usage records see the session.
+            context = contextvars.copy_context()
+            if not stream:
+                return await loop.run_in_executor(self.executor, context.run, self.sync_llm_request)
+            self.streamed_answer = ""
+            def on_delta(delta: str) -> None:
+                loop.call_soon_threadsafe(self.dispatch_delta, delta)
+            return await loop.run_in_executor(self.executor, context.run, self.sync_llm_request, on_delta)
+
+    async def async_llm_request(self, stream: bool = False) -> Tuple[str, str]:
+        """
+        Ask the LLM through the AsyncProvider without occupying a thread.
+        request_stop() cancels the call; what was streamed until then becomes the answer.
+        """
+        memory = await asyncio.to_thread(self.memory.get)
+        self.streamed_answer = ""
+        llm_task = self.llm_task = asyncio.ensure_future(self.async_completion(memory, stream))
+        start = time.perf_counter()
+        try:
+            thought = await llm_task
+        except asyncio.CancelledError:
+            # Only the cancellation made by request_stop() becomes an answer; our own cancellation propagates.
+            if self.stopped_task is not llm_task:
+                raise
+            thought = self.streamed_answer
+        finally:
+            self.llm_task = None
+            self.stopped_task = None
+            AGENT_LLM_SECONDS.observe(time.perf_counter() - start, agent_type=self.type,
+                                      provider=self.async_llm.provider_name, model=self.async_llm.model)
+        reasoning = self.extract_reasoning_text(thought)
+        answer = self.remove_reasoning_text(thought)
+        await asyncio.to_thread(self.memory.push, 'assistant', answer)
+        return answer, reasoning
+
+    async def async_completion(self, memory: list, stream: bool = False) -> str:
+        if not stream:
+            return await self.async_llm.respond(memory, self.verbose)
+        thought = ""
+        async for delta in self.async_llm.respond_stream(memory, self.verbose):
+            thought += delta
+            self.dispatch_delta(delta)
+        return thought
+
+    def dispatch_delta(self, delta: str) -> None:
+        """
+        Forward a streamed token to the stream handler (event loop thread).
+        """
+        self.streamed_answer += delta
+        if self.stream_handler is None:
+            return
+        try:
+            self.stream_handler(self, delta)
+        except Exception as e:
+            pretty_print(f"Stream handler failed: {str(e)}", color="failure")
     
-    def sync_llm_request(self) -> Tuple[str, str]:
+    @timed(AGENT_LLM_SECONDS, lambda args, result, error: {
+        "agent_type": args[0].type,
+        "provider": getattr(args[0].llm, "provider_name", ""),
+        "model": getattr(args[0].llm, "model", ""),
+    })
+    def sync_llm_request(self, on_delta: Callable = None) -> Tuple[str, str]:
         """
         Ask the LLM to process the prompt and return the answer and the reasoning.
+        When on_delta is given, the completion is streamed and each delta is passed to it.
         """
         memory = self.memory.get()
-        thought = self.llm.respond(memory, self.verbose)
+        if on_delta is None:
+            thought = self.llm.respond(memory, self.verbose)
+        else:
+            thought = ""
+            for delta in self.llm.respond_stream(memory, self.verbose):
+                thought += delta
+                on_delta(delta)
+                if self.stop:
+                    break
 
         reasoning = self.extract_reasoning_text(thought)
         answer = self.remove_reasoning_text(thought)
@@ -10,6 +10,7 @@ from sources.agents.agent import Agent
 from sources.tools.searxSearch import searxSearch
 from sources.browser import Browser
 from sources.logger import Logger
+from sources.startup import LazyComponent
 from sources.memory import Memory
 
 class Action(Enum):
@@ -78,6 +79,7 @@ class BrowserAgent(Agent):
         return "\n".join([f"[{i}] {link}" for i, link in enumerate(self.navigable_links) if link not in self.search_history])
 
     def make_newsearch_prompt(self, prompt: str, search_result: dict) -> str:
+        self.prompt_name = "make_newsearch_prompt"
         search_choice = self.stringify_search_results(search_result)
         self.logger.info(f"Search results: {search_choice}")
         return f"""
@@ -90,6 +92,7 @@ class BrowserAgent(Agent):
         """
     
     def make_navigation_prompt(self, user_prompt: str, page_text: str) -> str:
+        self.prompt_name = "make_navigation_prompt"
         remaining_links = self.get_unvisited_links() 
         remaining_links_text = remaining_links if remaining_links is not None else "No links remaining, do a new search." 
         inputs_form = self.browser.get_form_inputs()
@@ -306,6 +309,7 @@ class BrowserAgent(Agent):
         return page_text
     
     def conclude_prompt(self, user_query: str) -> str:
+        self.prompt_name = "conclude_prompt"
         annotated_notes = [f"{i+1}: {note.lower()}" for i, note in enumerate(self.notes)]
         search_note = '\n'.join(annotated_notes)
         pretty_print(f"AI notes:\n{search_note}", color="success")
@@ -321,6 +325,7 @@ class BrowserAgent(Agent):
         """
     
     def search_prompt(self, user_prompt: str) -> str:
+        self.prompt_name = "search_prompt"
         return f"""
         Current date: {self.date}
         Make a efficient search engine query to help users with their request:
@@ -370,6 +375,7 @@ class BrowserAgent(Agent):
         Prompt for when the agent repeat itself, can happen when fail to extract a link.
         """
         prompt = self.make_newsearch_prompt(user_prompt, unvisited)
+        self.prompt_name = "stuck_prompt"
         prompt += f"""
         You previously said:
         {self.last_answer}
@@ -379,7 +385,21 @@ class BrowserAgent(Agent):
     
     async def process(self, user_prompt: str, speech_module: type) -> Tuple[str, str]:
         """
-        Process the user prompt to conduct an autonomous web search.
+        Process the user prompt, holding the shared browser for the whole navigation.
+        Sessions share one browser driver, so concurrent web agents take turns.
+        """
+        if isinstance(self.browser, LazyComponent) and not self.browser.is_loaded:
+            # Any attribute access on the proxy starts Chrome, which must not block the event loop.
+            await asyncio.to_thread(self.browser.get)
+        lock = getattr(self.browser, "session_lock", None)
+        if lock is None:
+            return await self.browse(user_prompt, speech_module)
+        async with lock:
+            return await self.browse(user_prompt, speech_module)
+
+    async def browse(self, user_prompt: str, speech_module: type) -> Tuple[str, str]:
+        """
+        Conduct an autonomous web search for the user prompt.
         Start with a google search with searxng using web_search tool.
         Then enter a navigation logic to find the answer or conduct required actions.
         Args:
@@ -476,7 +496,7 @@ class BrowserAgent(Agent):
         prompt = self.conclude_prompt(user_prompt)
         mem_last_idx = self.memory.push('user', prompt)
         self.status_message = "Summarizing findings..."
-        answer, reasoning = await self.llm_request()
+        answer, reasoning = await self.llm_request(stream=True)
         pretty_print(answer, color="output")
         self.status_message = "Ready"
         self.last_answer = answer
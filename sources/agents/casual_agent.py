@@ -26,7 +26,7 @@ class CasualAgent(Agent):
     async def process(self, prompt, speech_module) -> str:
         self.memory.push('user', prompt)
         animate_thinking("Thinking...", color="status")
-        answer, reasoning = await self.llm_request()
+        answer, reasoning = await self.llm_request(stream=True)
         self.last_answer = answer
         self.status_message = "Ready"
         return answer, reasoning
@@ -278,7 +278,7 @@ class CoderAgent(Agent):
             animate_thinking("Thinking...", color="status")
             self.status_message = f"🤖 Berpikir... (percobaan {attempt + 1}/{max_attempts})"
             await self.wait_message(speech_module)
-            answer, reasoning = await self.llm_request()
+            answer, reasoning = await self.llm_request(stream=True)
             self.last_reasoning = reasoning
             if clarify_trigger in answer:
                 self.last_answer = answer
@@ -31,7 +31,7 @@ class FileAgent(Agent):
         while exec_success is False and not self.stop:
             await self.wait_message(speech_module)
             animate_thinking("Thinking...", color="status")
-            answer, reasoning = await self.llm_request()
+            answer, reasoning = await self.llm_request(stream=True)
             self.last_reasoning = reasoning
             exec_success, _ = self.execute_modules(answer)
             answer = self.remove_blocks(answer)
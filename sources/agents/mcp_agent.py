@@ -60,7 +60,7 @@ class McpAgent(Agent):
         working = True
         while working == True:
             animate_thinking("Thinking...", color="status")
-            answer, reasoning = await self.llm_request()
+            answer, reasoning = await self.llm_request(stream=True)
             exec_success, _ = self.execute_modules(answer)
             answer = self.remove_blocks(answer)
             self.last_answer = answer
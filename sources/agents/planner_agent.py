@@ -1,5 +1,6 @@
 import json
 import re
+import uuid
 from typing import List, Tuple, Type, Dict
 from sources.utility import pretty_print, animate_thinking
 from sources.agents.agent import Agent
@@ -15,11 +16,13 @@ except ImportError:
 from sources.tools.tools import Tools
 from sources.logger import Logger
 from sources.memory import Memory
+from sources.usage import usage_scope
 
 class PlannerAgent(Agent):
-    def __init__(self, name, prompt_path, provider, verbose=False, browser=None, ws_manager=None):
+    def __init__(self, name, prompt_path, provider, verbose=False, browser=None, ws_manager=None, session_id=""):
         """
         The planner agent is a special agent that divides and conquers the task.
+        session_id tags the plan events it publishes through ws_manager.
         """
         super().__init__(name, prompt_path, provider, verbose, None)
         self.tools = {
@@ -45,9 +48,33 @@ class PlannerAgent(Agent):
         self.orchestrator = AutonomousOrchestrator(
             agents=self.agents,
             provider=provider,
-            ws_manager=ws_manager
+            ws_manager=ws_manager,
+            session_id=session_id
         )
     
+    def set_stream_handler(self, handler) -> None:
+        """
+        Set the stream handler of the planner and of the agents it delegates to.
+        """
+        super().set_stream_handler(handler)
+        for agent in self.agents.values():
+            agent.set_stream_handler(handler)
+
+    def set_status_handler(self, handler) -> None:
+        super().set_status_handler(handler)
+        for agent in self.agents.values():
+            agent.set_status_handler(handler)
+
+    def set_async_provider(self, async_provider) -> None:
+        super().set_async_provider(async_provider)
+        for agent in self.agents.values():
+            agent.set_async_provider(async_provider)
+
+    def set_model_name(self, model: str) -> None:
+        super().set_model_name(model)
+        for agent in self.agents.values():
+            agent.set_model_name(model)
+
     def sanitize_json_text(self, text: str) -> str:
         """
         Clean and sanitize JSON text before parsing.
@@ -468,7 +495,8 @@ Jangan bertanya. Langsung buat rencana sekarang."""
         agent_prompt = self.make_prompt(task['task'], required_infos)
         pretty_print(f"Agent {task['agent']} started working...", color="status")
         self.logger.info(f"Agent {task['agent']} started working on {task['task']}.")
-        answer, reasoning = await self.agents[task['agent'].lower()].process(agent_prompt, None)
+        with usage_scope(plan_step=task['id']):
+            answer, reasoning = await self.agents[task['agent'].lower()].process(agent_prompt, None)
         self.last_answer = answer
         self.last_reasoning = reasoning
         self.blocks_result = self.agents[task['agent'].lower()].blocks_result
@@ -500,6 +528,11 @@ Jangan bertanya. Langsung buat rencana sekarang."""
         Process the goal using the autonomous orchestrator loop.
         Plan -> Execute -> Observe -> Reflect cycle for full autonomy.
         """
+        # Every LLM call made for this goal, by the planner or the agents it runs, is accounted to one plan.
+        with usage_scope(plan=uuid.uuid4().hex[:12]):
+            return await self._process(goal, speech_module)
+
+    async def _process(self, goal: str, speech_module) -> Tuple[str, str]:
         self.status_message = "Membuat rencana..."
         self.last_answer = "Sedang menganalisis permintaan dan membuat rencana..."
         agents_tasks = await self.make_plan(goal)
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class AnswerState:
+    """
+    Versioned view of a session's answer and agent status.
+    Every effective change bumps the version; long-poll readers wait for a version newer than theirs.
+    update() may be called from any thread.
+    """
+    def __init__(self, on_change: Optional[Callable[[int, Dict], None]] = None):
+        self.version = 0
+        self.state: Dict = {}
+        self.on_change = on_change
+        self.lock = threading.Lock()
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def snapshot(self) -> Tuple[int, Dict]:
+        with self.lock:
+            return self.version, dict(self.state)
+
+    def update(self, **fields) -> bool:
+        """Apply the fields; returns False (and wakes nobody) when nothing changed."""
+        with self.lock:
+            changed = {k: v for k, v in fields.items() if self.state.get(k) != v}
+            if not changed:
+                return False
+            self.state.update(changed)
+            self.version += 1
+            version = self.version
+            waiters, self.waiters = self.waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(self._wake, future)
+        if self.on_change is not None:
+            self.on_change(version, changed)
+        return True
+
+    @staticmethod
+    def _wake(future: asyncio.Future) -> None:
+        if not future.done():
+            future.set_result(None)
+
+    async def wait(self, since: int, timeout: float) -> Tuple[int, Dict]:
+        """
+        Return as soon as the version differs from since, or after timeout seconds.
+        A since ahead of the current version (state recreated after a restart) returns immediately.
+        """
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            if self.version != since:
+                return self.version, dict(self.state)
+            future = loop.create_future()
+            entry = (loop, future)
+            self.waiters.append(entry)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self.lock:
+                if entry in self.waiters:
+                    self.waiters.remove(entry)
+        return self.snapshot()
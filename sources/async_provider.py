@@ -0,0 +1,305 @@
+import time
+import asyncio
+import importlib.util
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+
+from sources.http_clients import client_pool, GROQ_BASE_URL
+from sources.llm_provider import (Provider, HUGGINGFACE_FREE_MODELS, CREDIT_DEPLETED_ANSWER, retry_decision,
+                                  is_rate_limit_error)
+from sources.rate_limiter import rate_limiter, estimate_tokens
+from sources.usage import usage_tracker, current_usage, note_usage
+from sources.response_cache import get_response_cache
+from sources.hedging import hedge_policy
+from sources.logger import Logger
+from sources.metrics import outcome, PROVIDER_RESPOND_SECONDS, PROVIDER_ERRORS
+
+
+async def open_stream(stream_fn, history: List[Dict], verbose: bool) -> Tuple[AsyncIterator[str], str]:
+    """Start stream_fn and return (stream, first non-empty delta); the delta is "" for an empty stream."""
+    stream = stream_fn(history, verbose)
+    try:
+        async for delta in stream:
+            if delta:
+                return stream, delta
+    except BaseException:
+        await stream.aclose()
+        raise
+    return stream, ""
+
+
+class AsyncProvider:
+    """
+    Asyncio counterpart of Provider.respond/respond_stream.
+    Wraps a Provider (or ProviderHandle) and reads its name, model and key on every call, so a
+    provider swap applies to the next request. Backoff uses asyncio.sleep and requests go through
+    async SDK clients: no thread is held while waiting, and cancelling the awaiting task aborts the call.
+    """
+    def __init__(self, provider, max_retries: int = 2):
+        self.provider = provider
+        self.max_retries = max_retries
+        self.async_providers = {
+            "groq": self.groq_fn,
+            "huggingface": self.huggingface_fn,
+            "test": self.test_fn,
+        }
+        self.stream_providers = {
+            "groq": self.groq_stream_fn,
+            "huggingface": self.huggingface_stream_fn,
+        }
+        self.alternates: Dict[tuple, Optional["AsyncProvider"]] = {}
+        self.logger = Logger("provider.log")
+
+    @property
+    def provider_name(self) -> str:
+        return self.provider.provider_name
+
+    @property
+    def model(self) -> str:
+        return self.provider.model
+
+    def supports(self) -> bool:
+        """Whether the active provider has an async path (HuggingFace's async client needs aiohttp)."""
+        if self.provider_name == "huggingface":
+            return importlib.util.find_spec("aiohttp") is not None
+        return self.provider_name in self.async_providers
+
+    def api_key(self) -> str:
+        return self.provider.api_key or self.provider.get_api_key(self.provider_name)
+
+    async def respond(self, history: List[Dict], verbose: bool = False, quota_acquired: bool = False) -> str:
+        """Ask the LLM for a completion; quota_acquired skips taking quota for the first attempt (see Provider.respond)."""
+        start = time.perf_counter()
+        result, error = None, None
+        record = usage_tracker.start(self.provider_name, self.model)
+        token = current_usage.set(record)
+        try:
+            result = await self._respond_with_retries(history, verbose, record, quota_acquired)
+            return result
+        except BaseException as e:
+            error = e
+            if not isinstance(e, asyncio.CancelledError):
+                PROVIDER_ERRORS.inc(provider=self.provider_name, model=self.model, error=type(e).__name__)
+            raise
+        finally:
+            current_usage.reset(token)
+            usage_tracker.finish(record, history, result, error=error,
+                                 outcome="cancelled" if isinstance(error, asyncio.CancelledError) else None)
+            PROVIDER_RESPOND_SECONDS.observe(time.perf_counter() - start, provider=self.provider_name,
+                                             model=self.model, outcome=outcome(result, error))
+
+    def request_params(self) -> Dict:
+        return self.provider.request_params()
+
+    async def cache_get(self, history: List[Dict]):
+        cache = get_response_cache()
+        if cache is None:
+            return None
+        return await asyncio.to_thread(cache.get, self.provider_name, self.model, history, self.request_params())
+
+    async def cache_put(self, history: List[Dict], response: str) -> None:
+        cache = get_response_cache()
+        if cache is not None:
+            await asyncio.to_thread(cache.put, self.provider_name, self.model, history, response, self.request_params())
+
+    async def _respond_with_retries(self, history: List[Dict], verbose: bool, record,
+                                    quota_acquired: bool = False) -> str:
+        llm = self.async_providers[self.provider_name]
+        self.logger.info(f"Using async provider: {self.provider_name}")
+        cached = await self.cache_get(history)
+        if cached is not None:
+            record.cached = True
+            return cached
+        for attempt in range(self.max_retries + 1):
+            record.retries = attempt
+            try:
+                thought = await self._hedged_call(llm, history, verbose, quota_acquired and attempt == 0)
+                await self.cache_put(history, thought)
+                return thought
+            except ConnectionError as e:
+                raise ConnectionError(f"{str(e)}\nKoneksi ke {self.provider.server_ip} gagal.")
+            except ModuleNotFoundError as e:
+                raise ModuleNotFoundError(
+                    f"{str(e)}\nImport terkait provider {self.provider_name} tidak ditemukan. Sudah terinstall?")
+            except Exception as e:
+                action, value = retry_decision(e, attempt, self.max_retries, self.provider_name, self.provider.server_ip)
+                if action == "fallback":
+                    self.logger.warning(f"Kredit habis untuk {self.provider_name}/{self.model}, mencoba model lain...")
+                    record.outcome = "fallback"
+                    if self.provider_name == "huggingface":
+                        fallback = await self._try_huggingface_fallback(history, record)
+                        if fallback is not None:
+                            return fallback
+                    return CREDIT_DEPLETED_ANSWER
+                if action == "answer":
+                    record.outcome = "degraded"
+                    return value
+                if action == "retry" and is_rate_limit_error(e):
+                    wait = rate_limiter.record_rate_limited(self.provider_name, self.model, e, value)
+                    self.logger.info(f"Rate limited, retry attempt {attempt + 1} queued for {wait:.1f}s")
+                    if not rate_limiter.enabled:
+                        # acquire_async() does not wait with the limiter off, so back off here.
+                        await asyncio.sleep(wait)
+                    continue
+                if action == "retry":
+                    self.logger.info(f"Retry attempt {attempt + 1} in {value}s after error: {str(e)}")
+                    await asyncio.sleep(value)
+                    continue
+                raise Exception(f"Provider {self.provider_name} gagal: {str(e)}") from e
+
+    async def respond_stream(self, history: List[Dict], verbose: bool = False) -> AsyncIterator[str]:
+        """
+        Yield the completion as text deltas; falls back to respond() when the provider
+        cannot stream or fails before the first delta.
+        """
+        stream_fn = self.stream_providers.get(self.provider_name)
+        if stream_fn is None:
+            yield await self.respond(history, verbose)
+            return
+        record = usage_tracker.start(self.provider_name, self.model, stream=True)
+        cached = await self.cache_get(history)
+        if cached is not None:
+            record.cached = True
+            usage_tracker.finish(record, history, cached)
+            yield cached
+            return
+        self.logger.info(f"Async streaming from provider: {self.provider_name}")
+        streamed = []
+        try:
+            stream, first = await self._hedged_stream(stream_fn, history, verbose)
+            if first:
+                record.first_byte()
+                streamed.append(first)
+                yield first
+            async for delta in stream:
+                if delta:
+                    streamed.append(delta)
+                    yield delta
+        except (GeneratorExit, asyncio.CancelledError):
+            usage_tracker.finish(record, history, "".join(streamed), outcome="cancelled")
+            raise
+        except Exception as e:
+            if streamed:
+                usage_tracker.finish(record, history, "".join(streamed), error=e)
+                raise Exception(f"Provider {self.provider_name} gagal saat streaming: {str(e)}") from e
+            self.logger.warning(f"Streaming failed, falling back to non-streaming call: {str(e)}")
+            usage_tracker.finish(record, history, error=e, outcome="fallback")
+        else:
+            text = "".join(streamed)
+            await self.cache_put(history, text)
+            usage_tracker.finish(record, history, text)
+            return
+        # The quota taken for the stream covers the call that replaces it.
+        yield await self.respond(history, verbose, quota_acquired=True)
+
+    def alternate(self) -> Optional["AsyncProvider"]:
+        """AsyncProvider for the hedge target of the current provider/model, or None."""
+        defaults = [("huggingface", m) for m in HUGGINGFACE_FREE_MODELS] if self.provider_name == "huggingface" else []
+        target = hedge_policy.alternate_for(self.provider_name, self.model, defaults)
+        if target is None:
+            return None
+        if target not in self.alternates:
+            try:
+                provider = Provider(target[0], target[1], self.provider.server_address, self.provider.is_local)
+                self.alternates[target] = AsyncProvider(provider, max_retries=0)
+            except Exception as e:
+                self.logger.warning(f"Hedge target {target[0]}/{target[1]} tidak tersedia: {str(e)}")
+                self.alternates[target] = None
+        alternate = self.alternates[target]
+        return alternate if alternate is not None and alternate.supports() else None
+
+    async def limited(self, call, history: List[Dict], quota_acquired: bool = False):
+        """Await provider quota for this provider/model, then the call."""
+        if not quota_acquired:
+            await rate_limiter.acquire_async(self.provider_name, self.model, estimate_tokens(history))
+        return await call()
+
+    async def _hedged_call(self, llm, history: List[Dict], verbose: bool, quota_acquired: bool = False) -> str:
+        """One attempt at llm(), raced against the alternate model if it runs past the observed p90."""
+        alternate = self.alternate()
+        hedge = None
+        if alternate is not None:
+            alternate_fn = alternate.async_providers[alternate.provider_name]
+            hedge = lambda: alternate.limited(lambda: alternate_fn(history, False), history)
+        return await hedge_policy.race(self.provider_name, self.model, "response",
+                                       lambda: self.limited(lambda: llm(history, verbose), history, quota_acquired),
+                                       hedge)
+
+    async def _hedged_stream(self, stream_fn, history: List[Dict], verbose: bool) -> Tuple[AsyncIterator[str], str]:
+        """Open the stream and wait for its first delta, hedging on time to first token."""
+        alternate = self.alternate()
+        hedge = None
+        if alternate is not None and alternate.provider_name in alternate.stream_providers:
+            alternate_fn = alternate.stream_providers[alternate.provider_name]
+            hedge = lambda: alternate.limited(lambda: open_stream(alternate_fn, history, False), history)
+        return await hedge_policy.race(self.provider_name, self.model, "first_token",
+                                       lambda: self.limited(lambda: open_stream(stream_fn, history, verbose), history),
+                                       hedge, discard=lambda opened: opened[0].aclose())
+
+    async def _try_huggingface_fallback(self, history: List[Dict], record):
+        """Answer this one call with another free model without switching the shared provider's model."""
+        client = client_pool.async_huggingface(self.api_key())
+        for model in [m for m in HUGGINGFACE_FREE_MODELS if m != self.model]:
+            try:
+                self.logger.info(f"Mencoba fallback model: {model}")
+                await rate_limiter.acquire_async(self.provider_name, model, estimate_tokens(history))
+                completion = await client.chat.completions.create(model=model, messages=history, max_tokens=4096)
+                note_usage(getattr(completion, "usage", None))
+                self.logger.info(f"Fallback model {model} berhasil!")
+                record.model = model
+                return completion.choices[0].message.content
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"Fallback model {model} gagal: {str(e)}")
+        return None
+
+    async def groq_fn(self, history: List[Dict], verbose: bool = False) -> str:
+        client = client_pool.async_openai(self.api_key(), GROQ_BASE_URL)
+        try:
+            raw = await client.chat.completions.with_raw_response.create(model=self.model, messages=history)
+            rate_limiter.record_response(self.provider_name, self.model, raw.headers)
+            response = raw.parse()
+            if response is None:
+                raise Exception("Groq response kosong.")
+            note_usage(response.usage)
+            thought = response.choices[0].message.content
+            if verbose:
+                print(thought)
+            return thought
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            raise Exception(f"Groq API error: {str(e)}") from e
+
+    async def groq_stream_fn(self, history: List[Dict], verbose: bool = False) -> AsyncIterator[str]:
+        client = client_pool.async_openai(self.api_key(), GROQ_BASE_URL)
+        raw = await client.chat.completions.with_raw_response.create(model=self.model, messages=history, stream=True)
+        rate_limiter.record_response(self.provider_name, self.model, raw.headers)
+        async for chunk in raw.parse():
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if verbose:
+                    print(delta, end="", flush=True)
+                yield delta
+
+    async def huggingface_fn(self, history: List[Dict], verbose: bool = False) -> str:
+        client = client_pool.async_huggingface(self.api_key())
+        completion = await client.chat.completions.create(model=self.model, messages=history, max_tokens=4096)
+        note_usage(getattr(completion, "usage", None))
+        return completion.choices[0].message.content
+
+    async def huggingface_stream_fn(self, history: List[Dict], verbose: bool = False) -> AsyncIterator[str]:
+        client = client_pool.async_huggingface(self.api_key())
+        stream = await client.chat.completions.create(model=self.model, messages=history,
+                                                      max_tokens=4096, stream=True)
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+    async def test_fn(self, history: List[Dict], verbose: bool = False) -> str:
+        return self.provider.test_fn(history, verbose)
@@ -24,11 +24,13 @@ import tempfile
 import markdownify
 import sys
 import re
+import asyncio
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sources.utility import pretty_print, animate_thinking
 from sources.logger import Logger
+from sources.metrics import timed, outcome, BROWSER_NAVIGATION_SECONDS
 
 
 def get_chrome_path() -> str:
@@ -267,6 +269,7 @@ class Browser:
         self.logger = Logger("browser.log")
         self.screenshot_folder = os.path.join(os.getcwd(), ".screenshots")
         self.tabs = []
+        self.session_lock = asyncio.Lock()
         try:
             self.driver = driver
             self.wait = WebDriverWait(self.driver, 10)
@@ -319,6 +322,7 @@ class Browser:
         script = self.load_js("spoofing.js")
         self.driver.execute_script(script)
     
+    @timed(BROWSER_NAVIGATION_SECONDS, lambda args, result, error: {"outcome": outcome(result, error)})
     def go_to(self, url:str) -> bool:
         """Navigate to a specified URL."""
         time.sleep(random.uniform(0.4, 2.5))
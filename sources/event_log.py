@@ -0,0 +1,95 @@
+import uuid
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+# High-volume or connection-local messages that a reconnecting client does not need replayed;
+# streamed tokens are recovered from /latest_answer instead.
+UNLOGGED_TYPES = {"token", "pong", "hello", "resync"}
+GLOBAL_STREAM = ""
+
+
+class EventLog:
+    """
+    Sequence numbers for realtime messages and a bounded replay buffer per session.
+    Messages without a session_id go to a global stream that every session replays.
+    The epoch changes on every server start so clients can tell a restart from a gap.
+    """
+    def __init__(self, max_per_session: int = 500, max_sessions: int = 64):
+        self.max_per_session = max_per_session
+        self.max_sessions = max_sessions
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.streams: "OrderedDict[str, Deque[Tuple[int, Dict]]]" = OrderedDict()
+        self.evicted_upto: Dict[str, int] = {}
+        self.dropped_upto = 0
+        self.lock = threading.Lock()
+
+    def append(self, message: Dict) -> int:
+        """Stamp message with the next sequence number (in place) and retain it for replay."""
+        with self.lock:
+            self.seq += 1
+            message["seq"] = self.seq
+            if message.get("type") in UNLOGGED_TYPES:
+                return self.seq
+            stream_id = message.get("session_id") or GLOBAL_STREAM
+            stream = self.streams.get(stream_id)
+            if stream is None:
+                stream = self.streams[stream_id] = deque()
+                self._evict_streams()
+            else:
+                self.streams.move_to_end(stream_id)
+            stream.append((self.seq, message))
+            if len(stream) > self.max_per_session:
+                evicted_seq, _ = stream.popleft()
+                self.evicted_upto[stream_id] = evicted_seq
+            return self.seq
+
+    def _evict_streams(self) -> None:
+        while len(self.streams) > self.max_sessions:
+            for stream_id in self.streams:
+                if stream_id != GLOBAL_STREAM:
+                    stream = self.streams.pop(stream_id)
+                    self.evicted_upto.pop(stream_id, None)
+                    if stream:
+                        self.dropped_upto = max(self.dropped_upto, stream[-1][0])
+                    break
+            else:
+                return
+
+    def since(self, seq: int, session_ids: Iterable[str] = (), every_session: bool = False) -> Optional[List[Dict]]:
+        """
+        Messages after seq for the sessions (plus global ones) in sequence order,
+        or None when some of them are no longer retained and the client must resync.
+        """
+        with self.lock:
+            if seq > self.seq:
+                return None
+            if every_session:
+                if seq < self.dropped_upto:
+                    return None
+                stream_ids = list(self.streams.keys())
+            else:
+                stream_ids = [GLOBAL_STREAM] + [sid for sid in session_ids if sid and sid != GLOBAL_STREAM]
+            events = []
+            for stream_id in stream_ids:
+                if self.evicted_upto.get(stream_id, 0) > seq:
+                    return None
+                stream = self.streams.get(stream_id)
+                if stream is None:
+                    # The session's whole stream may have been evicted to make room for others.
+                    if stream_id != GLOBAL_STREAM and seq < self.dropped_upto:
+                        return None
+                    continue
+                events.extend(message for message_seq, message in stream if message_seq > seq)
+        events.sort(key=lambda message: message["seq"])
+        return events
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {
+                "epoch": self.epoch,
+                "seq": self.seq,
+                "streams": len(self.streams),
+                "retained": sum(len(stream) for stream in self.streams.values()),
+            }
@@ -0,0 +1,429 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import hashlib
+import threading
+import ctypes
+import ctypes.util
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from sources.logger import Logger
+from sources.metrics import timed, FILE_SCAN_SECONDS, FILES_SCANNED
+
+SKIP_DIRS = {'__pycache__', 'node_modules', '.git', '.cache', '.venv', 'venv'}
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+@dataclass
+class FileEntry:
+    path: str
+    size: int
+    mtime: float
+    sha1: Optional[str] = None
+
+    def jsonify(self) -> Dict:
+        return {"name": self.path, "size": self.size, "mtime": self.mtime}
+
+
+class InotifyWatcher:
+    """
+    Minimal inotify binding through ctypes (Linux only).
+    """
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or libc_name is None:
+            raise OSError("inotify is not available on this platform")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str) -> int:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def remove_watch(self, wd: int) -> None:
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self) -> List[Tuple[int, int, str]]:
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self) -> None:
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class FileIndex:
+    """
+    In-memory index of a directory tree: relative path -> size/mtime/hash,
+    with secondary indexes by extension and basename.
+    Kept current by inotify, or by a rescan at most every poll_interval seconds when inotify is unavailable.
+    """
+    def __init__(self, root: str, skip_dirs: Set[str] = None,
+                 poll_interval: float = 1.0, use_inotify: bool = True,
+                 max_changes: int = 10000):
+        self.root = os.path.abspath(root)
+        self.skip_dirs = skip_dirs if skip_dirs is not None else SKIP_DIRS
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.logger = Logger("file_index.log")
+        self.entries: Dict[str, FileEntry] = {}
+        self.by_ext: Dict[str, Set[str]] = {}
+        self.by_name: Dict[str, Set[str]] = {}
+        self.version = 0
+        self.changes = deque(maxlen=max_changes)
+        self.lock = threading.RLock()
+        self.watcher: Optional[InotifyWatcher] = None
+        self.watch_dirs: Dict[int, str] = {}
+        self.last_scan = 0.0
+        self.started = False
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def start(self) -> None:
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+            if self.use_inotify:
+                try:
+                    self.watcher = InotifyWatcher()
+                except OSError as e:
+                    self.logger.warning(f"inotify unavailable, using polling: {e}")
+                    self.watcher = None
+            self.rescan()
+        if self.watcher is not None:
+            self.thread = threading.Thread(target=self._watch_loop, daemon=True)
+            self.thread.start()
+            self.logger.info(f"File index watching {self.root} with inotify ({len(self.watch_dirs)} dirs)")
+        else:
+            self.logger.info(f"File index polling {self.root} every {self.poll_interval}s")
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
+        self.started = False
+
+    @property
+    def is_watching(self) -> bool:
+        return self.watcher is not None
+
+    def _skip(self, name: str) -> bool:
+        return name in self.skip_dirs
+
+    def _rel(self, abs_path: str) -> str:
+        return os.path.relpath(abs_path, self.root)
+
+    def _record(self, action: str, rel: str) -> None:
+        self.version += 1
+        self.changes.append((self.version, action, rel))
+
+    def _put(self, rel: str, st: os.stat_result) -> None:
+        old = self.entries.get(rel)
+        if old is not None and old.size == st.st_size and old.mtime == st.st_mtime:
+            return
+        self.entries[rel] = FileEntry(rel, st.st_size, st.st_mtime)
+        if old is None:
+            name = os.path.basename(rel)
+            ext = os.path.splitext(name)[1].lower()
+            self.by_ext.setdefault(ext, set()).add(rel)
+            self.by_name.setdefault(name, set()).add(rel)
+            self._record("create", rel)
+        else:
+            self._record("modify", rel)
+
+    def _drop(self, rel: str) -> None:
+        if self.entries.pop(rel, None) is None:
+            return
+        name = os.path.basename(rel)
+        ext = os.path.splitext(name)[1].lower()
+        for table, key in ((self.by_ext, ext), (self.by_name, name)):
+            paths = table.get(key)
+            if paths is not None:
+                paths.discard(rel)
+                if not paths:
+                    del table[key]
+        self._record("delete", rel)
+
+    def _drop_tree(self, rel_dir: str) -> None:
+        prefix = rel_dir + os.sep
+        for rel in [p for p in self.entries if p.startswith(prefix)]:
+            self._drop(rel)
+        for wd, path in list(self.watch_dirs.items()):
+            if path == rel_dir or path.startswith(prefix):
+                del self.watch_dirs[wd]
+
+    def _add_watch(self, abs_dir: str) -> None:
+        if self.watcher is None:
+            return
+        try:
+            wd = self.watcher.add_watch(abs_dir)
+            rel = self._rel(abs_dir)
+            self.watch_dirs[wd] = "" if rel == "." else rel
+        except OSError as e:
+            self.logger.warning(f"Cannot watch {abs_dir} ({e}), falling back to polling")
+            self.watcher.close()
+            self.watcher = None
+            self.watch_dirs = {}
+
+    def _scan_tree(self, abs_dir: str, seen: Optional[Set[str]] = None) -> None:
+        if not os.path.isdir(abs_dir):
+            return
+        self._add_watch(abs_dir)
+        for root, dirs, files in os.walk(abs_dir):
+            dirs[:] = [d for d in dirs if not self._skip(d)]
+            for d in dirs:
+                self._add_watch(os.path.join(root, d))
+            for fname in files:
+                abs_path = os.path.join(root, fname)
+                try:
+                    st = os.stat(abs_path)
+                except OSError:
+                    continue
+                rel = self._rel(abs_path)
+                if seen is not None:
+                    seen.add(rel)
+                self._put(rel, st)
+
+    @timed(FILE_SCAN_SECONDS, lambda args, result, error: {"scanner": "file_index"})
+    def rescan(self) -> None:
+        """Full rescan of the tree; removed files are dropped from the index."""
+        with self.lock:
+            seen = set()
+            self.watch_dirs = {}
+            self._scan_tree(self.root, seen)
+            for rel in [p for p in self.entries if p not in seen]:
+                self._drop(rel)
+            self.last_scan = time.time()
+        FILES_SCANNED.inc(len(seen), scanner="file_index")
+
+    def _apply_event(self, wd: int, mask: int, name: str) -> None:
+        if mask & IN_Q_OVERFLOW:
+            self.logger.warning("inotify queue overflow, rescanning")
+            self.rescan()
+            return
+        parent = self.watch_dirs.get(wd)
+        if parent is None:
+            return
+        if mask & IN_IGNORED or (mask & (IN_DELETE_SELF | IN_MOVE_SELF) and not name):
+            self.watch_dirs.pop(wd, None)
+            if parent == "":
+                self.logger.warning("Index root removed or moved, rescanning")
+                self.rescan()
+            return
+        rel = os.path.join(parent, name) if parent else name
+        abs_path = os.path.join(self.root, rel)
+        if mask & IN_ISDIR:
+            if self._skip(name):
+                return
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._scan_tree(abs_path)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._drop_tree(rel)
+            return
+        if mask & (IN_DELETE | IN_MOVED_FROM):
+            self._drop(rel)
+            return
+        try:
+            st = os.stat(abs_path)
+        except OSError:
+            self._drop(rel)
+            return
+        self._put(rel, st)
+
+    def sync(self, force: bool = False) -> None:
+        """
+        Bring the index up to date: apply pending inotify events, or rescan when polling.
+        Args:
+            force (bool): When polling, rescan even if the last scan is recent.
+        """
+        if not self.started:
+            self.start()
+        with self.lock:
+            if self.watcher is None:
+                if force or time.time() - self.last_scan >= self.poll_interval:
+                    self.rescan()
+                return
+            while True:
+                events = self.watcher.read_events()
+                if not events:
+                    break
+                for wd, mask, name in events:
+                    self._apply_event(wd, mask, name)
+                    if self.watcher is None:
+                        self.rescan()
+                        return
+
+    def _watch_loop(self) -> None:
+        while not self.stop_event.is_set():
+            watcher = self.watcher
+            if watcher is None:
+                return
+            try:
+                ready, _, _ = select.select([watcher.fd], [], [], 0.5)
+            except (OSError, ValueError):
+                return
+            if ready:
+                try:
+                    self.sync()
+                except Exception as e:
+                    self.logger.error(f"File index update failed: {e}")
+
+    def files(self, prefix: str = "") -> List[FileEntry]:
+        self.sync()
+        with self.lock:
+            if not prefix or prefix == ".":
+                entries = list(self.entries.values())
+            else:
+                start = prefix.rstrip(os.sep) + os.sep
+                entries = [e for p, e in self.entries.items() if p.startswith(start)]
+        return sorted(entries, key=lambda e: e.path)
+
+    def paths(self, prefix: str = "") -> List[str]:
+        return [e.path for e in self.files(prefix)]
+
+    def get(self, rel: str) -> Optional[FileEntry]:
+        self.sync()
+        with self.lock:
+            return self.entries.get(os.path.normpath(rel))
+
+    def by_extension(self, ext: str) -> List[str]:
+        self.sync()
+        with self.lock:
+            return sorted(self.by_ext.get(ext.lower(), ()))
+
+    def by_basename(self, name: str) -> List[str]:
+        self.sync()
+        with self.lock:
+            return sorted(self.by_name.get(name, ()))
+
+    def find(self, fragment: str, prefix: str = "", excluded: List[str] = None) -> Optional[str]:
+        """Return the first indexed path under prefix whose basename contains the fragment (exact basename first)."""
+        fragment = fragment.strip()
+        start = prefix.rstrip(os.sep) + os.sep if prefix else ""
+        excluded = excluded or []
+        exact = [p for p in self.by_basename(fragment) if p.startswith(start)]
+        if exact:
+            return exact[0]
+        with self.lock:
+            for name in sorted(self.by_name):
+                if any(ex in name for ex in excluded):
+                    continue
+                if fragment in name.strip():
+                    paths = sorted(p for p in self.by_name[name] if p.startswith(start))
+                    if paths:
+                        return paths[0]
+        return None
+
+    def has_files(self) -> bool:
+        self.sync()
+        with self.lock:
+            return len(self.entries) > 0
+
+    def file_hash(self, rel: str) -> Optional[str]:
+        """SHA-1 of a file, computed lazily and cached until its size or mtime changes."""
+        entry = self.get(rel)
+        if entry is None:
+            return None
+        if entry.sha1 is None:
+            digest = hashlib.sha1()
+            try:
+                with open(os.path.join(self.root, entry.path), 'rb') as f:
+                    for chunk in iter(lambda: f.read(65536), b""):
+                        digest.update(chunk)
+            except OSError:
+                return None
+            entry.sha1 = digest.hexdigest()
+        return entry.sha1
+
+    def changes_since(self, version: int) -> Tuple[int, Optional[List[Tuple[str, str]]]]:
+        """
+        Return the current version and the (action, path) changes after `version`.
+        The change list is None when the requested version fell out of the change log.
+        """
+        self.sync()
+        with self.lock:
+            if version >= self.version:
+                return self.version, []
+            if not self.changes or self.changes[0][0] > version + 1:
+                return self.version, None
+            latest = {}
+            for v, action, rel in self.changes:
+                if v <= version:
+                    continue
+                if action == "modify" and latest.get(rel) == "create":
+                    continue
+                latest[rel] = action
+            return self.version, [(action, rel) for rel, action in latest.items()]
+
+
+_indexes: Dict[str, FileIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_file_index(root: str) -> FileIndex:
+    """Return the shared, started index for a root directory."""
+    root = os.path.abspath(root)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = FileIndex(root)
+            _indexes[root] = index
+    index.start()
+    return index
+
+def find_file_index(path: str) -> Optional[Tuple[FileIndex, str]]:
+    """Return the shared index covering a path and the path relative to its root, if any."""
+    path = os.path.abspath(path)
+    with _indexes_lock:
+        candidates = list(_indexes.values())
+    for index in candidates:
+        if path == index.root or path.startswith(index.root + os.sep):
+            rel = os.path.relpath(path, index.root)
+            return index, "" if rel == "." else rel
+    return None
@@ -0,0 +1,212 @@
+import os
+import mmap
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+LINE_CHECKPOINT_EVERY = 1024
+# Upper bounds of one page served by /api/file-content.
+MAX_PAGE_BYTES = 100000
+MAX_PAGE_LINES = 5000
+
+
+def file_etag(st: os.stat_result) -> str:
+    """
+    Strong validator built from mtime (ns) and size.
+    """
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Weak comparison as required for If-None-Match.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single 'bytes=' range into an inclusive (start, end) pair.
+    Returns None when the header is absent or should be ignored (multiple ranges, other units).
+    Raises ValueError when the range is not satisfiable.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_s, sep, end_s = spec.strip().partition("-")
+    if not sep or not (start_s or end_s) or not all(p.isdigit() for p in (start_s, end_s) if p):
+        return None
+    if start_s == "":
+        start, end = max(size - int(end_s), 0), size - 1
+        if int(end_s) == 0:
+            raise ValueError(f"Range not satisfiable: {header}")
+    else:
+        start = int(start_s)
+        end = int(end_s) if end_s else size - 1
+    if start < 0 or start > end or start >= size:
+        raise ValueError(f"Range not satisfiable: {header}")
+    return start, min(end, size - 1)
+
+
+def read_bytes(path: str, offset: int, length: int) -> bytes:
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return f.read(length)
+
+
+def iter_bytes(path: str, start: int, end: int, chunk_size: int = 64 * 1024):
+    """
+    Yield the inclusive byte range [start, end] of a file in chunks.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def utf8_boundary(data: bytes) -> int:
+    """
+    Length of the longest prefix of data that does not end inside a UTF-8 sequence.
+    """
+    end = len(data)
+    for back in range(1, min(4, end) + 1):
+        byte = data[end - back]
+        if byte & 0xC0 == 0x80:
+            continue
+        if byte & 0x80 == 0:
+            return end
+        needed = 2 if byte & 0xE0 == 0xC0 else 3 if byte & 0xF0 == 0xE0 else 4
+        return end if back >= needed else end - back
+    return end
+
+
+@dataclass
+class TextPage:
+    content: str
+    offset: int
+    next_offset: int
+    size: int
+
+    @property
+    def eof(self) -> bool:
+        return self.next_offset >= self.size
+
+
+@dataclass
+class LinePage:
+    content: str
+    start_line: int
+    line_count: int
+    next_line: Optional[int]
+    eof: bool
+    # Set when a line longer than max_bytes was cut: the byte offset its remainder starts at.
+    next_offset: Optional[int] = None
+
+
+def read_text_page(path: str, offset: int = 0, length: int = MAX_PAGE_BYTES) -> TextPage:
+    """
+    Read at most length bytes of text starting at offset without loading the whole file.
+    The page never ends inside a multibyte character.
+    """
+    size = os.path.getsize(path)
+    offset = max(0, min(offset, size))
+    data = read_bytes(path, offset, max(0, length))
+    if offset + len(data) < size:
+        cut = utf8_boundary(data)
+        data = data[:cut] if cut > 0 else data
+    return TextPage(data.decode('utf-8', errors='replace'), offset, offset + len(data), size)
+
+
+class LineIndex:
+    """
+    Sparse line offsets (every LINE_CHECKPOINT_EVERY lines) per file version, kept in a small LRU,
+    so line-based paging deep into a large file does not rescan it from the start.
+    """
+    def __init__(self, max_files: int = 64):
+        self.max_files = max_files
+        self.checkpoints: "OrderedDict[Tuple[str, int, int], List[int]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _get(self, key: Tuple[str, int, int]) -> List[int]:
+        with self.lock:
+            points = self.checkpoints.get(key)
+            if points is None:
+                stale = [k for k in self.checkpoints if k[0] == key[0]]
+                for k in stale:
+                    del self.checkpoints[k]
+                points = [0]
+                self.checkpoints[key] = points
+                while len(self.checkpoints) > self.max_files:
+                    self.checkpoints.popitem(last=False)
+            else:
+                self.checkpoints.move_to_end(key)
+            return points
+
+    def read_lines(self, path: str, start_line: int = 0, max_lines: int = 500,
+                   max_bytes: Optional[int] = None) -> LinePage:
+        """
+        Read up to max_lines lines from start_line. With max_bytes the page stops at the last line
+        that fits; a single longer line is cut at max_bytes and the page has no next_line but a
+        next_offset, so the rest of the line is read by byte offset.
+        """
+        st = os.stat(path)
+        start_line = max(0, start_line)
+        if st.st_size == 0:
+            return LinePage("", start_line, 0, start_line, True)
+        points = self._get((path, st.st_mtime_ns, st.st_size))
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with self.lock:
+                idx = min(start_line // LINE_CHECKPOINT_EVERY, len(points) - 1)
+                pos = points[idx]
+                line = idx * LINE_CHECKPOINT_EVERY
+            while line < start_line and pos < st.st_size:
+                nl = mm.find(b"\n", pos)
+                pos = st.st_size if nl < 0 else nl + 1
+                line += 1
+                if line % LINE_CHECKPOINT_EVERY == 0:
+                    with self.lock:
+                        if line // LINE_CHECKPOINT_EVERY == len(points):
+                            points.append(pos)
+            begin = pos
+            count = 0
+            end = begin
+            while count < max_lines and pos < st.st_size:
+                nl = mm.find(b"\n", pos)
+                next_pos = st.st_size if nl < 0 else nl + 1
+                if max_bytes is not None and next_pos - begin > max_bytes:
+                    if count == 0:
+                        data = mm[begin:begin + max_bytes]
+                        end = begin + (utf8_boundary(data) or max_bytes)
+                        content = mm[begin:end].decode('utf-8', errors='replace')
+                        return LinePage(content, start_line, 0, None, False, next_offset=end)
+                    break
+                pos = end = next_pos
+                count += 1
+            content = mm[begin:end].decode('utf-8', errors='replace')
+        return LinePage(content, start_line, count, start_line + count, pos >= st.st_size)
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {"files": len(self.checkpoints)}
+
+
+line_index = LineIndex()
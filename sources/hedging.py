@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+from sources.logger import Logger
+from sources.metrics import LLM_HEDGES
+
+
+def parse_alternates(value: str) -> List[Tuple[str, str]]:
+    """'groq:llama-3.1-8b-instant, huggingface:Qwen/Qwen2.5-72B-Instruct' -> [(provider, model), ...]"""
+    alternates = []
+    for item in (value or "").split(","):
+        provider, sep, model = item.strip().partition(":")
+        if sep and provider and model:
+            alternates.append((provider.strip().lower(), model.strip()))
+    return alternates
+
+
+@dataclass
+class HedgeConfig:
+    enabled: bool = True
+    quantile: float = 0.9
+    min_samples: int = 20
+    default_delay: float = 8.0
+    min_delay: float = 0.5
+    budget_ratio: float = 0.1
+    budget_burst: float = 2.0
+    alternates: List[Tuple[str, str]] = field(default_factory=list)
+
+
+class LatencyTracker:
+    """Rolling window of single-attempt latencies per (provider, model, kind)."""
+    def __init__(self, window: int = 200):
+        self.window = window
+        self.samples: Dict[Tuple[str, str, str], Deque[float]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, provider: str, model: str, kind: str, seconds: float) -> None:
+        with self.lock:
+            samples = self.samples.get((provider, model, kind))
+            if samples is None:
+                samples = self.samples[(provider, model, kind)] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def quantile(self, provider: str, model: str, kind: str, q: float, min_samples: int = 1) -> Optional[float]:
+        with self.lock:
+            samples = sorted(self.samples.get((provider, model, kind), ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+class HedgeBudget:
+    """
+    Every primary request earns `ratio` of a hedge token (up to `burst`) and every hedge spends one,
+    so hedges add at most ratio * requests (+ burst) to the provider's load.
+    """
+    def __init__(self, ratio: float = 0.1, burst: float = 2.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self.lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self.lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        with self.lock:
+            if self.tokens < 1.0:
+                return False
+            self.tokens -= 1.0
+            return True
+
+
+class HedgePolicy:
+    """
+    Decides when and where to send a backup request: after the primary's observed p90
+    (default_delay until min_samples calls were seen), to the first configured alternate
+    that differs from the primary, within the hedge budget.
+    """
+    def __init__(self, config: HedgeConfig = None):
+        self.config = config or HedgeConfig()
+        self.tracker = LatencyTracker()
+        self.budget = HedgeBudget(self.config.budget_ratio, self.config.budget_burst)
+        self.stats = {"requests": 0, "hedged": 0, "won": 0, "over_budget": 0}
+        self.logger = Logger("hedging.log")
+
+    def configure(self, **settings) -> None:
+        for name, value in settings.items():
+            if not hasattr(self.config, name):
+                raise ValueError(f"Unknown hedging setting: {name}")
+            setattr(self.config, name, value)
+        self.budget = HedgeBudget(self.config.budget_ratio, self.config.budget_burst)
+
+    def delay(self, provider: str, model: str, kind: str) -> float:
+        observed = self.tracker.quantile(provider, model, kind, self.config.quantile, self.config.min_samples)
+        return max(self.config.min_delay, observed if observed is not None else self.config.default_delay)
+
+    def alternate_for(self, provider: str, model: str,
+                      defaults: Iterable[Tuple[str, str]] = ()) -> Optional[Tuple[str, str]]:
+        if not self.config.enabled:
+            return None
+        for candidate in list(self.config.alternates) + list(defaults):
+            if candidate != (provider, model):
+                return candidate
+        return None
+
+    async def race(self, provider: str, model: str, kind: str,
+                   primary: Callable[[], Awaitable], hedge: Optional[Callable[[], Awaitable]] = None,
+                   discard: Optional[Callable[[object], Awaitable]] = None):
+        """
+        Await primary(); if it has not finished after delay(), also start hedge() and return
+        whichever succeeds first, cancelling the other. A result that loses a tie is passed to
+        discard() (e.g. to close a stream). Raises the primary's error when both fail.
+        """
+        self.stats["requests"] += 1
+        self.budget.record_request()
+        start = time.perf_counter()
+        primary_task = asyncio.ensure_future(primary())
+        hedge_task = None
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=self.delay(provider, model, kind))
+            if not done and hedge is not None:
+                if self.budget.try_acquire():
+                    self.stats["hedged"] += 1
+                    self.logger.info(f"Hedging {provider}/{model} {kind} after {time.perf_counter() - start:.2f}s")
+                    hedge_task = asyncio.ensure_future(hedge())
+                else:
+                    self.stats["over_budget"] += 1
+                    LLM_HEDGES.inc(provider=provider, outcome="over_budget")
+            if hedge_task is None:
+                result = await primary_task
+                self.tracker.observe(provider, model, kind, time.perf_counter() - start)
+                return result
+            winner = await self._first_success([primary_task, hedge_task], discard)
+            # When the hedge wins, the primary's elapsed time is only a lower bound, but recording
+            # it keeps the quantile from drifting down and triggering ever earlier hedges.
+            self.tracker.observe(provider, model, kind, time.perf_counter() - start)
+            if winner is None:
+                LLM_HEDGES.inc(provider=provider, outcome="failed")
+                return primary_task.result()
+            if winner is hedge_task:
+                self.stats["won"] += 1
+            LLM_HEDGES.inc(provider=provider, outcome="won" if winner is hedge_task else "lost")
+            return winner.result()
+        finally:
+            for task in (primary_task, hedge_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    @staticmethod
+    async def _first_success(tasks: List[asyncio.Task], discard=None) -> Optional[asyncio.Task]:
+        """The first task (in priority order on ties) to finish without error, or None if all fail."""
+        pending = set(tasks)
+        winner = None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in tasks:
+                if task not in done or task.exception() is not None:
+                    continue
+                if winner is None:
+                    winner = task
+                elif discard is not None:
+                    await discard(task.result())
+        return winner
+
+    def get_stats(self) -> Dict:
+        config = asdict(self.config)
+        config["alternates"] = [f"{p}:{m}" for p, m in self.config.alternates]
+        return {**self.stats, "budget_tokens": round(self.budget.tokens, 2), "config": config}
+
+
+hedge_policy = HedgePolicy()
@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import threading
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Tuple
+from sources.logger import Logger
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+
+@dataclass
+class HttpPoolConfig:
+    max_connections: int = 20
+    max_keepalive: int = 10
+    keepalive_expiry: float = 60.0
+    connect_timeout: float = 10.0
+    read_timeout: float = 120.0
+    http2: bool = True
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class ProviderClientPool:
+    """
+    Long-lived SDK clients per (provider, base_url, api key), each backed by a keep-alive
+    connection pool, so LLM calls reuse TCP/TLS connections instead of handshaking every time.
+    Clients are thread-safe and shared by every Provider instance and model of a provider.
+    """
+    def __init__(self, config: HttpPoolConfig = None):
+        self.config = config or HttpPoolConfig()
+        self.clients: Dict[Tuple[str, str, str], Any] = {}
+        self.lock = threading.Lock()
+        self.stats = {"created": 0, "reused": 0}
+        self.hf_backend_configured = False
+        self.logger = Logger("http_clients.log")
+
+    def configure(self, **settings) -> None:
+        """Update pool settings; cached clients are closed so the next call picks them up."""
+        for name, value in settings.items():
+            if not hasattr(self.config, name):
+                raise ValueError(f"Unknown HTTP pool setting: {name}")
+            setattr(self.config, name, value)
+        self.hf_backend_configured = False
+        self.close()
+
+    @staticmethod
+    def _key(kind: str, base_url: str, api_key: str) -> Tuple[str, str, str]:
+        fingerprint = hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+        return kind, base_url or "", fingerprint
+
+    def get(self, kind: str, base_url: str, api_key: str, factory: Callable[[], Any]) -> Any:
+        key = self._key(kind, base_url, api_key)
+        with self.lock:
+            client = self.clients.get(key)
+            if client is not None:
+                self.stats["reused"] += 1
+                return client
+        client = factory()
+        with self.lock:
+            existing = self.clients.setdefault(key, client)
+            if existing is client:
+                self.stats["created"] += 1
+                self.logger.info(f"Created {kind} client for {base_url or 'default endpoint'}")
+            else:
+                self.stats["reused"] += 1
+        if existing is not client:
+            self._close_client(client)
+        return existing
+
+    def openai(self, api_key: str, base_url: str = GROQ_BASE_URL):
+        def factory():
+            from openai import OpenAI
+            return OpenAI(api_key=api_key, base_url=base_url, http_client=self._httpx_client())
+        return self.get("openai", base_url, api_key, factory)
+
+    def huggingface(self, api_key: str):
+        def factory():
+            from huggingface_hub import InferenceClient
+            self._configure_hf_backend()
+            return InferenceClient(api_key=api_key, timeout=self.config.read_timeout)
+        return self.get("huggingface", "", api_key, factory)
+
+    def async_openai(self, api_key: str, base_url: str = GROQ_BASE_URL):
+        """AsyncOpenAI client for the running event loop (async pools cannot cross loops)."""
+        def factory():
+            from openai import AsyncOpenAI
+            return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=self._httpx_client(asynchronous=True))
+        return self.get(f"openai-async@{id(asyncio.get_running_loop()):x}", base_url, api_key, factory)
+
+    def async_huggingface(self, api_key: str):
+        def factory():
+            from huggingface_hub import AsyncInferenceClient
+            return AsyncInferenceClient(api_key=api_key, timeout=self.config.read_timeout)
+        return self.get(f"huggingface-async@{id(asyncio.get_running_loop()):x}", "", api_key, factory)
+
+    def _httpx_client(self, asynchronous: bool = False):
+        import httpx
+        http2 = self.config.http2 and http2_available()
+        if self.config.http2 and not http2:
+            self.logger.warning("HTTP/2 requested but the h2 package is missing; using HTTP/1.1 keep-alive.")
+        client_class = httpx.AsyncClient if asynchronous else httpx.Client
+        return client_class(
+            http2=http2,
+            limits=httpx.Limits(max_connections=self.config.max_connections,
+                                max_keepalive_connections=self.config.max_keepalive,
+                                keepalive_expiry=self.config.keepalive_expiry),
+            timeout=httpx.Timeout(self.config.read_timeout, connect=self.config.connect_timeout),
+        )
+
+    def _configure_hf_backend(self) -> None:
+        """huggingface_hub sends through requests sessions; give them pools sized like ours."""
+        if self.hf_backend_configured:
+            return
+        try:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from huggingface_hub import configure_http_backend
+        except ImportError:
+            return
+        config = self.config
+
+        def backend_factory():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=config.max_keepalive, pool_maxsize=config.max_connections)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            return session
+
+        configure_http_backend(backend_factory=backend_factory)
+        self.hf_backend_configured = True
+
+    @staticmethod
+    def _close_client(client: Any) -> None:
+        close = getattr(client, "close", None)
+        if not callable(close):
+            return
+        try:
+            result = close()
+        except Exception:
+            return
+        if asyncio.iscoroutine(result):
+            try:
+                asyncio.get_running_loop().create_task(result)
+            except RuntimeError:
+                result.close()
+
+    def close(self) -> None:
+        with self.lock:
+            clients, self.clients = list(self.clients.values()), {}
+        for client in clients:
+            self._close_client(client)
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            cached = [f"{kind}:{base_url}" if base_url else kind for kind, base_url, _ in self.clients]
+        return {**self.stats, "cached": cached, "http2": self.config.http2 and http2_available(),
+                "config": asdict(self.config)}
+
+
+client_pool = ProviderClientPool()
@@ -2,6 +2,7 @@ try:
     import readline
 except ImportError:
     pass
+import asyncio
 from typing import List, Tuple, Type, Dict
 
 from sources.text_to_speech import Speech
@@ -20,7 +21,8 @@ class Interaction:
                  tts_enabled: bool = True,
                  stt_enabled: bool = True,
                  recover_last_session: bool = False,
-                 langs: List[str] = ["en", "zh"]
+                 langs: List[str] = ["en", "zh"],
+                 router: AgentRouter = None
                 ):
         self.is_active = True
         self.current_agent = None
@@ -31,7 +33,10 @@ class Interaction:
         self.tts_enabled = tts_enabled
         self.stt_enabled = stt_enabled
         self.recover_last_session = recover_last_session
-        self.router = AgentRouter(self.agents, supported_language=langs)
+        if router is not None:
+            self.router = router.bind(self.agents)
+        else:
+            self.router = AgentRouter(self.agents, supported_language=langs)
         self.ai_name = self.find_ai_name()
         self.speech = None
         self.transcriber = None
@@ -115,6 +120,26 @@ class Interaction:
         for agent in self.agents:
             agent.memory.save_memory(agent.type)
 
+    def set_stream_handler(self, handler) -> None:
+        """Stream LLM tokens of every agent to the handler (agent, delta)."""
+        for agent in self.agents:
+            agent.set_stream_handler(handler)
+
+    def set_status_handler(self, handler) -> None:
+        """Report status_message changes of every agent to the handler (agent, status)."""
+        for agent in self.agents:
+            agent.set_status_handler(handler)
+
+    def set_async_provider(self, async_provider) -> None:
+        """Route LLM requests of every agent through the AsyncProvider (None for the blocking path)."""
+        for agent in self.agents:
+            agent.set_async_provider(async_provider)
+
+    def set_model_name(self, model: str) -> None:
+        """Point every agent memory at the model of a newly activated provider."""
+        for agent in self.agents:
+            agent.set_model_name(model)
+
     def check_is_active(self) -> bool:
         return self.is_active
     
@@ -163,12 +188,17 @@ class Interaction:
         self.is_active = True
         self.last_query = query
     
-    async def think(self) -> bool:
-        """Request AI agents to process the user input."""
+    async def think(self, agent=None) -> bool:
+        """
+        Request AI agents to process the user input.
+        agent skips routing when the caller already selected one.
+        """
         push_last_agent_memory = False
         if self.last_query is None or len(self.last_query) == 0:
             return False
-        agent = self.router.select_agent(self.last_query)
+        if agent is None:
+            # Classification runs the router models; keep it off the event loop.
+            agent = await asyncio.to_thread(self.router.select_agent, self.last_query)
         if agent is None:
             return False
         if self.current_agent != agent and self.last_answer is not None:
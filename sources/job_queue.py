@@ -0,0 +1,209 @@
+import time
+import uuid
+import asyncio
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+from sources.logger import Logger
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = {JOB_DONE, JOB_FAILED, JOB_CANCELLED}
+
+
+@dataclass
+class Job:
+    job_id: str
+    session_id: str
+    query: str
+    status: str = JOB_QUEUED
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def queue_wait(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return self.started_at - self.created_at
+
+    @property
+    def run_time(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def jsonify(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "session_id": self.session_id,
+            "query": self.query,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_wait": self.queue_wait,
+            "run_time": self.run_time,
+        }
+
+
+class JobQueue:
+    """
+    Bounded queue of agent runs served by a fixed number of asyncio workers.
+    The runner returns (success, result); on_update is awaited on every state change.
+    Only jobs still queued count against max_queue; cancelled ones are skipped when dequeued.
+    """
+    def __init__(self, runner: Callable[[Job], Awaitable[tuple]],
+                 concurrency: int = 2,
+                 max_queue: int = 32,
+                 max_finished: int = 256,
+                 on_update: Optional[Callable[[Job], Awaitable[None]]] = None):
+        self.runner = runner
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(1, max_queue)
+        self.max_finished = max_finished
+        self.on_update = on_update
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.running: Dict[str, asyncio.Task] = {}
+        self.stopping = False
+        self.queue_waits = deque(maxlen=1000)
+        self.counters = {"submitted": 0, "rejected": 0, "done": 0, "failed": 0, "cancelled": 0}
+        self.logger = Logger("job_queue.log")
+
+    def start(self) -> None:
+        if self.workers:
+            return
+        self.stopping = False
+        self.queue = asyncio.Queue()
+        self.workers = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+        self.logger.info(f"Job workers started: {self.concurrency}, queue depth {self.max_queue}")
+
+    async def stop(self) -> None:
+        self.stopping = True
+        for task in self.running.values():
+            task.cancel()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        self.queue = None
+
+    async def submit(self, session_id: str, query: str) -> Job:
+        self.start()
+        if self.queued_count() >= self.max_queue:
+            self.counters["rejected"] += 1
+            raise RuntimeError(f"Job queue is full ({self.max_queue})")
+        job = Job(job_id=str(uuid.uuid4()), session_id=session_id, query=query)
+        self.queue.put_nowait(job)
+        self.counters["submitted"] += 1
+        self.jobs[job.job_id] = job
+        self._prune()
+        await self._notify(job)
+        return job
+
+    def queued_count(self) -> int:
+        return sum(1 for j in self.jobs.values() if j.status == JOB_QUEUED)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def position(self, job: Job) -> int:
+        if job.status != JOB_QUEUED:
+            return 0
+        queued = [j for j in self.jobs.values() if j.status == JOB_QUEUED]
+        return queued.index(job) + 1
+
+    async def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return False
+        task = self.running.get(job_id)
+        if task is not None:
+            task.cancel()
+            return True
+        self._finish(job, JOB_CANCELLED)
+        await self._notify(job)
+        return True
+
+    async def _worker(self, worker_id: int) -> None:
+        while not self.stopping:
+            job = await self.queue.get()
+            try:
+                if job.status == JOB_QUEUED:
+                    await self._run(job)
+            except Exception as e:
+                self.logger.error(f"Worker {worker_id} failed on job {job.job_id}: {str(e)}")
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        self.queue_waits.append(job.queue_wait)
+        await self._notify(job)
+        task = asyncio.create_task(self.runner(job))
+        self.running[job.job_id] = task
+        try:
+            success, job.result = await task
+            self._finish(job, JOB_DONE if success else JOB_FAILED)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            self._finish(job, JOB_CANCELLED)
+        except Exception as e:
+            job.error = str(e)
+            self._finish(job, JOB_FAILED)
+        finally:
+            self.running.pop(job.job_id, None)
+        self.logger.info(f"Job {job.job_id} {job.status} (wait {job.queue_wait:.2f}s, run {job.run_time:.2f}s)")
+        await self._notify(job)
+
+    def _finish(self, job: Job, status: str) -> None:
+        job.status = status
+        job.finished_at = time.time()
+        self.counters[status] += 1
+
+    async def _notify(self, job: Job) -> None:
+        if self.on_update is None:
+            return
+        try:
+            await self.on_update(job)
+        except Exception as e:
+            self.logger.warning(f"Job update callback failed: {str(e)}")
+
+    def _prune(self) -> None:
+        finished = [jid for jid, j in self.jobs.items() if j.status in FINISHED_STATES]
+        for jid in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[jid]
+
+    def get_stats(self) -> Dict:
+        waits = sorted(self.queue_waits)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(p * len(waits)))]
+
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "queued": self.queued_count(),
+            "running": len(self.running),
+            **self.counters,
+            "queue_wait": {
+                "samples": len(waits),
+                "avg": sum(waits) / len(waits) if waits else 0.0,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": waits[-1] if waits else 0.0,
+            },
+        }
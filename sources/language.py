@@ -1,10 +1,12 @@
 from typing import List, Tuple, Type, Dict
 import re
+import threading
 import langid
 from transformers import MarianMTModel, MarianTokenizer
 
 from sources.utility import pretty_print, animate_thinking
 from sources.logger import Logger
+from sources.startup import profiler
 
 class LanguageUtility:
     """LanguageUtility for language, or emotion identification"""
@@ -18,12 +20,22 @@ class LanguageUtility:
         self.translators_model = None
         self.logger = Logger("language.log")
         self.supported_language = supported_language
-        self.load_model()
+        self.load_lock = threading.Lock()
+        profiler.register_lazy("translator")
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.translators_model is not None
     
     def load_model(self) -> None:
-        animate_thinking("Loading language utility...", color="status")
-        self.translators_tokenizer = {lang: MarianTokenizer.from_pretrained(f"Helsinki-NLP/opus-mt-{lang}-en") for lang in self.supported_language if lang != "en"}
-        self.translators_model = {lang: MarianMTModel.from_pretrained(f"Helsinki-NLP/opus-mt-{lang}-en") for lang in self.supported_language if lang != "en"}
+        """Load the Marian translation models, once, on first use."""
+        with self.load_lock:
+            if self.is_loaded:
+                return
+            with profiler.track("translator"):
+                animate_thinking("Loading language utility...", color="status")
+                self.translators_tokenizer = {lang: MarianTokenizer.from_pretrained(f"Helsinki-NLP/opus-mt-{lang}-en") for lang in self.supported_language if lang != "en"}
+                self.translators_model = {lang: MarianMTModel.from_pretrained(f"Helsinki-NLP/opus-mt-{lang}-en") for lang in self.supported_language if lang != "en"}
     
     def detect_language(self, text: str) -> str:
         """
@@ -48,6 +60,8 @@ class LanguageUtility:
         """
         if origin_lang == "en":
             return text
+        if not self.is_loaded:
+            self.load_model()
         if origin_lang not in self.translators_tokenizer:
             pretty_print(f"Language {origin_lang} not supported for translation", color="error")
             return text
@@ -2,9 +2,13 @@ import os
 import requests
 import time
 from dotenv import load_dotenv
-from openai import OpenAI
 
+from sources.http_clients import client_pool, GROQ_BASE_URL
 from sources.logger import Logger
+from sources.metrics import timed, outcome, PROVIDER_RESPOND_SECONDS, PROVIDER_ERRORS
+from sources.response_cache import get_response_cache
+from sources.rate_limiter import rate_limiter, estimate_tokens
+from sources.usage import usage_tracker, current_usage, note_usage
 from sources.utility import pretty_print, animate_thinking
 
 HUGGINGFACE_FREE_MODELS = [
@@ -15,6 +19,44 @@ HUGGINGFACE_FREE_MODELS = [
 ]
 
 
+def respond_labels(args, result, error) -> dict:
+    provider = args[0]
+    if error is not None:
+        PROVIDER_ERRORS.inc(provider=provider.provider_name, model=provider.model, error=type(error).__name__)
+    return {"provider": provider.provider_name, "model": provider.model, "outcome": outcome(result, error)}
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    error_str = str(error).lower()
+    return "rate_limit" in error_str or "429" in error_str or "rate limit" in error_str
+
+
+def retry_decision(error: Exception, attempt: int, max_retries: int, provider_name: str, server_ip: str):
+    """
+    Decide what respond() does after a failed attempt, shared by the blocking and async providers.
+    Returns ("retry", seconds), ("fallback", None), ("answer", message) or ("raise", None).
+    """
+    error_str = str(error).lower()
+    if "402" in error_str or "payment required" in error_str or "credit" in error_str or "depleted" in error_str:
+        return "fallback", None
+    if is_rate_limit_error(error):
+        if attempt < max_retries:
+            return "retry", (attempt + 1) * 3
+        return "answer", "Batas penggunaan API tercapai. Silakan tunggu beberapa menit dan coba lagi."
+    if "try again later" in error_str or "503" in error_str or "overloaded" in error_str:
+        if attempt < max_retries:
+            return "retry", 2
+        return "answer", f"{provider_name} server sedang sibuk. Coba lagi nanti."
+    if "refused" in error_str:
+        return "answer", f"Server {server_ip} tampak offline. Tidak bisa menjawab."
+    if attempt < max_retries:
+        return "retry", 1
+    return "raise", None
+
+
+CREDIT_DEPLETED_ANSWER = "Kredit API habis. Silakan periksa akun HuggingFace Anda atau ganti ke provider Groq melalui pengaturan Model AI di sidebar."
+
+
 class Provider:
     def __init__(self, provider_name, model, server_address="127.0.0.1:5000", is_local=False):
         self.provider_name = provider_name.lower()
@@ -27,6 +69,10 @@ class Provider:
             "huggingface": self.huggingface_fn,
             "test": self.test_fn
         }
+        self.stream_providers = {
+            "groq": self.groq_stream_fn,
+            "huggingface": self.huggingface_stream_fn,
+        }
         self.logger = Logger("provider.log")
         self.api_key = None
         self.unsafe_providers = ["groq", "huggingface"]
@@ -39,6 +85,12 @@ class Provider:
     def get_model_name(self) -> str:
         return self.model
 
+    def request_params(self) -> dict:
+        """Sampling parameters sent with each request; part of the response cache key."""
+        if self.provider_name == "huggingface":
+            return {"max_tokens": 4096}
+        return {}
+
     def get_api_key(self, provider):
         load_dotenv()
         api_key_var = f"{provider.upper()}_API_KEY"
@@ -48,17 +100,49 @@ class Provider:
             raise ValueError(f"API key {api_key_var} tidak ditemukan. Set sebagai environment variable.")
         return api_key
 
-    def respond(self, history, verbose=True):
+    @timed(PROVIDER_RESPOND_SECONDS, respond_labels)
+    def respond(self, history, verbose=True, quota_acquired=False):
+        """
+        Ask the LLM for a completion. quota_acquired means the caller already took rate limiter
+        quota for this call (a stream that failed before its first delta), so the first attempt
+        does not take it again.
+        """
+        record = usage_tracker.start(self.provider_name, self.model)
+        token = current_usage.set(record)
+        try:
+            thought = self._respond(history, verbose, record, quota_acquired)
+        except BaseException as e:
+            usage_tracker.finish(record, history, error=e)
+            raise
+        finally:
+            current_usage.reset(token)
+        usage_tracker.finish(record, history, thought)
+        return thought
+
+    def _respond(self, history, verbose, record, quota_acquired=False):
         llm = self.available_providers[self.provider_name]
         self.logger.info(f"Using provider: {self.provider_name}")
+        cache = get_response_cache()
+        if cache is not None:
+            cached = cache.get(self.provider_name, self.model, history, self.request_params())
+            if cached is not None:
+                self.logger.info(f"Response cache hit for {self.provider_name}/{self.model}")
+                record.cached = True
+                return cached
         max_retries = 2
         last_error = None
         for attempt in range(max_retries + 1):
+            record.retries = attempt
             try:
+                if attempt > 0 or not quota_acquired:
+                    rate_limiter.acquire(self.provider_name, self.model, estimate_tokens(history))
                 thought = llm(history, verbose)
+                if cache is not None:
+                    cache.put(self.provider_name, self.model, history, thought, self.request_params())
                 return thought
             except KeyboardInterrupt:
                 self.logger.warning("User interrupted the operation with Ctrl+C")
+                record.outcome = "cancelled"
                 return "Operation interrupted by user. REQUEST_EXIT"
             except ConnectionError as e:
                 raise ConnectionError(f"{str(e)}\nKoneksi ke {self.server_ip} gagal.")
@@ -69,52 +153,99 @@ class Provider:
                     f"{str(e)}\nImport terkait provider {self.provider_name} tidak ditemukan. Sudah terinstall?")
             except Exception as e:
                 last_error = e
-                error_str = str(e).lower()
-                if "402" in error_str or "payment required" in error_str or "credit" in error_str or "depleted" in error_str:
+                action, value = retry_decision(e, attempt, max_retries, self.provider_name, self.server_ip)
+                if action == "fallback":
                     self.logger.warning(f"Kredit habis untuk {self.provider_name}/{self.model}, mencoba model lain...")
+                    record.outcome = "fallback"
                     if self.provider_name == "huggingface":
-                        fallback = self._try_huggingface_fallback(history, verbose)
+                        fallback = self._try_huggingface_fallback(history, verbose, record)
                         if fallback is not None:
                             return fallback
-                    return "Kredit API habis. Silakan periksa akun HuggingFace Anda atau ganti ke provider Groq melalui pengaturan Model AI di sidebar."
-                if "rate_limit" in error_str or "429" in error_str or "rate limit" in error_str:
-                    if attempt < max_retries:
-                        wait_time = (attempt + 1) * 3
-                        self.logger.info(f"Rate limited, menunggu {wait_time}s sebelum retry...")
-                        time.sleep(wait_time)
-                        continue
-                    return "Batas penggunaan API tercapai. Silakan tunggu beberapa menit dan coba lagi."
-                if "try again later" in error_str or "503" in error_str or "overloaded" in error_str:
-                    if attempt < max_retries:
-                        time.sleep(2)
-                        continue
-                    return f"{self.provider_name} server sedang sibuk. Coba lagi nanti."
-                if "refused" in error_str:
-                    return f"Server {self.server_ip} tampak offline. Tidak bisa menjawab."
-                if attempt < max_retries:
-                    self.logger.info(f"Retry attempt {attempt + 1} after error: {str(e)}")
-                    time.sleep(1)
+                    return CREDIT_DEPLETED_ANSWER
+                if action == "answer":
+                    record.outcome = "degraded"
+                    return value
+                if action == "retry" and is_rate_limit_error(e):
+                    # The next acquire() waits out retry-after for every caller of this model, not just us.
+                    wait = rate_limiter.record_rate_limited(self.provider_name, self.model, e, value)
+                    self.logger.info(f"Rate limited, retry attempt {attempt + 1} queued for {wait:.1f}s")
+                    if not rate_limiter.enabled:
+                        # acquire() does not wait with the limiter off, so back off here.
+                        time.sleep(wait)
+                    continue
+                if action == "retry":
+                    self.logger.info(f"Retry attempt {attempt + 1} in {value}s after error: {str(e)}")
+                    time.sleep(value)
                     continue
                 raise Exception(f"Provider {self.provider_name} gagal: {str(e)}") from e
         if last_error:
             raise Exception(f"Provider {self.provider_name} gagal setelah {max_retries + 1} percobaan: {str(last_error)}") from last_error
 
-    def _try_huggingface_fallback(self, history, verbose):
-        from huggingface_hub import InferenceClient
-        api_key = self.get_api_key("huggingface")
+    def respond_stream(self, history, verbose=False):
+        """
+        Yield the completion as text deltas.
+        Falls back to the blocking respond() when the provider cannot stream
+        or fails before the first delta, so retries and error messages stay the same.
+        """
+        stream_fn = self.stream_providers.get(self.provider_name)
+        if stream_fn is None:
+            yield self.respond(history, verbose)
+            return
+        record = usage_tracker.start(self.provider_name, self.model, stream=True)
+        cache = get_response_cache()
+        cached = cache.get(self.provider_name, self.model, history, self.request_params()) if cache is not None else None
+        if cached is not None:
+            record.cached = True
+            usage_tracker.finish(record, history, cached)
+            yield cached
+            return
+        self.logger.info(f"Streaming from provider: {self.provider_name}")
+        streamed = []
+        rate_limiter.acquire(self.provider_name, self.model, estimate_tokens(history))
+        try:
+            for delta in stream_fn(history, verbose):
+                if delta:
+                    record.first_byte()
+                    streamed.append(delta)
+                    yield delta
+        except GeneratorExit:
+            usage_tracker.finish(record, history, "".join(streamed), outcome="cancelled")
+            raise
+        except Exception as e:
+            if streamed:
+                usage_tracker.finish(record, history, "".join(streamed), error=e)
+                raise Exception(f"Provider {self.provider_name} gagal saat streaming: {str(e)}") from e
+            self.logger.warning(f"Streaming failed, falling back to blocking call: {str(e)}")
+            usage_tracker.finish(record, history, error=e, outcome="fallback")
+        else:
+            text = "".join(streamed)
+            if cache is not None:
+                cache.put(self.provider_name, self.model, history, text, self.request_params())
+            usage_tracker.finish(record, history, text)
+            return
+        # The quota taken for the stream covers the blocking call that replaces it.
+        yield self.respond(history, verbose, quota_acquired=True)
+
+    def _try_huggingface_fallback(self, history, verbose, record):
+        """
+        Answer this one call with another free model. The provider is shared by every session,
+        so its model is left alone; switching models goes through the provider registry.
+        """
+        client = client_pool.huggingface(self.api_key or self.get_api_key("huggingface"))
         fallback_models = [m for m in HUGGINGFACE_FREE_MODELS if m != self.model]
         for model in fallback_models:
             try:
                 self.logger.info(f"Mencoba fallback model: {model}")
-                client = InferenceClient(api_key=api_key)
+                rate_limiter.acquire(self.provider_name, model, estimate_tokens(history))
                 completion = client.chat.completions.create(
                     model=model,
                     messages=history,
                     max_tokens=4096,
                 )
                 thought = completion.choices[0].message
+                note_usage(getattr(completion, "usage", None))
                 self.logger.info(f"Fallback model {model} berhasil!")
-                self.model = model
+                record.model = model
                 return thought.content
             except Exception as e:
                 self.logger.warning(f"Fallback model {model} gagal: {str(e)}")
@@ -122,14 +253,17 @@ class Provider:
         return None
 
     def groq_fn(self, history, verbose=False):
-        client = OpenAI(api_key=self.api_key, base_url="https://api.groq.com/openai/v1")
+        client = client_pool.openai(self.api_key, GROQ_BASE_URL)
         try:
-            response = client.chat.completions.create(
+            raw = client.chat.completions.with_raw_response.create(
                 model=self.model,
                 messages=history,
             )
+            rate_limiter.record_response(self.provider_name, self.model, raw.headers)
+            response = raw.parse()
             if response is None:
                 raise Exception("Groq response kosong.")
+            note_usage(response.usage)
             thought = response.choices[0].message.content
             if verbose:
                 print(thought)
@@ -137,19 +271,49 @@ class Provider:
         except Exception as e:
             raise Exception(f"Groq API error: {str(e)}") from e
 
-    def huggingface_fn(self, history, verbose=False):
-        from huggingface_hub import InferenceClient
-        client = InferenceClient(
-            api_key=self.get_api_key("huggingface")
+    def groq_stream_fn(self, history, verbose=False):
+        client = client_pool.openai(self.api_key, GROQ_BASE_URL)
+        raw = client.chat.completions.with_raw_response.create(
+            model=self.model,
+            messages=history,
+            stream=True,
         )
+        rate_limiter.record_response(self.provider_name, self.model, raw.headers)
+        for chunk in raw.parse():
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if verbose:
+                    print(delta, end="", flush=True)
+                yield delta
+
+    def huggingface_fn(self, history, verbose=False):
+        client = client_pool.huggingface(self.api_key or self.get_api_key("huggingface"))
         completion = client.chat.completions.create(
             model=self.model,
             messages=history,
             max_tokens=4096,
         )
+        note_usage(getattr(completion, "usage", None))
         thought = completion.choices[0].message
         return thought.content
 
+    def huggingface_stream_fn(self, history, verbose=False):
+        client = client_pool.huggingface(self.api_key or self.get_api_key("huggingface"))
+        stream = client.chat.completions.create(
+            model=self.model,
+            messages=history,
+            max_tokens=4096,
+            stream=True,
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
     def test_fn(self, history, verbose=True):
         thought = """
 \n\n```json\n{\n  "plan": [\n    {\n      "agent": "Web",\n      "id": "1",\n      "need": null,\n      "task": "Conduct a comprehensive web search to identify at least five AI startups located in Osaka."\n    },\n    {\n      "agent": "File",\n      "id": "2",\n      "need": ["1"],\n      "task": "Create a new text file named research_japan.txt."\n    }\n  ]\n}\n```
@@ -4,13 +4,17 @@ import uuid
 import os
 import sys
 import json
+import asyncio
+from concurrent.futures import Future, wait
 from typing import List, Tuple, Type, Dict, Optional
-import torch
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 import configparser
 
-from sources.utility import timer_decorator, pretty_print, animate_thinking
+from sources.utility import timer_decorator, pretty_print
 from sources.logger import Logger
+from sources.startup import profiler
+from sources.memory_journal import get_journal, replay
+from sources.model_registry import model_registry
+from sources.summarizer import summarizer
 
 config = configparser.ConfigParser()
 config.read('config.ini')
@@ -31,65 +35,60 @@ class Memory():
         self.session_id = str(uuid.uuid4())
         self.conversation_folder = f"conversations/"
         self.session_recovered = False
+        self.journaled = 0
+        self.journal_dirty = True
+        self.memory_compression = memory_compression
+        self.model_provider = model_provider
+        self.compressing: Dict[int, Future] = {}
         if recover_last_session:
             self.load_memory()
             self.session_recovered = True
-        self.model = None
-        self.tokenizer = None
-        self.device = self.get_cuda_device()
-        self.memory_compression = memory_compression
-        self.model_provider = model_provider
         if self.memory_compression:
-            self.download_model()
+            profiler.register_lazy("summarizer")
 
-    def get_ideal_ctx(self, model_name: str) -> Optional[int]:
-        import re
-        import math
+    def context_budget(self) -> int:
+        """Prompt tokens the current model accepts, leaving room for its completion."""
+        return model_registry.get(self.model_provider).input_budget
 
-        def extract_number_before_b(sentence: str) -> int:
-            match = re.search(r'(\d+)b', sentence, re.IGNORECASE)
-            return int(match.group(1)) if match else None
-
-        model_size = extract_number_before_b(model_name)
-        if not model_size:
-            return None
-        base_size = 7
-        base_context = 4096
-        scaling_factor = 1.5
-        context_size = int(base_context * (model_size / base_size) ** scaling_factor)
-        context_size = 2 ** round(math.log2(context_size))
-        self.logger.info(f"Estimated context size for {model_name}: {context_size} tokens.")
-        return context_size
+    def token_count(self) -> int:
+        return model_registry.count_messages(self.memory, self.model_provider)
     
-    def download_model(self):
-        """Download the model if not already downloaded."""
-        animate_thinking("Loading memory compression model...", color="status")
-        self.tokenizer = AutoTokenizer.from_pretrained("pszemraj/led-base-book-summary")
-        self.model = AutoModelForSeq2SeqLM.from_pretrained("pszemraj/led-base-book-summary")
-        self.logger.info("Memory compression system initialized.")
+    def ensure_model(self) -> bool:
+        """Load the shared summarization model on first use. Returns False if compression is unavailable."""
+        if not self.memory_compression:
+            return False
+        if not summarizer.load():
+            self.logger.error(f"Memory compression disabled: {summarizer.error}")
+            self.memory_compression = False
+            return False
+        return True
     
     def get_filename(self) -> str:
-        return f"memory_{self.session_time.strftime('%Y-%m-%d_%H-%M-%S')}.txt"
+        return f"memory_{self.session_time.strftime('%Y-%m-%d_%H-%M-%S')}_{self.session_id[:8]}.txt"
     
     def save_memory(self, agent_type: str = "casual_agent") -> None:
-        if not os.path.exists(self.conversation_folder):
-            self.logger.info(f"Created folder {self.conversation_folder}.")
-            os.makedirs(self.conversation_folder)
-        save_path = os.path.join(self.conversation_folder, agent_type)
-        if not os.path.exists(save_path):
-            os.makedirs(save_path)
-        filename = self.get_filename()
-        path = os.path.join(save_path, filename)
-        json_memory = json.dumps(self.memory)
-        with open(path, 'w') as f:
-            self.logger.info(f"Saved memory json at {path}")
-            f.write(json_memory)
+        """
+        Persist the memory to its session journal without blocking.
+        Only messages pushed since the last save are appended; a snapshot is written
+        when earlier messages were rewritten (reset, compression, section clear).
+        """
+        path = os.path.join(self.conversation_folder, agent_type, self.get_filename())
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, 'a').close()
+        journal = get_journal()
+        if self.journal_dirty or self.journaled > len(self.memory):
+            journal.snapshot(path, self.memory)
+        else:
+            journal.append(path, self.memory[self.journaled:])
+        self.journaled = len(self.memory)
+        self.journal_dirty = False
     
     def find_last_session_path(self, path) -> Optional[str]:
         saved_sessions = []
         for filename in os.listdir(path):
-            if filename.startswith('memory_'):
-                date = filename.split('_')[1]
+            if filename.startswith('memory_') and not filename.endswith('.tmp'):
+                date = "_".join(filename.split('_')[1:3])
                 saved_sessions.append((filename, date))
         saved_sessions.sort(key=lambda x: x[1], reverse=True)
         if len(saved_sessions) > 0:
@@ -121,6 +120,18 @@ class Memory():
             return {}
         return json_memory
 
+    def load_saved_file(self, path: str) -> list:
+        """Load a saved memory: a legacy JSON list or a journal to replay."""
+        try:
+            with open(path, 'r') as f:
+                head = f.read(64).lstrip()
+        except Exception as e:
+            self.logger.warning(f"Error loading file {path}: {e}")
+            return []
+        if head.startswith('['):
+            return self.load_json_file(path)
+        return replay(path)
+
     def load_memory(self, agent_type: str = "casual_agent") -> None:
         if self.session_recovered == True:
             return
@@ -134,7 +145,9 @@ class Memory():
             pretty_print("Last session memory not found.", color="warning")
             return
         path = os.path.join(save_path, filename)
-        self.memory = self.load_json_file(path) 
+        get_journal().flush()
+        self.memory = self.load_saved_file(path)
+        self.journal_dirty = True
         if isinstance(self.memory, list) and len(self.memory) > 0 and self.memory[-1]['role'] == 'user':
             self.memory.pop()
         self.compress()
@@ -142,6 +155,7 @@ class Memory():
     
     def reset(self, memory: list = None) -> None:
         self.logger.info("Memory reset performed.")
+        self.journal_dirty = True
         if memory is not None:
             self.memory = memory
         elif len(self.memory) > 0 and self.memory[0]['role'] == 'system':
@@ -150,10 +164,11 @@ class Memory():
             self.memory = []
     
     def push(self, role: str, content: str) -> int:
-        ideal_ctx = self.get_ideal_ctx(self.model_provider)
-        if ideal_ctx is not None:
-            if self.memory_compression and len(content) > ideal_ctx * 1.5:
-                self.logger.info(f"Compressing memory: Content {len(content)} > {ideal_ctx} model context.")
+        if self.memory_compression:
+            tokens = self.token_count() + model_registry.count_tokens(content, self.model_provider)
+            budget = self.context_budget()
+            if tokens > budget:
+                self.logger.info(f"Compressing memory: {tokens} tokens > {budget} token budget.")
                 self.compress()
         curr_idx = len(self.memory)
         if curr_idx > 0 and self.memory[curr_idx-1]['content'] == content:
@@ -167,73 +182,126 @@ class Memory():
     
     def clear(self) -> None:
         self.logger.info("Memory clear performed.")
+        self.journal_dirty = True
         self.memory = self.memory[:1]
     
     def clear_section(self, start: int, end: int) -> None:
         self.logger.info(f"Clearing memory section {start} to {end}.")
+        self.journal_dirty = True
         start = max(0, start) + 1
         end = min(end, len(self.memory)-1) + 2
         self.memory = self.memory[:start] + self.memory[end:]
     
     def get(self) -> list:
-        return [{'role': msg['role'], 'content': msg['content']} for msg in self.memory]
+        """
+        Messages for the next LLM request. Whatever compression is on, the oldest non-system
+        messages are left out once the model's context budget is full; the history itself is kept.
+        """
+        return self.fit_to_budget([{'role': msg['role'], 'content': msg['content']} for msg in self.memory])
 
-    def get_cuda_device(self) -> str:
-        if torch.backends.mps.is_available():
-            return "mps"
-        elif torch.cuda.is_available():
-            return "cuda"
-        else:
-            return "cpu"
+    def fit_to_budget(self, messages: list) -> list:
+        budget = self.context_budget()
+        head = messages[:1] if messages and messages[0]['role'] == 'system' else []
+        used = model_registry.count_messages(head, self.model_provider)
+        kept = []
+        for message in reversed(messages[len(head):]):
+            tokens = model_registry.count_messages([message], self.model_provider)
+            if used + tokens > budget:
+                if not kept:
+                    # The newest message alone is over budget: send as much of it as fits.
+                    content = model_registry.trim_to_tokens(message['content'], budget - used - 4, self.model_provider)
+                    kept.append({**message, 'content': content})
+                break
+            kept.append(message)
+            used += tokens
+        dropped = len(messages) - len(head) - len(kept)
+        if dropped > 0:
+            self.logger.info(f"Context budget {budget} reached: left out the {dropped} oldest messages.")
+        return head + kept[::-1]
 
     def summarize(self, text: str, min_length: int = 64) -> str:
-        if self.tokenizer is None or self.model is None:
+        if not self.ensure_model():
             self.logger.warning("No tokenizer or model to perform summarization.")
             return text
         if len(text) < min_length*1.5:
             return text
         max_length = len(text) // 2 if len(text) > min_length*2 else min_length*2
-        input_text = "summarize: " + text
-        inputs = self.tokenizer(input_text, return_tensors="pt", max_length=512, truncation=True)
-        summary_ids = self.model.generate(
-            inputs['input_ids'],
-            max_length=max_length,
-            min_length=min_length,
-            length_penalty=1.0,
-            num_beams=4,
-            early_stopping=True
-        )
-        summary = self.tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+        summary = summarizer.generate("summarize: " + text, max_length, min_length)
+        if summary is None:
+            return text
         summary = summary.replace('summary:', '')
         self.logger.info(f"Memory summarized from len {len(text)} to {len(summary)}.")
         self.logger.info(f"Summarized text:\n{summary}")
         return summary
     
-    def compress(self) -> Optional[str]:
-        if self.tokenizer is None or self.model is None:
+    def compress(self) -> None:
+        """
+        Summarize long messages on the background summarizer worker.
+        Each message keeps its full content, which get() keeps serving, until its summary is ready.
+        """
+        if not self.memory_compression:
             self.logger.warning("No tokenizer or model to perform memory compression.")
             return
-        for i in range(len(self.memory)):
-            if self.memory[i]['role'] == 'system':
+        self.compressing = {key: future for key, future in self.compressing.items() if not future.done()}
+        for message in self.memory:
+            if message['role'] == 'system' or len(message['content']) <= 1024 or id(message) in self.compressing:
                 continue
-            if len(self.memory[i]['content']) > 1024:
-                self.memory[i]['content'] = self.summarize(self.memory[i]['content'])
+            self.compressing[id(message)] = summarizer.submit(self._compress_message, message, message['content'])
+
+    def _compress_message(self, message: dict, original: str) -> None:
+        # Swapped in by the job itself, so a finished future means the memory is already compressed.
+        try:
+            summary = self.summarize(original)
+            # The message may have been rewritten or dropped while it was being summarized.
+            if message['content'] == original and summary != original:
+                message['content'] = summary
+                self.journal_dirty = True
+        except Exception as e:
+            self.logger.error(f"Memory compression failed: {str(e)}")
+
+    def pending_compressions(self) -> List[Future]:
+        return [future for future in list(self.compressing.values()) if not future.done()]
+
+    def needs_compression(self) -> bool:
+        """True when summaries still running are needed to fit the model's context."""
+        return bool(self.pending_compressions()) and self.token_count() > self.context_budget()
+
+    def wait_for_compression(self, timeout: Optional[float] = None) -> bool:
+        """Block until the pending summaries replaced their messages. False on timeout."""
+        pending = self.pending_compressions()
+        if not pending:
+            return True
+        _, not_done = wait(pending, timeout=timeout)
+        return not not_done
+
+    async def wait_for_compression_async(self, timeout: Optional[float] = None) -> bool:
+        pending = self.pending_compressions()
+        if not pending:
+            return True
+        _, not_done = await asyncio.wait([asyncio.wrap_future(f) for f in pending], timeout=timeout)
+        return not not_done
     
-    def trim_text_to_max_ctx(self, text: str) -> str:
-        ideal_ctx = self.get_ideal_ctx(self.model_provider)
-        return text[:ideal_ctx] if ideal_ctx is not None else text
+    def trim_text_to_max_ctx(self, text: str, reserve: int = 2048) -> str:
+        """
+        Trim text to what still fits next to the conversation, keeping reserve tokens for the prompt around it.
+        At least a quarter of the budget is kept; get() then leaves out older history instead.
+        """
+        budget = max(self.context_budget() - self.token_count() - reserve, self.context_budget() // 4)
+        return model_registry.trim_to_tokens(text, budget, self.model_provider)
     
     def compress_text_to_max_ctx(self, text) -> str:
-        if self.tokenizer is None or self.model is None:
+        if not self.ensure_model():
             self.logger.warning("No tokenizer or model to perform memory compression.")
             return text
-        ideal_ctx = self.get_ideal_ctx(self.model_provider)
-        if ideal_ctx is None:
-            self.logger.warning("No ideal context size found.")
-            return text
-        while len(text) > ideal_ctx:
-            self.logger.info(f"Compressing text: {len(text)} > {ideal_ctx} model context.")
-            text = self.summarize(text)
+        budget = self.context_budget()
+        tokens = model_registry.count_tokens(text, self.model_provider)
+        while tokens > budget:
+            self.logger.info(f"Compressing text: {tokens} tokens > {budget} token budget.")
+            summary = self.summarize(text)
+            if len(summary) >= len(text):
+                return model_registry.trim_to_tokens(text, budget, self.model_provider)
+            text = summary
+            tokens = model_registry.count_tokens(text, self.model_provider)
         return text
 
 
@@ -255,4 +323,5 @@ indicates that the compiler cannot find the helper_functions.h file.
     
     print("\n---\nmemory before:", memory.get())
     memory.compress()
+    memory.wait_for_compression()
     print("\n---\nmemory after:", memory.get())
@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+from typing import Dict, List, Optional, Tuple
+from sources.logger import Logger
+
+def replay(path: str) -> list:
+    """
+    Rebuild a memory list from a journal file.
+    Records are {"op": "append", "msg": {...}} or {"op": "snapshot", "memory": [...]};
+    a torn last line (crash mid-write) is ignored.
+    """
+    memory = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            if record.get("op") == "snapshot":
+                memory = list(record.get("memory", []))
+            elif record.get("op") == "append":
+                memory.append(record["msg"])
+    return memory
+
+
+class MemoryJournal:
+    """
+    Append-only memory persistence off the request path.
+    Callers enqueue records; a writer thread batches them per file, appends, fsyncs once per batch,
+    and compacts a file into a single snapshot once it holds compact_every records.
+    """
+    def __init__(self, flush_interval: float = 0.2, compact_every: int = 200, max_batch: int = 512):
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+        self.max_batch = max_batch
+        self.queue: "queue.Queue[Tuple[str, List[Dict]]]" = queue.Queue()
+        self.record_counts: Dict[str, int] = {}
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+        self.stats = {"batches": 0, "records": 0, "fsyncs": 0, "compactions": 0, "errors": 0}
+        self.logger = Logger("memory_journal.log")
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._run, name="memory-journal", daemon=True)
+            self.thread.start()
+
+    def write(self, path: str, records: List[Dict]) -> None:
+        if not records:
+            return
+        self.start()
+        self.queue.put((path, records))
+
+    def append(self, path: str, messages: List[Dict]) -> None:
+        self.write(path, [{"op": "append", "msg": dict(msg)} for msg in messages])
+
+    def snapshot(self, path: str, memory: List[Dict]) -> None:
+        self.write(path, [{"op": "snapshot", "memory": [dict(msg) for msg in memory]}])
+
+    def flush(self) -> None:
+        """Block until everything enqueued so far is on disk."""
+        if self.thread is None:
+            return
+        self.queue.join()
+
+    def _collect(self) -> List[Tuple[str, List[Dict]]]:
+        batch = [self.queue.get()]
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            by_path: Dict[str, List[Dict]] = {}
+            for path, records in batch:
+                by_path.setdefault(path, []).extend(records)
+            for path, records in by_path.items():
+                try:
+                    self._write_records(path, records)
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    self.logger.error(f"Failed to write journal {path}: {str(e)}")
+            self.stats["batches"] += 1
+            for _ in batch:
+                self.queue.task_done()
+
+    def _write_records(self, path: str, records: List[Dict]) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Records after the last snapshot in the batch are all that matter on replay.
+        last_snapshot = max((i for i, r in enumerate(records) if r["op"] == "snapshot"), default=None)
+        if last_snapshot is not None:
+            self._rewrite(path, records[last_snapshot:])
+            return
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.stats["records"] += len(records)
+        self.stats["fsyncs"] += 1
+        count = self.record_counts.get(path)
+        if count is None:
+            count = self._count_records(path)
+        else:
+            count += len(records)
+        self.record_counts[path] = count
+        if count >= self.compact_every:
+            self.compact(path)
+
+    def _rewrite(self, path: str, records: List[Dict]) -> None:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.record_counts[path] = len(records)
+        self.stats["records"] += len(records)
+        self.stats["fsyncs"] += 1
+
+    def _count_records(self, path: str) -> int:
+        with open(path, 'r', encoding='utf-8') as f:
+            return sum(1 for line in f if line.strip())
+
+    def compact(self, path: str) -> None:
+        """Replace the journal with a single snapshot of its replayed state."""
+        memory = replay(path)
+        self._rewrite(path, [{"op": "snapshot", "memory": memory}])
+        self.stats["compactions"] += 1
+        self.logger.info(f"Compacted journal {path} to {len(memory)} messages")
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "pending": self.queue.unfinished_tasks}
+
+
+_journal: Optional[MemoryJournal] = None
+_journal_lock = threading.Lock()
+
+
+def get_journal() -> MemoryJournal:
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = MemoryJournal()
+            atexit.register(_journal.flush)
+        return _journal
@@ -0,0 +1,293 @@
+import time
+import bisect
+import functools
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base for a labelled metric family; children are created once per label set and cached."""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[Tuple[str, ...], object] = {}
+        self.lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, **labels) -> None:
+        """Drop the child for a label set, e.g. when the labelled client goes away."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self.lock:
+            self.children.pop(key, None)
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self.children.items()):
+            lines.extend(self._expose_child(key, child))
+        return lines
+
+    def _expose_child(self, key, child) -> List[str]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value += amount
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        self.labels(**labels).inc(amount)
+
+    def _expose_child(self, key, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float, **labels) -> None:
+        self.labels(**labels).set(value)
+
+    def set_function(self, function: Callable[[], float], **labels) -> None:
+        """Read the value from function at scrape time."""
+        self.labels(**labels).function = function
+
+    def _expose_child(self, key, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.get())}"]
+
+
+class _HistogramChild:
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self.upper_bounds, value)
+        with self.lock:
+            self.counts[idx] += 1
+            self.sum += value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.upper_bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float, **labels) -> None:
+        self.labels(**labels).observe(value)
+
+    def _expose_child(self, key, child) -> List[str]:
+        with child.lock:
+            counts = list(child.counts)
+            total = child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.upper_bounds + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def expose(self) -> str:
+        """Render every metric in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+def timed(histogram: Histogram, labeler: Callable[..., Dict] = None):
+    """
+    Decorator observing the duration of each call.
+    labeler(args, result, error) returns the label values; result is None when the call raised.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = None
+            error = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                try:
+                    labels = labeler(args, result, error) if labeler is not None else {}
+                except Exception:
+                    labels = {}
+                histogram.observe(elapsed, **labels)
+        return wrapper
+    return decorator
+
+
+def outcome(result, error) -> str:
+    if error is not None:
+        return "error"
+    if result is False or getattr(result, "success", True) is False:
+        return "error"
+    return "ok"
+
+
+def scan_labeler(scanner: str) -> Callable[..., Dict]:
+    """Labeler for file scans that also counts the files a scan returned."""
+    def labeler(args, result, error) -> Dict:
+        if isinstance(result, (list, tuple)):
+            FILES_SCANNED.inc(len(result), scanner=scanner)
+        return {"scanner": scanner}
+    return labeler
+
+
+registry = MetricsRegistry()
+
+ROUTER_SELECT_SECONDS = registry.histogram(
+    "agent_router_select_seconds", "Time spent routing a query to an agent.", ["agent_type"])
+PROVIDER_RESPOND_SECONDS = registry.histogram(
+    "llm_provider_respond_seconds", "Duration of Provider.respond including retries.",
+    ["provider", "model", "outcome"])
+PROVIDER_ERRORS = registry.counter(
+    "llm_provider_errors_total", "Provider calls that raised, by exception type.", ["provider", "model", "error"])
+AGENT_LLM_SECONDS = registry.histogram(
+    "agent_llm_request_seconds", "LLM request duration seen by an agent.", ["agent_type", "provider", "model"])
+SANDBOX_EXEC_SECONDS = registry.histogram(
+    "sandbox_execution_seconds", "Duration of sandboxed code execution.", ["tool", "outcome"])
+BROWSER_NAVIGATION_SECONDS = registry.histogram(
+    "browser_navigation_seconds", "Duration of Browser.go_to.", ["outcome"])
+FILE_SCAN_SECONDS = registry.histogram(
+    "file_scan_seconds", "Duration of workspace file scans.", ["scanner"])
+FILES_SCANNED = registry.counter(
+    "files_scanned_total", "Files returned by workspace file scans.", ["scanner"])
+WS_CLIENTS = registry.gauge(
+    "ws_clients", "Connected WebSocket clients.")
+WS_CLIENT_LAG_SECONDS = registry.gauge(
+    "ws_client_lag_seconds", "Age of the oldest message queued for a WebSocket client.", ["client"])
+WS_CLIENT_QUEUED = registry.gauge(
+    "ws_client_queued_messages", "Messages waiting in a WebSocket client's send queue.", ["client"])
+WS_CLIENT_DROPPED = registry.gauge(
+    "ws_client_dropped_messages", "Messages dropped for a WebSocket client since it connected.", ["client"])
+WS_MESSAGES_DROPPED = registry.counter(
+    "ws_messages_dropped_total", "Messages dropped from full WebSocket send queues.")
+WS_MESSAGES_COALESCED = registry.counter(
+    "ws_messages_coalesced_total", "Queued WebSocket messages replaced by a newer value.", ["type"])
+WS_DISCONNECTS = registry.counter(
+    "ws_disconnects_total", "WebSocket disconnects by reason.", ["reason"])
+WS_SEND_LAG_SECONDS = registry.histogram(
+    "ws_send_lag_seconds", "Time from enqueue to send for WebSocket messages.")
+LLM_CACHE_LOOKUPS = registry.counter(
+    "llm_cache_lookups_total", "LLM response cache lookups by result (memory_hit, disk_hit, miss).", ["result"])
+LLM_CACHE_EVICTIONS = registry.counter(
+    "llm_cache_evictions_total", "LLM response cache entries evicted, by reason.", ["reason"])
+LLM_HEDGES = registry.counter(
+    "llm_hedged_requests_total", "Hedged LLM requests by outcome (won, lost, failed, over_budget).",
+    ["provider", "outcome"])
+LLM_RATE_LIMIT_WAIT_SECONDS = registry.histogram(
+    "llm_rate_limit_wait_seconds", "Time LLM calls spent queued for provider quota.", ["provider", "model"])
+LLM_RATE_LIMIT_QUEUED = registry.gauge(
+    "llm_rate_limit_queued", "LLM calls waiting for provider quota.", ["provider", "model"])
+LLM_RATE_LIMITED = registry.counter(
+    "llm_rate_limited_total", "LLM calls rejected by the provider with a rate limit (429).", ["provider", "model"])
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total", "Prompt and completion tokens of LLM calls (estimated when the API reports none).",
+    ["provider", "model", "agent_type", "direction"])
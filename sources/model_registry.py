@@ -0,0 +1,171 @@
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional, Tuple
+
+try:
+    import tiktoken
+    TIKTOKEN_FOUND = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_FOUND = False
+
+from sources.logger import Logger
+
+# Completion room kept free in every request; matches the max_tokens we send to HuggingFace.
+OUTPUT_RESERVE = 4096
+
+
+@dataclass(frozen=True)
+class ModelInfo:
+    name: str
+    context_window: int
+    max_output: int = OUTPUT_RESERVE
+    # tiktoken encoding used for exact-enough counts; Llama 3 and Qwen BPEs are close to o200k/cl100k.
+    encoding: str = "o200k_base"
+    chars_per_token: float = 4.0
+
+    @property
+    def input_budget(self) -> int:
+        """Tokens a prompt (all messages) may use while leaving room for the completion."""
+        return max(1024, self.context_window - min(self.max_output, OUTPUT_RESERVE))
+
+
+KNOWN_MODELS = {info.name.lower(): info for info in [
+    ModelInfo("llama-3.3-70b-versatile", 131072, 32768),
+    ModelInfo("llama-3.1-8b-instant", 131072, 131072),
+    ModelInfo("qwen/qwen3-32b", 131072, 40960),
+    ModelInfo("meta-llama/llama-4-scout-17b-16e-instruct", 131072, 8192),
+    ModelInfo("openai/gpt-oss-20b", 131072, 65536),
+    ModelInfo("Qwen/Qwen2.5-72B-Instruct", 32768, 8192),
+    ModelInfo("Qwen/Qwen2.5-3B-Instruct", 32768, 8192),
+    ModelInfo("meta-llama/Llama-3.3-70B-Instruct", 131072, 8192),
+    ModelInfo("mistralai/Mixtral-8x7B-Instruct-v0.1", 32768, 4096, encoding="cl100k_base", chars_per_token=3.5),
+]}
+# Conservative window for models we know nothing about.
+DEFAULT_CONTEXT_WINDOW = 8192
+
+
+class ModelRegistry:
+    """
+    Context windows per model, with overrides from the [MODELS] section of config.ini
+    (model_name = context_window), and cached token counting.
+    Counts use tiktoken when it is installed and fall back to chars_per_token otherwise.
+    tiktoken may download its BPE files on first use, so encoders load on a background thread
+    (or in preload() at startup) and counts are approximate until they are ready.
+    """
+    def __init__(self, max_cached_counts: int = 4096):
+        self.models: Dict[str, ModelInfo] = dict(KNOWN_MODELS)
+        self.encoders: Dict[str, object] = {}
+        self.loading: Dict[str, threading.Thread] = {}
+        self.counts: "OrderedDict[Tuple[str, int, int], int]" = OrderedDict()
+        self.max_cached_counts = max_cached_counts
+        self.lock = threading.Lock()
+        self.stats = {"exact": 0, "approximate": 0, "cache_hits": 0}
+        self.logger = Logger("model_registry.log")
+
+    def load_overrides(self, section) -> None:
+        for name, value in (section or {}).items():
+            try:
+                window = int(value)
+            except (TypeError, ValueError):
+                self.logger.warning(f"Ignoring [MODELS] {name} = {value}: not a token count")
+                continue
+            base = self.get(name)
+            self.models[name.lower()] = ModelInfo(name, window, min(base.max_output, window // 2),
+                                                  base.encoding, base.chars_per_token)
+
+    def get(self, model: Optional[str]) -> ModelInfo:
+        if not model:
+            return ModelInfo("unknown", DEFAULT_CONTEXT_WINDOW)
+        info = self.models.get(model.lower())
+        if info is None:
+            # Provider-prefixed names ("groq/llama-3.3-70b-versatile") resolve to the bare model.
+            info = self.models.get(model.lower().split("/", 1)[-1]) if "/" in model else None
+        return info or ModelInfo(model, DEFAULT_CONTEXT_WINDOW)
+
+    def _load_encoder(self, encoding: str) -> None:
+        try:
+            encoder = tiktoken.get_encoding(encoding)
+        except Exception as e:
+            self.logger.warning(f"tiktoken encoding {encoding} unavailable, approximating: {str(e)}")
+            encoder = None
+        self.encoders[encoding] = encoder
+
+    def _encoder(self, encoding: str):
+        """The loaded encoder, or None while it loads in the background (never blocks the caller)."""
+        if not TIKTOKEN_FOUND:
+            return None
+        if encoding in self.encoders:
+            return self.encoders[encoding]
+        with self.lock:
+            if encoding not in self.loading:
+                thread = threading.Thread(target=self._load_encoder, args=(encoding,),
+                                          name=f"tiktoken-{encoding}", daemon=True)
+                self.loading[encoding] = thread
+                thread.start()
+        return None
+
+    def preload(self, models=None, wait: bool = True) -> None:
+        """Load the encoders of models (all known models by default), e.g. at startup."""
+        encodings = {self.get(model).encoding for model in models} if models else \
+            {info.encoding for info in self.models.values()}
+        for encoding in encodings:
+            self._encoder(encoding)
+        if wait:
+            for encoding in encodings:
+                thread = self.loading.get(encoding)
+                if thread is not None:
+                    thread.join()
+
+    def count_tokens(self, text: str, model: Optional[str] = None) -> int:
+        if not text:
+            return 0
+        info = self.get(model)
+        encoder = self._encoder(info.encoding)
+        if encoder is None:
+            self.stats["approximate"] += 1
+            return math.ceil(len(text) / info.chars_per_token)
+        key = (info.encoding, hash(text), len(text))
+        with self.lock:
+            count = self.counts.get(key)
+            if count is not None:
+                self.counts.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return count
+        count = len(encoder.encode(text, disallowed_special=()))
+        with self.lock:
+            self.counts[key] = count
+            while len(self.counts) > self.max_cached_counts:
+                self.counts.popitem(last=False)
+            self.stats["exact"] += 1
+        return count
+
+    def count_messages(self, messages, model: Optional[str] = None) -> int:
+        # ~4 tokens of chat template overhead per message.
+        return sum(self.count_tokens(str(m.get("content", "")), model) + 4 for m in messages)
+
+    def trim_to_tokens(self, text: str, budget: int, model: Optional[str] = None) -> str:
+        """Longest prefix of text that fits in budget tokens."""
+        if budget <= 0:
+            return ""
+        info = self.get(model)
+        # Byte-level BPE tokens cover at least one byte, so this many bytes always fits.
+        if len(text) <= budget and len(text.encode("utf-8")) <= budget:
+            return text
+        encoder = self._encoder(info.encoding)
+        if encoder is None:
+            return text[:int(budget * info.chars_per_token)]
+        tokens = encoder.encode(text, disallowed_special=())
+        if len(tokens) <= budget:
+            return text
+        return encoder.decode(tokens[:budget])
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "tiktoken": TIKTOKEN_FOUND, "cached_counts": len(self.counts),
+                "encoders": sorted(name for name, encoder in self.encoders.items() if encoder is not None),
+                "models": {name: asdict(info) for name, info in self.models.items()}}
+
+
+model_registry = ModelRegistry()
@@ -7,6 +7,7 @@ from dataclasses import dataclass, field
 from sources.logger import Logger
 from sources.utility import pretty_print, animate_thinking
 from sources.persistent_memory import PersistentMemory
+from sources.usage import usage_scope
 
 
 @dataclass
@@ -95,7 +96,7 @@ class ExecutionPlan:
 
 
 class AutonomousOrchestrator:
-    def __init__(self, agents: dict, provider, ws_manager=None):
+    def __init__(self, agents: dict, provider, ws_manager=None, session_id: str = ""):
         self.agents = agents
         self.provider = provider
         self.logger = Logger("orchestrator.log")
@@ -104,26 +105,29 @@ class AutonomousOrchestrator:
         self.status_message = "Idle"
         self.last_answer = ""
         self.ws_manager = ws_manager
+        # Tags every realtime event so only the owning session's clients receive it.
+        self.session_id = session_id
         self.persistent_memory = PersistentMemory()
 
     async def _notify_status(self, agent_name: str, status: str, progress: float = 0.0, details: str = ""):
         if self.ws_manager:
             try:
-                await self.ws_manager.send_status(agent_name, status, progress, details)
+                await self.ws_manager.send_status(agent_name, status, progress, details, session_id=self.session_id)
             except Exception:
                 pass
 
     async def _notify_plan(self, current_step: int = 0):
         if self.ws_manager and self.plan:
             try:
-                await self.ws_manager.send_plan_update(self.plan.get_progress_data(), current_step)
+                await self.ws_manager.send_plan_update(self.plan.get_progress_data(), current_step,
+                                                       session_id=self.session_id)
             except Exception:
                 pass
 
     async def _send_peor(self, phase: str, step_id: int = 0, details: str = ""):
         if self.ws_manager:
             try:
-                await self.ws_manager.send_peor_update(phase, step_id, details)
+                await self.ws_manager.send_peor_update(phase, step_id, details, session_id=self.session_id)
             except Exception:
                 pass
 
@@ -149,6 +153,7 @@ class AutonomousOrchestrator:
                     elapsed_time=elapsed,
                     estimated_remaining=estimated_remaining,
                     success_rate=success_rate,
+                    session_id=self.session_id,
                 )
             except Exception:
                 pass
@@ -215,7 +220,8 @@ class AutonomousOrchestrator:
 
         if self.ws_manager:
             try:
-                await self.ws_manager.send_agent_thinking(agent_key, f"Processing step {step.id}: {step.description[:100]}")
+                await self.ws_manager.send_agent_thinking(agent_key, f"Processing step {step.id}: {step.description[:100]}",
+                                                     session_id=self.session_id)
             except Exception:
                 pass
 
@@ -224,7 +230,8 @@ class AutonomousOrchestrator:
                                    step.id / total_steps, step.description[:100])
 
         try:
-            answer, reasoning = await agent.process(prompt, None)
+            with usage_scope(plan_step=step.id):
+                answer, reasoning = await agent.process(prompt, None)
             success = agent.get_success
 
             self.execution_memory.append({
@@ -272,7 +279,7 @@ class AutonomousOrchestrator:
             try:
                 log_level = "success" if success else "error"
                 asyncio.get_event_loop().create_task(
-                    self.ws_manager.send_execution_log(log_level, reflection, step.agent_type)
+                    self.ws_manager.send_execution_log(log_level, reflection, step.agent_type, session_id=self.session_id)
                 )
             except Exception:
                 pass
@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from sources.llm_provider import Provider
+from sources.logger import Logger
+
+
+class ProviderHandle:
+    """
+    Stable reference handed to agents in place of a Provider.
+    Attribute access is forwarded to the active provider, so swapping it is a single
+    reference assignment; calls already in flight finish on the provider they started with.
+    """
+    def __init__(self, provider: Provider):
+        self._provider = provider
+
+    @property
+    def current(self) -> Provider:
+        return self._provider
+
+    def swap(self, provider: Provider) -> Provider:
+        previous, self._provider = self._provider, provider
+        return previous
+
+    def __getattr__(self, name):
+        return getattr(self._provider, name)
+
+    def __repr__(self) -> str:
+        return f"ProviderHandle({self._provider.provider_name}/{self._provider.model})"
+
+
+class ProviderRegistry:
+    """
+    Cache of Provider instances keyed by (provider_name, model, server_address, is_local),
+    with one active ProviderHandle that live agents share.
+    """
+    def __init__(self, max_cached: int = 8):
+        self.max_cached = max_cached
+        self.providers: "OrderedDict[Tuple[str, str, str, bool], Provider]" = OrderedDict()
+        self.handle: Optional[ProviderHandle] = None
+        self.on_swap: List[Callable[[Provider], None]] = []
+        self.lock = threading.Lock()
+        self.logger = Logger("provider_registry.log")
+
+    def get_or_create(self, provider_name: str, model: str, server_address: str, is_local: bool = False) -> Provider:
+        key = (provider_name.lower(), model, server_address, is_local)
+        with self.lock:
+            provider = self.providers.get(key)
+            if provider is not None:
+                self.providers.move_to_end(key)
+                return provider
+        provider = Provider(provider_name=provider_name, model=model,
+                            server_address=server_address, is_local=is_local)
+        with self.lock:
+            self.providers[key] = provider
+            while len(self.providers) > self.max_cached:
+                self.providers.popitem(last=False)
+        return provider
+
+    def activate(self, provider_name: str, model: str, server_address: str, is_local: bool = False) -> ProviderHandle:
+        """
+        Make the given provider/model active and return the shared handle.
+        Raises whatever Provider raises (unknown provider, missing API key) without touching the active one.
+        """
+        provider = self.get_or_create(provider_name, model, server_address, is_local)
+        with self.lock:
+            if self.handle is None:
+                self.handle = ProviderHandle(provider)
+                previous = None
+            else:
+                previous = self.handle.swap(provider)
+        if previous is not None and previous is not provider:
+            self.logger.info(f"Provider swapped: {previous.provider_name}/{previous.model} -> {provider.provider_name}/{provider.model}")
+            for callback in self.on_swap:
+                try:
+                    callback(provider)
+                except Exception as e:
+                    self.logger.warning(f"Provider swap callback failed: {str(e)}")
+        return self.handle
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            active = self.handle.current if self.handle is not None else None
+            return {
+                "active": f"{active.provider_name}/{active.model}" if active else None,
+                "cached": [f"{name}/{model}" for name, model, _, _ in self.providers.keys()],
+            }
@@ -0,0 +1,340 @@
+import re
+import time
+import asyncio
+import threading
+import contextvars
+from collections import OrderedDict, deque
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, List, Mapping, Optional, Tuple
+from sources.logger import Logger
+from sources.metrics import LLM_RATE_LIMIT_WAIT_SECONDS, LLM_RATE_LIMIT_QUEUED, LLM_RATE_LIMITED
+
+# Session on whose behalf the current LLM call runs; waiters are served round-robin across sessions.
+request_session: contextvars.ContextVar[str] = contextvars.ContextVar("llm_request_session", default="")
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value) -> Optional[float]:
+    """Seconds from '12', '7.66s', '2m59.56s', '1h2m' or '250ms'; None if unparseable."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts or "".join(n + u for n, u in parts) != value.replace(" ", ""):
+        return None
+    scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def parse_retry_after(headers: Mapping) -> Optional[float]:
+    milliseconds = header(headers, "retry-after-ms")
+    if milliseconds is not None:
+        seconds = parse_duration(milliseconds)
+        return seconds / 1000 if seconds is not None else None
+    value = header(headers, "retry-after")
+    if value is None:
+        return None
+    seconds = parse_duration(value)
+    if seconds is not None:
+        return seconds
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def header(headers: Optional[Mapping], name: str) -> Optional[str]:
+    if not headers:
+        return None
+    value = headers.get(name)
+    if value is None and isinstance(headers, dict):
+        value = next((v for k, v in headers.items() if k.lower() == name), None)
+    return value
+
+
+def headers_from_error(error: BaseException) -> Optional[Mapping]:
+    """Response headers of an SDK HTTP error, looking through wrapped causes."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if headers:
+            return headers
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def estimate_tokens(history: List[Dict]) -> int:
+    """Rough prompt size (4 characters per token) charged against a tokens-per-minute quota."""
+    return sum(len(str(message.get("content", ""))) for message in history) // 4
+
+
+class Waiter:
+    __slots__ = ("session", "cost", "event", "loop", "future", "granted", "enqueued_at")
+
+    def __init__(self, session: str, cost: int, loop: asyncio.AbstractEventLoop = None):
+        self.session = session
+        self.cost = cost
+        self.loop = loop
+        self.event = None if loop is not None else threading.Event()
+        self.future = loop.create_future() if loop is not None else None
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+
+    def grant(self) -> None:
+        self.granted = True
+        if self.future is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(lambda: self.future.done() or self.future.set_result(None))
+
+
+class ProviderLimit:
+    """
+    Quota view for one (provider, model): an optional local requests-per-minute bucket, the
+    remaining request/token quota and reset times reported by the provider's x-ratelimit-*
+    headers, and a retry-after block after a 429.
+    """
+    def __init__(self, provider: str, model: str, rpm: Optional[float] = None):
+        self.provider = provider
+        self.model = model
+        self.rpm = rpm
+        self.bucket = float(rpm) if rpm else 0.0
+        self.refilled_at = time.monotonic()
+        self.remaining_requests: Optional[float] = None
+        self.requests_reset_at: Optional[float] = None
+        self.remaining_tokens: Optional[float] = None
+        self.tokens_reset_at: Optional[float] = None
+        self.blocked_until = 0.0
+        self.waiters: "OrderedDict[str, Deque[Waiter]]" = OrderedDict()
+        self.timer: Optional[threading.Timer] = None
+        self.stats = {"granted": 0, "waited": 0, "rate_limited": 0, "wait_seconds": 0.0, "max_wait": 0.0}
+
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self.waiters.values())
+
+    def _refill(self, now: float) -> None:
+        if self.rpm:
+            self.bucket = min(float(self.rpm), self.bucket + (now - self.refilled_at) * self.rpm / 60.0)
+        self.refilled_at = now
+
+    def delay(self, cost: int, now: float) -> float:
+        """Seconds until a request of `cost` tokens may be sent; 0 if it may go now."""
+        waits = [self.blocked_until - now]
+        self._refill(now)
+        if self.rpm and self.bucket < 1.0:
+            waits.append((1.0 - self.bucket) * 60.0 / self.rpm)
+        if self.requests_reset_at is not None and now >= self.requests_reset_at:
+            self.remaining_requests = self.requests_reset_at = None
+        if self.remaining_requests is not None and self.remaining_requests < 1:
+            waits.append(self.requests_reset_at - now if self.requests_reset_at is not None else 1.0)
+        if self.tokens_reset_at is not None and now >= self.tokens_reset_at:
+            self.remaining_tokens = self.tokens_reset_at = None
+        if self.remaining_tokens is not None and self.remaining_tokens < max(cost, 1):
+            waits.append(self.tokens_reset_at - now if self.tokens_reset_at is not None else 1.0)
+        return max(0.0, max(waits))
+
+    def take(self, cost: int) -> None:
+        if self.rpm:
+            self.bucket -= 1.0
+        if self.remaining_requests is not None:
+            self.remaining_requests -= 1
+        if self.remaining_tokens is not None:
+            self.remaining_tokens -= cost
+        self.stats["granted"] += 1
+
+    def refund(self, cost: int) -> None:
+        if self.rpm:
+            self.bucket = min(float(self.rpm), self.bucket + 1.0)
+        if self.remaining_requests is not None:
+            self.remaining_requests += 1
+        if self.remaining_tokens is not None:
+            self.remaining_tokens += cost
+
+    def update(self, headers: Mapping, now: float) -> None:
+        remaining = parse_duration(header(headers, "x-ratelimit-remaining-requests"))
+        if remaining is not None:
+            self.remaining_requests = remaining
+            reset = parse_duration(header(headers, "x-ratelimit-reset-requests"))
+            self.requests_reset_at = now + reset if reset is not None else None
+        remaining = parse_duration(header(headers, "x-ratelimit-remaining-tokens"))
+        if remaining is not None:
+            self.remaining_tokens = remaining
+            reset = parse_duration(header(headers, "x-ratelimit-reset-tokens"))
+            self.tokens_reset_at = now + reset if reset is not None else None
+        retry_after = parse_retry_after(headers)
+        if retry_after is not None:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+
+    def get_stats(self, now: float) -> Dict:
+        return {
+            "queued": self.queued(),
+            "blocked_for": round(max(0.0, self.blocked_until - now), 2),
+            "remaining_requests": self.remaining_requests,
+            "remaining_tokens": self.remaining_tokens,
+            "avg_wait": round(self.stats["wait_seconds"] / self.stats["waited"], 3) if self.stats["waited"] else 0.0,
+            **{k: round(v, 3) if isinstance(v, float) else v for k, v in self.stats.items()},
+        }
+
+
+class RateLimiter:
+    """
+    Shared limiter in front of every LLM call, keyed by (provider, model).
+    A call that may not go yet waits in a per-session queue; queues are served round-robin,
+    so one busy session cannot starve the others. Sync callers block on an Event, async
+    callers await a future, and a timer thread wakes the queue when quota frees up.
+    """
+    def __init__(self, rpm: Optional[Dict[str, float]] = None, enabled: bool = True):
+        self.rpm = dict(rpm or {})
+        self.enabled = enabled
+        self.limits: Dict[Tuple[str, str], ProviderLimit] = {}
+        self.lock = threading.Lock()
+        self.logger = Logger("rate_limiter.log")
+
+    def configure(self, enabled: bool = None, rpm: Dict[str, float] = None) -> None:
+        with self.lock:
+            if enabled is not None:
+                self.enabled = enabled
+            if rpm is not None:
+                self.rpm = dict(rpm)
+                for limit in self.limits.values():
+                    limit.rpm = self.rpm.get(limit.provider)
+
+    def limit(self, provider: str, model: str) -> ProviderLimit:
+        with self.lock:
+            return self._limit(provider, model)
+
+    def _limit(self, provider: str, model: str) -> ProviderLimit:
+        limit = self.limits.get((provider, model))
+        if limit is None:
+            limit = self.limits[(provider, model)] = ProviderLimit(provider, model, self.rpm.get(provider))
+            LLM_RATE_LIMIT_QUEUED.set_function(limit.queued, provider=provider, model=model)
+        return limit
+
+    def _enqueue(self, provider: str, model: str, cost: int, session: Optional[str],
+                 loop: asyncio.AbstractEventLoop = None) -> Tuple[ProviderLimit, Optional[Waiter]]:
+        """Take quota now (returns no waiter) or queue a waiter that is granted later."""
+        with self.lock:
+            limit = self._limit(provider, model)
+            if not limit.waiters and limit.delay(cost, time.monotonic()) == 0:
+                limit.take(cost)
+                return limit, None
+            session = request_session.get() if session is None else session
+            waiter = Waiter(session, cost, loop)
+            limit.waiters.setdefault(session, deque()).append(waiter)
+            self._dispatch(limit)
+            return limit, waiter
+
+    def _dispatch(self, limit: ProviderLimit) -> None:
+        """Grant queued waiters round-robin across sessions while quota allows; lock held."""
+        now = time.monotonic()
+        while limit.waiters:
+            session, queue = next(iter(limit.waiters.items()))
+            wait = limit.delay(queue[0].cost, now)
+            if wait > 0:
+                self._wake_after(limit, wait)
+                return
+            waiter = queue.popleft()
+            if queue:
+                limit.waiters.move_to_end(session)
+            else:
+                del limit.waiters[session]
+            limit.take(waiter.cost)
+            waiter.grant()
+
+    def _wake_after(self, limit: ProviderLimit, wait: float) -> None:
+        if limit.timer is not None:
+            limit.timer.cancel()
+        limit.timer = threading.Timer(wait, self._on_timer, args=(limit,))
+        limit.timer.daemon = True
+        limit.timer.start()
+
+    def _on_timer(self, limit: ProviderLimit) -> None:
+        with self.lock:
+            limit.timer = None
+            self._dispatch(limit)
+
+    def _record_wait(self, limit: ProviderLimit, waited: float) -> float:
+        with self.lock:
+            limit.stats["waited"] += 1
+            limit.stats["wait_seconds"] += waited
+            limit.stats["max_wait"] = max(limit.stats["max_wait"], waited)
+        LLM_RATE_LIMIT_WAIT_SECONDS.observe(waited, provider=limit.provider, model=limit.model)
+        if waited > 1.0:
+            self.logger.info(f"Waited {waited:.1f}s for {limit.provider}/{limit.model} quota")
+        return waited
+
+    def acquire(self, provider: str, model: str, cost: int = 0, session: str = None) -> float:
+        """Block until the call may be sent; returns the time spent queued."""
+        if not self.enabled:
+            return 0.0
+        limit, waiter = self._enqueue(provider, model, cost, session)
+        if waiter is None:
+            return 0.0
+        waiter.event.wait()
+        return self._record_wait(limit, time.monotonic() - waiter.enqueued_at)
+
+    async def acquire_async(self, provider: str, model: str, cost: int = 0, session: str = None) -> float:
+        """Await quota without holding a thread; cancelling the caller leaves the queue."""
+        if not self.enabled:
+            return 0.0
+        limit, waiter = self._enqueue(provider, model, cost, session, asyncio.get_running_loop())
+        if waiter is None:
+            return 0.0
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self.lock:
+                if waiter.granted:
+                    limit.refund(waiter.cost)
+                else:
+                    queue = limit.waiters.get(waiter.session)
+                    if queue is not None and waiter in queue:
+                        queue.remove(waiter)
+                        if not queue:
+                            del limit.waiters[waiter.session]
+                self._dispatch(limit)
+            raise
+        return self._record_wait(limit, time.monotonic() - waiter.enqueued_at)
+
+    def record_response(self, provider: str, model: str, headers: Optional[Mapping]) -> None:
+        """Update the remaining quota from a response's x-ratelimit-* headers."""
+        if not headers:
+            return
+        with self.lock:
+            limit = self._limit(provider, model)
+            limit.update(headers, time.monotonic())
+            self._dispatch(limit)
+
+    def record_rate_limited(self, provider: str, model: str, error: BaseException, fallback_delay: float) -> float:
+        """
+        Block the (provider, model) after a 429 for the advertised retry-after (or fallback_delay);
+        later acquire() calls wait it out. Returns the block duration.
+        """
+        headers = headers_from_error(error)
+        retry_after = parse_retry_after(headers) if headers else None
+        delay = retry_after if retry_after is not None else fallback_delay
+        LLM_RATE_LIMITED.inc(provider=provider, model=model)
+        with self.lock:
+            limit = self._limit(provider, model)
+            now = time.monotonic()
+            if headers:
+                limit.update(headers, now)
+            limit.blocked_until = max(limit.blocked_until, now + delay)
+            limit.stats["rate_limited"] += 1
+            self._dispatch(limit)
+        return delay
+
+    def get_stats(self) -> Dict:
+        now = time.monotonic()
+        with self.lock:
+            return {"enabled": self.enabled, "rpm": dict(self.rpm),
+                    "limits": {f"{p}/{m}": limit.get_stats(now) for (p, m), limit in self.limits.items()}}
+
+
+rate_limiter = RateLimiter()
@@ -1,122 +1,351 @@
-import asyncio
-import json
 import time
-from typing import Dict, Set, Optional
+import uuid
+import asyncio
+from typing import Dict, List, Set, Optional, Tuple
 from fastapi import WebSocket
 from sources.logger import Logger
+from sources.metrics import WS_CLIENTS, WS_DISCONNECTS
+from sources.ws_client import ClientConnection
+from sources.event_log import EventLog
+from sources.subscriptions import ANY, Subscription, SubscriptionIndex
+from sources.ws_encoding import ENCODING_JSON, available_encodings, encode
+
+# Minimum seconds between two messages with the same coalesce key; 0 sends immediately.
+DEFAULT_MIN_INTERVALS = {
+    "status": 0.1,
+    "plan": 0.25,
+    "plan_progress": 0.25,
+    "peor": 0.1,
+    "file_update": 0.25,
+}
+MAX_FILE_BATCH = 200
+# Payload caps; with MessagePack and permessage-deflate these carry full execution output.
+MAX_CODE_SNIPPET = 20000
+MAX_EXECUTION_RESULT = 50000
+MAX_FILE_CONTENT = 20000
 
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Set[WebSocket] = set()
+    """
+    Fan messages out to WebSocket clients without awaiting any of them.
+    Each client has a bounded queue and a writer task (see ClientConnection), so a slow
+    or half-dead client only ever delays itself. Clients receive only the messages matching
+    their Subscription (session, event type, agent).
+    """
+    def __init__(self, max_queue: int = 256, max_lag: float = 10.0, send_timeout: float = 5.0):
+        self.max_queue = max_queue
+        self.max_lag = max_lag
+        self.send_timeout = send_timeout
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.event_log = EventLog()
+        self.subscriptions = SubscriptionIndex()
+        self.min_intervals: Dict[str, float] = dict(DEFAULT_MIN_INTERVALS)
+        self.last_sent: Dict[str, float] = {}
+        self.pending: Dict[str, Dict] = {}
+        self.flush_handles: Dict[str, asyncio.TimerHandle] = {}
+        self.pending_files: Dict[str, Dict] = {}
+        self.stats = {"published": 0, "merged": 0, "file_batches": 0, "files_batched": 0,
+                      "replayed": 0, "resyncs": 0}
         self.logger = Logger("realtime.log")
+        WS_CLIENTS.set_function(lambda: len(self.clients))
+
+    @property
+    def active_connections(self) -> Set[WebSocket]:
+        return set(self.clients.keys())
+
+    async def connect(self, websocket: WebSocket, resume_from: Optional[int] = None,
+                      epoch: Optional[str] = None, subscription: Optional[Subscription] = None,
+                      encoding: str = ENCODING_JSON, subprotocol: Optional[str] = None) -> ClientConnection:
+        """
+        Accept the socket and greet it with the current epoch and sequence number.
+        A client passing resume_from (and the epoch it saw) first receives the events it missed,
+        or a resync message when they are no longer retained.
+        Without a subscription the client receives every session's events.
+        encoding comes from ws_encoding.negotiate(); subprotocol is echoed in the handshake.
+        """
+        subscription = subscription or Subscription()
+        await websocket.accept(subprotocol=subprotocol)
+        client = ClientConnection(websocket, uuid.uuid4().hex[:12], max_queue=self.max_queue,
+                                  max_lag=self.max_lag, send_timeout=self.send_timeout,
+                                  on_close=self._on_client_closed, encoding=encoding)
+        # No await from here on: replayed events must be queued before any live broadcast.
+        client.enqueue(encode({"type": "hello", "epoch": self.event_log.epoch,
+                               "latest_seq": self.event_log.seq, "subscription": subscription.jsonify(),
+                               "encoding": encoding, "encodings": available_encodings(),
+                               "timestamp": time.time()}, encoding))
+        if resume_from is not None:
+            self._replay(client, resume_from, epoch, subscription)
+        self.clients[websocket] = client
+        self.subscriptions.subscribe(client, subscription)
+        client.start()
+        self.logger.info(f"WebSocket connected. Total: {len(self.clients)}")
+        return client
+
+    def _replay(self, client: ClientConnection, resume_from: int, epoch: Optional[str], subscription: Subscription) -> None:
+        events = None
+        if epoch == self.event_log.epoch:
+            events = self.event_log.since(resume_from, subscription.sessions, every_session=ANY in subscription.sessions)
+            if events is not None:
+                events = [message for message in events if subscription.accepts(message)]
+        if events is None or len(events) >= self.max_queue:
+            reason = "epoch" if epoch != self.event_log.epoch else "gap"
+            client.enqueue(encode({"type": "resync", "reason": reason, "latest_seq": self.event_log.seq,
+                                   "timestamp": time.time()}, client.encoding))
+            self.stats["resyncs"] += 1
+            return
+        for message in events:
+            client.enqueue(encode(message, client.encoding))
+        self.stats["replayed"] += len(events)
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.add(websocket)
-        self.logger.info(f"WebSocket connected. Total: {len(self.active_connections)}")
+    def subscribe(self, websocket: WebSocket, subscription: Subscription) -> None:
+        client = self.clients.get(websocket)
+        if client is not None:
+            self.subscriptions.subscribe(client, subscription)
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.discard(websocket)
-        self.logger.info(f"WebSocket disconnected. Total: {len(self.active_connections)}")
+        client = self.clients.get(websocket)
+        if client is not None:
+            client.close("client")
+
+    def _on_client_closed(self, client: ClientConnection, reason: str) -> None:
+        self.clients.pop(client.websocket, None)
+        self.subscriptions.unsubscribe(client)
+        WS_DISCONNECTS.inc(reason=reason)
+        if reason == "client":
+            self.logger.info(f"WebSocket disconnected. Total: {len(self.clients)}")
+        else:
+            self.logger.warning(f"WebSocket {client.client_id} dropped ({reason}): {client.get_stats()}. Total: {len(self.clients)}")
 
-    async def broadcast(self, message: Dict):
-        if not self.active_connections:
+    def publish(self, message: Dict, coalesce_key: Optional[str] = None) -> None:
+        """Enqueue message for every subscribed client; never waits on a socket."""
+        self.stats["published"] += 1
+        self.event_log.append(message)
+        recipients = self.subscriptions.match(message)
+        if not recipients:
             return
-        dead = set()
-        msg_text = json.dumps(message, ensure_ascii=False)
-        for ws in self.active_connections:
-            try:
-                await ws.send_text(msg_text)
-            except Exception:
-                dead.add(ws)
-        for ws in dead:
-            self.active_connections.discard(ws)
-
-    async def send_status(self, agent_name: str, status: str, progress: float = 0.0, details: str = ""):
-        await self.broadcast({
+        # Serialize once per encoding in use, not once per client.
+        payloads = {}
+        for client in recipients:
+            payload = payloads.get(client.encoding)
+            if payload is None:
+                payload = payloads[client.encoding] = encode(message, client.encoding)
+            client.enqueue(payload, coalesce_key)
+
+    async def broadcast(self, message: Dict, coalesce_key: Optional[str] = None):
+        self.publish(message, coalesce_key)
+
+    def _schedule_flush(self, key: str, delay: float, callback) -> None:
+        if key not in self.flush_handles:
+            self.flush_handles[key] = asyncio.get_running_loop().call_later(delay, callback, key)
+
+    async def emit(self, event_type: str, message: Dict, key: str):
+        """
+        Rate-limit messages per key to the event type's minimum interval.
+        Within the interval the latest message replaces any pending one and is sent
+        when the interval elapses, so the final state always reaches clients.
+        A key is forgotten once a whole interval passes without messages, so per-session
+        and per-step keys do not accumulate.
+        """
+        interval = self.min_intervals.get(event_type, 0.0)
+        if interval <= 0:
+            self.publish(message, key)
+            return
+        now = time.monotonic()
+        flush = lambda k: self._flush(k, interval)
+        if key not in self.pending and now - self.last_sent.get(key, 0.0) >= interval:
+            self.last_sent[key] = now
+            self.publish(message, key)
+            self._schedule_flush(key, interval, flush)
+            return
+        if key in self.pending:
+            self.stats["merged"] += 1
+        self.pending[key] = message
+        self._schedule_flush(key, max(0.0, interval - (now - self.last_sent.get(key, 0.0))), flush)
+
+    def _flush(self, key: str, interval: float) -> None:
+        self.flush_handles.pop(key, None)
+        message = self.pending.pop(key, None)
+        if message is None:
+            self.last_sent.pop(key, None)
+            return
+        self.last_sent[key] = time.monotonic()
+        self.publish(message, key)
+        self._schedule_flush(key, interval, lambda k: self._flush(k, interval))
+
+    async def send_personal(self, websocket: WebSocket, message: Dict):
+        client = self.clients.get(websocket)
+        if client is not None:
+            client.enqueue(encode(message, client.encoding))
+
+    def get_stats(self) -> Dict:
+        clients = [client.get_stats() for client in list(self.clients.values())]
+        return {
+            "clients": len(clients),
+            "max_lag": max((c["lag"] for c in clients), default=0.0),
+            "dropped": sum(c["dropped"] for c in clients),
+            "pending": len(self.pending) + len(self.pending_files),
+            **self.stats,
+            "event_log": self.event_log.get_stats(),
+            "per_client": clients,
+        }
+
+    async def send_status(self, agent_name: str, status: str, progress: float = 0.0, details: str = "",
+                          session_id: str = ""):
+        await self.emit("status", {
             "type": "status",
             "agent_name": agent_name,
             "status": status,
             "progress": progress,
             "details": details,
+            "session_id": session_id,
+            "timestamp": time.time(),
+        }, f"status:{session_id}:{agent_name}")
+
+    async def send_token(self, agent_name: str, delta: str, session_id: str = ""):
+        await self.broadcast({
+            "type": "token",
+            "agent_name": agent_name,
+            "delta": delta,
+            "session_id": session_id,
             "timestamp": time.time(),
         })
 
-    async def send_execution_update(self, language: str, code_snippet: str, result: str, success: bool):
+    async def send_answer_update(self, session_id: str, version: int, changes: Dict):
+        await self.broadcast({
+            "type": "answer_update",
+            "session_id": session_id,
+            "version": version,
+            "changes": changes,
+            "timestamp": time.time(),
+        })
+
+    async def send_job_update(self, job: Dict):
+        await self.broadcast({
+            "type": "job",
+            **job,
+            "timestamp": time.time(),
+        })
+
+    async def send_execution_update(self, language: str, code_snippet: str, result: str, success: bool,
+                                    session_id: str = ""):
         await self.broadcast({
             "type": "execution",
             "language": language,
-            "code_snippet": code_snippet[:500],
-            "result": result[:1000],
+            "code_snippet": code_snippet[:MAX_CODE_SNIPPET],
+            "result": result[:MAX_EXECUTION_RESULT],
             "success": success,
+            "session_id": session_id,
             "timestamp": time.time(),
         })
 
     async def send_file_update(self, action: str, filepath: str, content: str = ""):
-        await self.broadcast({
+        await self.send_file_updates([(action, filepath)], {filepath: content} if content else None)
+
+    async def send_file_updates(self, changes: List[Tuple[str, str]], contents: Optional[Dict[str, str]] = None):
+        """
+        Buffer file changes and send them as one file_update message per interval.
+        A single change keeps the per-file message shape; several become an action "batch"
+        listing up to MAX_FILE_BATCH files, with count carrying the full number.
+        """
+        for action, filepath in changes:
+            content = (contents or {}).get(filepath, "")
+            self.pending_files[filepath] = {"action": action, "filepath": filepath,
+                                            "content": content[:MAX_FILE_CONTENT] if content else ""}
+        if not self.pending_files:
+            return
+        interval = self.min_intervals.get("file_update", 0.0)
+        if interval <= 0:
+            self._flush_files("file_update")
+            return
+        now = time.monotonic()
+        delay = max(0.0, interval - (now - self.last_sent.get("file_update", 0.0)))
+        if delay == 0.0 and "file_update" not in self.flush_handles:
+            self._flush_files("file_update")
+            return
+        self._schedule_flush("file_update", delay, self._flush_files)
+
+    def _flush_files(self, key: str) -> None:
+        self.flush_handles.pop(key, None)
+        files, self.pending_files = list(self.pending_files.values()), {}
+        if not files:
+            return
+        self.last_sent[key] = time.monotonic()
+        if len(files) == 1:
+            self.publish({"type": "file_update", **files[0], "timestamp": time.time()})
+            return
+        self.stats["file_batches"] += 1
+        self.stats["files_batched"] += len(files)
+        self.publish({
             "type": "file_update",
-            "action": action,
-            "filepath": filepath,
-            "content": content[:2000] if content else "",
+            "action": "batch",
+            "filepath": "",
+            "count": len(files),
+            "files": [{"action": f["action"], "filepath": f["filepath"]} for f in files[:MAX_FILE_BATCH]],
+            "truncated": len(files) > MAX_FILE_BATCH,
             "timestamp": time.time(),
         })
 
-    async def send_plan_update(self, plan: list, current_step: int = 0):
-        await self.broadcast({
+    async def send_plan_update(self, plan: list, current_step: int = 0, session_id: str = ""):
+        await self.emit("plan", {
             "type": "plan",
             "plan": plan,
             "current_step": current_step,
+            "session_id": session_id,
             "timestamp": time.time(),
-        })
+        }, f"plan:{session_id}")
 
-    async def send_preview_ready(self, preview_url: str, project_type: str):
+    async def send_preview_ready(self, preview_url: str, project_type: str, session_id: str = ""):
         await self.broadcast({
             "type": "preview_ready",
             "preview_url": preview_url,
             "project_type": project_type,
+            "session_id": session_id,
             "timestamp": time.time(),
         })
 
-    async def send_peor_update(self, phase: str, step_id: int = 0, details: str = ""):
-        await self.broadcast({
+    async def send_peor_update(self, phase: str, step_id: int = 0, details: str = "", session_id: str = ""):
+        await self.emit("peor", {
             "type": "peor",
             "phase": phase,
             "step_id": step_id,
             "details": details,
+            "session_id": session_id,
             "timestamp": time.time(),
-        })
+        }, f"peor:{session_id}:{step_id}")
 
-    async def send_agent_switch(self, agent_name: str, agent_type: str):
+    async def send_agent_switch(self, agent_name: str, agent_type: str, session_id: str = ""):
         await self.broadcast({
             "type": "agent_switch",
             "agent_name": agent_name,
             "agent_type": agent_type,
+            "session_id": session_id,
             "timestamp": time.time(),
         })
 
-    async def send_agent_thinking(self, agent_name: str, thinking_message: str):
+    async def send_agent_thinking(self, agent_name: str, thinking_message: str, session_id: str = ""):
         await self.broadcast({
             "type": "agent_thinking",
             "agent_name": agent_name,
             "thinking_message": thinking_message,
+            "session_id": session_id,
             "timestamp": time.time(),
         })
 
-    async def send_execution_log(self, level: str, message: str, agent_name: str = ""):
+    async def send_execution_log(self, level: str, message: str, agent_name: str = "", session_id: str = ""):
         await self.broadcast({
             "type": "execution_log",
             "level": level,
             "message": message,
             "agent_name": agent_name,
+            "session_id": session_id,
             "timestamp": time.time(),
         })
 
     async def send_plan_progress(self, total_steps: int, completed_steps: int, failed_steps: int,
                                   current_step_id: int = 0, current_step_description: str = "",
                                   elapsed_time: float = 0.0, estimated_remaining: float = 0.0,
-                                  success_rate: float = 0.0):
-        await self.broadcast({
+                                  success_rate: float = 0.0, session_id: str = ""):
+        await self.emit("plan_progress", {
             "type": "plan_progress",
             "total_steps": total_steps,
             "completed_steps": completed_steps,
@@ -126,8 +355,9 @@ class ConnectionManager:
             "elapsed_time": elapsed_time,
             "estimated_remaining": estimated_remaining,
             "success_rate": success_rate,
+            "session_id": session_id,
             "timestamp": time.time(),
-        })
+        }, f"plan_progress:{session_id}")
 
 
 ws_manager = ConnectionManager()
@@ -0,0 +1,170 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from sources.logger import Logger
+from sources.metrics import LLM_CACHE_LOOKUPS, LLM_CACHE_EVICTIONS
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_messages(messages: List[Dict]) -> List[Dict]:
+    """Role and content only, with whitespace runs collapsed and ends trimmed."""
+    return [{"role": m.get("role", ""), "content": _WHITESPACE.sub(" ", str(m.get("content", ""))).strip()}
+            for m in messages]
+
+
+def cache_keys(provider: str, model: str, messages: List[Dict], params: Optional[Dict] = None) -> Tuple[str, str]:
+    """(exact key, normalized key) for a request."""
+    def digest(msgs) -> str:
+        payload = json.dumps({"provider": provider, "model": model, "messages": msgs, "params": params or {}},
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    exact = digest([{"role": m.get("role", ""), "content": m.get("content", "")} for m in messages])
+    return exact, "n:" + digest(normalize_messages(messages))
+
+
+class ResponseCache:
+    """
+    Two-tier LLM response cache: an in-memory LRU in front of a SQLite table.
+    A lookup tries the exact request key first, then the whitespace-normalized one.
+    Entries expire after ttl seconds; the disk tier is trimmed to max_bytes by least recent access.
+    """
+    def __init__(self, path: str, ttl: float = 86400.0, max_memory_entries: int = 256,
+                 max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_bytes = max_bytes
+        self.memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self.logger = Logger("response_cache.log")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY, provider TEXT, model TEXT, response TEXT,
+            size INTEGER, created_at REAL, expires_at REAL, accessed_at REAL)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+        self.db.commit()
+
+    def _memory_get(self, key: str, now: float) -> Optional[str]:
+        entry = self.memory.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at < now:
+            del self.memory[key]
+            return None
+        self.memory.move_to_end(key)
+        return response
+
+    def _memory_put(self, key: str, response: str, expires_at: float) -> None:
+        self.memory[key] = (expires_at, response)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, provider: str, model: str, messages: List[Dict], params: Optional[Dict] = None) -> Optional[str]:
+        now = time.time()
+        with self.lock:
+            for key in cache_keys(provider, model, messages, params):
+                response = self._memory_get(key, now)
+                if response is not None:
+                    self.stats["hits"] += 1
+                    LLM_CACHE_LOOKUPS.inc(result="memory_hit")
+                    return response
+                row = self.db.execute("SELECT response, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    continue
+                response, expires_at = row
+                if expires_at < now:
+                    self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.db.commit()
+                    continue
+                self.db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self.db.commit()
+                self._memory_put(key, response, expires_at)
+                self.stats["hits"] += 1
+                LLM_CACHE_LOOKUPS.inc(result="disk_hit")
+                return response
+            self.stats["misses"] += 1
+            LLM_CACHE_LOOKUPS.inc(result="miss")
+            return None
+
+    def put(self, provider: str, model: str, messages: List[Dict], response: str,
+            params: Optional[Dict] = None) -> None:
+        if not response:
+            return
+        now = time.time()
+        expires_at = now + self.ttl
+        size = len(response.encode("utf-8"))
+        with self.lock:
+            for key in cache_keys(provider, model, messages, params):
+                self._memory_put(key, response, expires_at)
+                self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                (key, provider, model, response, size, now, expires_at, now))
+            self.stats["writes"] += 1
+            self._evict(now)
+            self.db.commit()
+
+    def _evict(self, now: float) -> None:
+        removed = self.db.execute("DELETE FROM responses WHERE expires_at < ?", (now,)).rowcount
+        if removed:
+            LLM_CACHE_EVICTIONS.inc(removed, reason="ttl")
+            self.stats["evictions"] += removed
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self.db.executemany("DELETE FROM responses WHERE key = ?", victims)
+        for (key,) in victims:
+            self.memory.pop(key, None)
+        LLM_CACHE_EVICTIONS.inc(len(victims), reason="size")
+        self.stats["evictions"] += len(victims)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.memory.clear()
+            self.db.execute("DELETE FROM responses")
+            self.db.commit()
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            entries, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            return {**self.stats, "memory_entries": len(self.memory), "disk_entries": entries, "disk_bytes": size}
+
+    def close(self) -> None:
+        with self.lock:
+            self.db.close()
+
+
+response_cache: Optional[ResponseCache] = None
+
+
+def configure_response_cache(enabled: bool, path: str = "memory_store/llm_cache.sqlite3", **settings) -> Optional[ResponseCache]:
+    """Enable (or disable with enabled=False) the process-wide cache providers consult."""
+    global response_cache
+    if response_cache is not None:
+        response_cache.close()
+        response_cache = None
+    if enabled:
+        response_cache = ResponseCache(path, **settings)
+    return response_cache
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    return response_cache
@@ -1,7 +1,10 @@
 import os
 import sys
+import copy
 import torch
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple, Type, Dict
 
 from transformers import pipeline
@@ -15,6 +18,8 @@ from sources.agents.browser_agent import BrowserAgent
 from sources.language import LanguageUtility
 from sources.utility import pretty_print, animate_thinking, timer_decorator
 from sources.logger import Logger
+from sources.startup import profiler
+from sources.metrics import timed, ROUTER_SELECT_SECONDS
 
 class AgentRouter:
     """
@@ -24,12 +29,39 @@ class AgentRouter:
         self.agents = agents
         self.logger = Logger("router.log")
         self.lang_analysis = LanguageUtility(supported_language=supported_language)
-        self.pipelines = self.load_pipelines()
-        self.talk_classifier = self.load_llm_router()
-        self.complexity_classifier = self.load_llm_router()
-        self.learn_few_shots_tasks()
-        self.learn_few_shots_complexity()
+        # The zero-shot pipeline and both classifiers are independent, load them concurrently.
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="router") as pool:
+            pipelines = pool.submit(self.tracked, "router.zero_shot", self.load_pipelines)
+            talk_classifier = pool.submit(self.tracked, "router.talk_classifier", self.load_llm_router)
+            complexity_classifier = pool.submit(self.tracked, "router.complexity_classifier", self.load_llm_router)
+            self.talk_classifier = talk_classifier.result()
+            self.complexity_classifier = complexity_classifier.result()
+            few_shots = [pool.submit(self.tracked, "router.few_shots_tasks", self.learn_few_shots_tasks),
+                         pool.submit(self.tracked, "router.few_shots_complexity", self.learn_few_shots_complexity)]
+            self.pipelines = pipelines.result()
+            for future in few_shots:
+                future.result()
         self.asked_clarify = False
+        # Shared by bound copies: sessions classify from worker threads, one at a time per classifier set.
+        self.inference_lock = threading.Lock()
+
+    @staticmethod
+    def tracked(name: str, loader):
+        with profiler.track(name):
+            return loader()
+
+    def bind(self, agents: list) -> "AgentRouter":
+        """
+        Create a router for another set of agents that shares the already loaded classifiers.
+        args:
+            agents (list): The agents the new router selects from
+        returns:
+            AgentRouter: A shallow copy routing to the given agents
+        """
+        router = copy.copy(self)
+        router.agents = agents
+        router.asked_clarify = False
+        return router
     
     def load_pipelines(self) -> Dict[str, Type[pipeline]]:
         """
@@ -403,14 +435,16 @@ class AgentRouter:
         self.talk_classifier.add_examples(texts, labels)
 
     def llm_router(self, text: str) -> tuple:
-        predictions = self.talk_classifier.predict(text)
+        with self.inference_lock:
+            predictions = self.talk_classifier.predict(text)
         predictions = [pred for pred in predictions if pred[0] not in ["HIGH", "LOW"]]
         predictions = sorted(predictions, key=lambda x: x[1], reverse=True)
         return predictions[0]
     
     def estimate_complexity(self, text: str) -> str:
         try:
-            predictions = self.complexity_classifier.predict(text)
+            with self.inference_lock:
+                predictions = self.complexity_classifier.predict(text)
         except Exception as e:
             pretty_print(f"Error in estimate_complexity: {str(e)}", color="failure")
             return "LOW"
@@ -442,6 +476,7 @@ class AgentRouter:
                 return agent
         return self.agents[0]
 
+    @timed(ROUTER_SELECT_SECONDS, lambda args, result, error: {"agent_type": getattr(result, "type", None) or "none"})
     def select_agent(self, text: str) -> Agent:
         if text is None or len(text.strip()) == 0:
             return None
@@ -8,6 +8,7 @@ import resource
 from dataclasses import dataclass, field
 from typing import Optional, List, Dict
 from sources.logger import Logger
+from sources.metrics import timed, outcome, SANDBOX_EXEC_SECONDS
 
 
 DANGEROUS_PATTERNS = [
@@ -359,6 +360,7 @@ class SafeExecutor:
             return result
         return result
 
+    @timed(SANDBOX_EXEC_SECONDS, lambda args, result, error: {"tool": args[2], "outcome": outcome(result, error)})
     def _run_code_subprocess(self, code: str, language: str, config: dict) -> SandboxResult:
         with tempfile.NamedTemporaryFile(mode='w', suffix=config['extension'],
                                           dir=self.work_dir, delete=False) as f:
@@ -6,14 +6,16 @@ from sources.utility import pretty_print
 class QueryRequest(BaseModel):
     query: str
     tts_enabled: bool = True
+    session_id: str = "default"
 
     def __str__(self):
-        return f"Query: {self.query}, TTS: {self.tts_enabled}"
+        return f"Query: {self.query}, TTS: {self.tts_enabled}, Session: {self.session_id}"
 
     def jsonify(self):
         return {
             "query": self.query,
             "tts_enabled": self.tts_enabled,
+            "session_id": self.session_id,
         }
 
 class QueryResponse(BaseModel):
@@ -0,0 +1,191 @@
+import time
+import json
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from dataclasses import dataclass, field
+from sources.logger import Logger
+from sources.answer_state import AnswerState
+
+DEFAULT_SESSION_ID = "default"
+
+
+@dataclass
+class Session:
+    session_id: str
+    interaction: object
+    is_generating: bool = False
+    query_resp_history: List[Dict] = field(default_factory=list)
+    partial_answer: str = ""
+    token_queues: List = field(default_factory=list)
+    answer_state: AnswerState = field(default_factory=AnswerState)
+    created_at: float = field(default_factory=time.time)
+    last_active: float = field(default_factory=time.time)
+    # Set whenever no query runs, so queued jobs can wait for the session instead of polling.
+    idle: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def __post_init__(self):
+        self.idle.set()
+
+    def touch(self):
+        self.last_active = time.time()
+
+    def set_generating(self, generating: bool) -> None:
+        self.is_generating = generating
+        if generating:
+            self.idle.clear()
+        else:
+            self.idle.set()
+
+    async def wait_idle(self) -> None:
+        while self.is_generating:
+            await self.idle.wait()
+
+    async def stream_events(self, run: Callable[[], Awaitable[Dict]]) -> AsyncIterator[str]:
+        """
+        Run a query and yield it as Server-Sent Events: a `token` event per delta put in
+        token_queues, then a `done` event with run()'s result. The query keeps running if
+        the client disconnects.
+        """
+        queue = asyncio.Queue()
+
+        async def run_query():
+            try:
+                await queue.put(("done", await run()))
+            except Exception as e:
+                await queue.put(("done", {"done": "true", "answer": f"Error: {str(e)}", "success": "false"}))
+
+        self.token_queues.append(queue)
+        task = asyncio.create_task(run_query())
+        try:
+            while True:
+                event, payload = await queue.get()
+                yield f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+                if event == "done":
+                    break
+        finally:
+            self.token_queues.remove(queue)
+
+
+class SessionManager:
+    """
+    Keep one Interaction (agents + memories) per client session.
+    Heavy components (provider, browser, router classifiers) are shared by the factory.
+    """
+    def __init__(self, factory: Callable[[str], object],
+                 max_sessions: int = 16,
+                 idle_timeout: float = 3600.0,
+                 save_on_evict: bool = False,
+                 on_register: Optional[Callable[[Session], None]] = None,
+                 on_evict: Optional[Callable[[Session], None]] = None):
+        self.factory = factory
+        self.on_register = on_register
+        self.on_evict = on_evict
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.save_on_evict = save_on_evict
+        self.sessions: Dict[str, Session] = {}
+        # Sessions whose interaction is being built in a worker thread, by id.
+        self.creating: Dict[str, asyncio.Task] = {}
+        self.logger = Logger("session_manager.log")
+
+    def register(self, session_id: str, interaction) -> Session:
+        session = Session(session_id=session_id, interaction=interaction)
+        self.sessions[session_id] = session
+        if self.on_register is not None:
+            self.on_register(session)
+        self.logger.info(f"Session registered: {session_id}. Total: {len(self.sessions)}")
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        session = self.sessions.get(session_id or DEFAULT_SESSION_ID)
+        if session:
+            session.touch()
+        return session
+
+    def get_or_create(self, session_id: str) -> Session:
+        session_id = session_id or DEFAULT_SESSION_ID
+        session = self.get(session_id)
+        if session is not None:
+            return session
+        self._make_room()
+        interaction = self.factory(session_id)
+        return self.register(session_id, interaction)
+
+    async def get_or_create_async(self, session_id: str) -> Session:
+        """
+        get_or_create() for the event loop: the interaction (provider setup, agents) is built
+        in a worker thread, and concurrent requests for the same new session share one build.
+        """
+        session_id = session_id or DEFAULT_SESSION_ID
+        session = self.get(session_id)
+        if session is not None:
+            return session
+        task = self.creating.get(session_id)
+        if task is None:
+            self._make_room()
+            task = self.creating[session_id] = asyncio.ensure_future(self._create(session_id))
+        return await asyncio.shield(task)
+
+    async def _create(self, session_id: str) -> Session:
+        try:
+            interaction = await asyncio.to_thread(self.factory, session_id)
+            return self.register(session_id, interaction)
+        finally:
+            self.creating.pop(session_id, None)
+
+    def _make_room(self) -> None:
+        self.evict_idle()
+        if len(self.sessions) + len(self.creating) >= self.max_sessions:
+            self._evict_least_recent()
+        if len(self.sessions) + len(self.creating) >= self.max_sessions:
+            raise RuntimeError(f"Maximum number of sessions reached ({self.max_sessions})")
+
+    def remove(self, session_id: str) -> bool:
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        if self.save_on_evict:
+            try:
+                session.interaction.save_session()
+            except Exception as e:
+                self.logger.warning(f"Failed to save session {session_id}: {e}")
+        for agent in getattr(session.interaction, "agents", []):
+            agent.request_stop()
+        self.logger.info(f"Session removed: {session_id}. Total: {len(self.sessions)}")
+        return True
+
+    def evict_idle(self) -> int:
+        now = time.time()
+        expired = [sid for sid, s in self.sessions.items()
+                   if sid != DEFAULT_SESSION_ID
+                   and not s.is_generating
+                   and now - s.last_active > self.idle_timeout]
+        for sid in expired:
+            self.remove(sid)
+        return len(expired)
+
+    def _evict_least_recent(self) -> None:
+        candidates = [s for sid, s in self.sessions.items()
+                      if sid != DEFAULT_SESSION_ID and not s.is_generating]
+        if not candidates:
+            return
+        oldest = min(candidates, key=lambda s: s.last_active)
+        self.logger.warning(f"Session limit ({self.max_sessions}) reached, evicting least recently used session "
+                            f"{oldest.session_id}")
+        self.remove(oldest.session_id)
+        if self.on_evict is not None:
+            self.on_evict(oldest)
+
+    def clear(self) -> None:
+        for sid in list(self.sessions.keys()):
+            self.remove(sid)
+
+    def generating_count(self) -> int:
+        return sum(1 for s in self.sessions.values() if s.is_generating)
+
+    def get_stats(self) -> Dict:
+        return {
+            "total_sessions": len(self.sessions),
+            "generating": self.generating_count(),
+            "max_sessions": self.max_sessions,
+        }
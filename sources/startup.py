@@ -0,0 +1,148 @@
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+from sources.logger import Logger
+
+STATE_PENDING = "pending"
+STATE_LOADING = "loading"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+
+@dataclass
+class ComponentStatus:
+    name: str
+    state: str = STATE_PENDING
+    lazy: bool = False
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def jsonify(self) -> Dict:
+        return {
+            "state": self.state,
+            "lazy": self.lazy,
+            "duration": round(self.duration, 3) if self.duration is not None else None,
+            "error": self.error,
+        }
+
+
+class StartupProfiler:
+    """
+    Record when each system component starts and finishes loading.
+    Feeds the readiness section of /health and the --profile-startup report.
+    """
+    def __init__(self):
+        self.components: Dict[str, ComponentStatus] = {}
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+        self.logger = Logger("startup.log")
+
+    def _status(self, name: str) -> ComponentStatus:
+        with self.lock:
+            if name not in self.components:
+                self.components[name] = ComponentStatus(name)
+            return self.components[name]
+
+    def register_lazy(self, name: str) -> None:
+        self._status(name).lazy = True
+
+    @contextmanager
+    def track(self, name: str):
+        status = self._status(name)
+        status.state = STATE_LOADING
+        status.started_at = time.time()
+        status.finished_at = None
+        status.error = None
+        try:
+            yield status
+        except Exception as e:
+            status.state = STATE_FAILED
+            status.error = str(e)
+            raise
+        finally:
+            status.finished_at = time.time()
+            if status.state != STATE_FAILED:
+                status.state = STATE_READY
+            self.logger.info(f"{name} {status.state} in {status.duration:.3f}s")
+
+    def run_parallel(self, tasks: Dict[str, Callable[[], Any]], max_workers: int = 4) -> Dict[str, Any]:
+        """
+        Run independent loaders concurrently and return their results by name.
+        Every loader is awaited; the first failure is re-raised afterwards.
+        """
+        def run(name: str, loader: Callable[[], Any]) -> Any:
+            with self.track(name):
+                return loader()
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="startup") as pool:
+            futures = {name: pool.submit(run, name, loader) for name, loader in tasks.items()}
+        results = {}
+        errors = []
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+        return results
+
+    def get_status(self) -> Dict[str, Dict]:
+        with self.lock:
+            return {name: status.jsonify() for name, status in self.components.items()}
+
+    def report(self) -> str:
+        with self.lock:
+            statuses = sorted(self.components.values(), key=lambda s: -(s.duration or 0.0))
+        lines = [f"{'component':<24}{'state':<10}{'seconds':>10}"]
+        for status in statuses:
+            duration = f"{status.duration:.3f}" if status.duration is not None else "-"
+            name = status.name + (" (lazy)" if status.lazy else "")
+            lines.append(f"{name:<24}{status.state:<10}{duration:>10}")
+        lines.append(f"{'total (wall)':<34}{time.time() - self.started_at:>10.3f}")
+        return "\n".join(lines)
+
+
+class LazyComponent:
+    """
+    Build a component on first attribute access, once, from any thread.
+    """
+    def __init__(self, name: str, factory: Callable[[], Any], profiler: Optional[StartupProfiler] = None):
+        self._name = name
+        self._factory = factory
+        self._profiler = profiler
+        self._instance = None
+        self._lock = threading.Lock()
+        if profiler is not None:
+            profiler.register_lazy(name)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> Any:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    if self._profiler is not None:
+                        with self._profiler.track(self._name):
+                            self._instance = self._factory()
+                    else:
+                        self._instance = self._factory()
+        return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+profiler = StartupProfiler()
@@ -0,0 +1,102 @@
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Iterable, List, Optional, Set
+
+ANY = "*"
+
+
+@dataclass
+class Subscription:
+    """
+    What a client wants to receive. Messages with a session_id must match one of sessions
+    (ANY matches all); messages without one are workspace-wide and match every session.
+    types and agents of None mean no filter; messages without an agent_name pass the agent filter.
+    """
+    sessions: Set[str] = field(default_factory=lambda: {ANY})
+    types: Optional[Set[str]] = None
+    agents: Optional[Set[str]] = None
+
+    def accepts(self, message: Dict) -> bool:
+        session_id = message.get("session_id")
+        if session_id and ANY not in self.sessions and session_id not in self.sessions:
+            return False
+        if self.types is not None and message.get("type") not in self.types:
+            return False
+        agent_name = message.get("agent_name")
+        if self.agents is not None and agent_name and agent_name not in self.agents:
+            return False
+        return True
+
+    def jsonify(self) -> Dict:
+        return {
+            "sessions": sorted(self.sessions),
+            "types": sorted(self.types) if self.types is not None else None,
+            "agents": sorted(self.agents) if self.agents is not None else None,
+        }
+
+
+def parse_topics(value) -> Optional[Set[str]]:
+    """Accept a list or a comma separated string; None or empty means no filter."""
+    if value is None:
+        return None
+    items = value.split(",") if isinstance(value, str) else value
+    topics = {str(item).strip() for item in items if str(item).strip()}
+    return topics or None
+
+
+class SubscriptionIndex:
+    """
+    Route messages to subscribers through per-session and per-type indexes, so the cost
+    of a message grows with the subscribers interested in it rather than with all connections.
+    """
+    def __init__(self):
+        self.subscriptions: Dict[Hashable, Subscription] = {}
+        self.by_session: Dict[str, Set[Hashable]] = {}
+        self.by_type: Dict[str, Set[Hashable]] = {}
+
+    def subscribe(self, key: Hashable, subscription: Subscription) -> None:
+        """Set (or replace) the subscription of key."""
+        self.unsubscribe(key)
+        if ANY in subscription.sessions:
+            subscription.sessions = {ANY}
+        self.subscriptions[key] = subscription
+        for session_id in subscription.sessions:
+            self.by_session.setdefault(session_id, set()).add(key)
+        for event_type in (subscription.types if subscription.types is not None else {ANY}):
+            self.by_type.setdefault(event_type, set()).add(key)
+
+    def unsubscribe(self, key: Hashable) -> None:
+        subscription = self.subscriptions.pop(key, None)
+        if subscription is None:
+            return
+        self._discard(self.by_session, subscription.sessions, key)
+        self._discard(self.by_type, subscription.types if subscription.types is not None else {ANY}, key)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[Hashable]], topics: Iterable[str], key: Hashable) -> None:
+        for topic in topics:
+            keys = index.get(topic)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del index[topic]
+
+    def get(self, key: Hashable) -> Optional[Subscription]:
+        return self.subscriptions.get(key)
+
+    def match(self, message: Dict) -> List[Hashable]:
+        session_id = message.get("session_id")
+        if session_id:
+            groups = (self.by_session.get(session_id, ()), self.by_session.get(ANY, ()) if session_id != ANY else ())
+        else:
+            event_type = message.get("type")
+            groups = (self.by_type.get(event_type, ()), self.by_type.get(ANY, ()) if event_type != ANY else ())
+        matched = []
+        for keys in groups:
+            for key in keys:
+                if self.subscriptions[key].accepts(message):
+                    matched.append(key)
+        return matched
+
+    def __len__(self) -> int:
+        return len(self.subscriptions)
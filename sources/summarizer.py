@@ -0,0 +1,120 @@
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from sources.utility import animate_thinking
+from sources.logger import Logger
+from sources.startup import profiler
+
+SUMMARIZER_MODEL = "pszemraj/led-base-book-summary"
+
+
+def get_device() -> str:
+    import torch
+    if torch.backends.mps.is_available():
+        return "mps"
+    elif torch.cuda.is_available():
+        return "cuda"
+    return "cpu"
+
+
+class Summarizer:
+    """
+    Process-wide summarization model shared by every Memory.
+    torch and transformers are imported on first use, and generation is serialized:
+    one model copy serves all agents and sessions. Memory compression runs on a single
+    background worker through submit() so callers never wait for beam search.
+    """
+    def __init__(self, model_name: str = SUMMARIZER_MODEL):
+        self.model_name = model_name
+        self.tokenizer = None
+        self.model = None
+        self.device: Optional[str] = None
+        self.error: Optional[str] = None
+        self.load_lock = threading.Lock()
+        self.inference_lock = threading.Lock()
+        # Separate from load_lock so submitting never waits on a model download.
+        self.submit_lock = threading.Lock()
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.stats = {"calls": 0, "waiting": 0, "wait_time": 0.0, "generate_time": 0.0, "background": 0,
+                      "background_pending": 0}
+        self.logger = Logger("summarizer.log")
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
+    def _load_model(self) -> Tuple[object, object, str]:
+        from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+        device = get_device()
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name).to(device)
+        model.eval()
+        return tokenizer, model, device
+
+    def load(self) -> bool:
+        """Load the model once. Returns False if it failed to load; the failure is not retried."""
+        if self.is_loaded:
+            return True
+        with self.load_lock:
+            if self.is_loaded:
+                return True
+            if self.error is not None:
+                return False
+            try:
+                with profiler.track("summarizer"):
+                    animate_thinking("Loading memory compression model...", color="status")
+                    self.tokenizer, self.model, self.device = self._load_model()
+            except Exception as e:
+                self.error = str(e)
+                self.logger.error(f"Failed to load {self.model_name}: {self.error}")
+                return False
+        self.logger.info(f"{self.model_name} loaded on {self.device}.")
+        return True
+
+    def generate(self, text: str, max_length: int, min_length: int) -> Optional[str]:
+        """Summarize text, waiting for any summary already running. None if the model is unavailable."""
+        if not self.load():
+            return None
+        queued_at = time.perf_counter()
+        self.stats["waiting"] += 1
+        with self.inference_lock:
+            self.stats["waiting"] -= 1
+            started = time.perf_counter()
+            self.stats["wait_time"] += started - queued_at
+            inputs = self.tokenizer(text, return_tensors="pt", max_length=512, truncation=True)
+            summary_ids = self.model.generate(
+                inputs['input_ids'].to(self.device),
+                max_length=max_length,
+                min_length=min_length,
+                length_penalty=1.0,
+                num_beams=4,
+                early_stopping=True
+            )
+            summary = self.tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+            self.stats["calls"] += 1
+            self.stats["generate_time"] += time.perf_counter() - started
+        return summary
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Run fn(*args) on the background summarization worker."""
+        with self.submit_lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summarizer")
+            self.stats["background"] += 1
+            self.stats["background_pending"] += 1
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(self._background_done)
+        return future
+
+    def _background_done(self, future: Future) -> None:
+        with self.submit_lock:
+            self.stats["background_pending"] -= 1
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "model": self.model_name, "loaded": self.is_loaded, "device": self.device,
+                "error": self.error}
+
+
+summarizer = Summarizer()
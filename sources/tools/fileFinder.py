@@ -7,6 +7,8 @@ if __name__ == "__main__": # if running as a script for individual testing
     sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from sources.tools.tools import Tools
+from sources.file_index import get_file_index, find_file_index
+from sources.metrics import timed, scan_labeler, FILE_SCAN_SECONDS
 
 class FileFinder(Tools):
     """
@@ -83,6 +85,7 @@ class FileFinder(Tools):
         else:
             return {"filename": file_path, "error": "File not found"}
     
+    @timed(FILE_SCAN_SECONDS, scan_labeler("file_finder"))
     def recursive_search(self, directory_path: str, filename: str) -> str:
         """
         Recursively searches for files in a directory and its subdirectories.
@@ -94,6 +97,13 @@ class FileFinder(Tools):
         """
         file_path = None
         excluded_files = [".pyc", ".o", ".so", ".a", ".lib", ".dll", ".dylib", ".so", ".git"]
+        located = find_file_index(directory_path)
+        if located is None and os.path.abspath(directory_path) == os.path.abspath(self.work_dir):
+            located = (get_file_index(self.work_dir), "")
+        if located is not None:
+            index, prefix = located
+            rel = index.find(filename, prefix=prefix, excluded=excluded_files)
+            return os.path.join(index.root, rel) if rel else None
         for root, dirs, files in os.walk(directory_path):
             for f in files:
                 if f is None:
@@ -0,0 +1,242 @@
+import os
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from sources.logger import Logger
+from sources.metrics import LLM_TOKENS
+from sources.rate_limiter import request_session, estimate_tokens
+
+# Labels attached to every LLM call made inside the scope (agent type, prompt, plan, plan step).
+usage_labels: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar("llm_usage_labels", default={})
+# Record of the blocking call in progress, so provider functions can report the API's token counts.
+current_usage: contextvars.ContextVar[Optional["UsageRecord"]] = contextvars.ContextVar("llm_current_usage",
+                                                                                       default=None)
+
+GROUP_COLUMNS = ("provider", "model", "agent_type", "prompt", "session_id", "plan", "plan_step", "outcome", "cached")
+
+
+@contextmanager
+def usage_scope(**labels):
+    token = usage_labels.set({**usage_labels.get(), **{k: str(v) for k, v in labels.items() if v is not None}})
+    try:
+        yield
+    finally:
+        usage_labels.reset(token)
+
+
+@dataclass
+class UsageRecord:
+    provider: str
+    model: str
+    agent_type: str = ""
+    prompt: str = ""
+    session_id: str = ""
+    plan: str = ""
+    plan_step: str = ""
+    stream: bool = False
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    estimated: bool = False
+    ttfb: Optional[float] = None
+    latency: float = 0.0
+    retries: int = 0
+    cached: bool = False
+    outcome: str = "ok"
+    started_at: float = field(default_factory=time.time)
+    start: float = field(default_factory=time.perf_counter, repr=False)
+
+    def first_byte(self) -> None:
+        if self.ttfb is None:
+            self.ttfb = time.perf_counter() - self.start
+
+    def jsonify(self) -> Dict:
+        record = asdict(self)
+        record.pop("start")
+        return record
+
+
+def note_usage(usage) -> None:
+    """Called by provider functions with the SDK's usage object (prompt_tokens/completion_tokens)."""
+    record = current_usage.get()
+    if record is None or usage is None:
+        return
+    record.prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+    record.completion_tokens = getattr(usage, "completion_tokens", None) or 0
+    record.estimated = False
+
+
+class UsageTracker:
+    """
+    Per-call LLM usage: in-memory totals by (provider, model, agent_type, prompt) for the live view,
+    and every record appended to a SQLite table by a writer thread for drill-down by plan or session.
+    """
+    def __init__(self, path: Optional[str] = None, flush_interval: float = 0.5,
+                 max_recent: int = 200):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.totals: Dict[Tuple[str, str, str, str], Dict[str, float]] = {}
+        self.recent: List[Dict] = []
+        self.max_recent = max_recent
+        self.queue: "queue.Queue[Dict]" = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+        self.stats = {"records": 0, "persisted": 0, "errors": 0}
+        self.logger = Logger("usage.log")
+
+    def configure(self, path: Optional[str]) -> None:
+        """Persist records to the SQLite file at path (None keeps them in memory only)."""
+        self.flush()
+        self.path = path
+
+    def start(self, provider: str, model: str, stream: bool = False) -> UsageRecord:
+        labels = usage_labels.get()
+        return UsageRecord(provider=provider, model=model, stream=stream, session_id=request_session.get(),
+                           agent_type=labels.get("agent_type", ""), prompt=labels.get("prompt", ""),
+                           plan=labels.get("plan", ""), plan_step=labels.get("plan_step", ""))
+
+    def finish(self, record: UsageRecord, history: List[Dict], text: Optional[str] = None,
+               error: BaseException = None, outcome: str = None) -> UsageRecord:
+        record.latency = time.perf_counter() - record.start
+        if record.ttfb is None and text is not None:
+            record.ttfb = record.latency
+        if outcome is not None:
+            record.outcome = outcome
+        elif error is not None:
+            record.outcome = "error"
+        # A "fallback" record is replaced by another call, which carries the tokens.
+        if not record.cached and outcome != "fallback" and record.prompt_tokens == 0 and record.completion_tokens == 0:
+            record.prompt_tokens = estimate_tokens(history)
+            record.completion_tokens = len(text or "") // 4
+            record.estimated = True
+        self.add(record)
+        return record
+
+    def add(self, record: UsageRecord) -> None:
+        row = record.jsonify()
+        key = (record.provider, record.model, record.agent_type, record.prompt)
+        with self.lock:
+            totals = self.totals.get(key)
+            if totals is None:
+                totals = self.totals[key] = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency": 0.0,
+                                             "ttfb": 0.0, "max_latency": 0.0, "retries": 0, "cache_hits": 0,
+                                             "errors": 0}
+            totals["calls"] += 1
+            totals["prompt_tokens"] += record.prompt_tokens
+            totals["completion_tokens"] += record.completion_tokens
+            totals["latency"] += record.latency
+            totals["ttfb"] += record.ttfb or 0.0
+            totals["max_latency"] = max(totals["max_latency"], record.latency)
+            totals["retries"] += record.retries
+            totals["cache_hits"] += int(record.cached)
+            totals["errors"] += int(record.outcome == "error")
+            self.recent.append(row)
+            del self.recent[:-self.max_recent]
+            self.stats["records"] += 1
+        if not record.cached:
+            labels = {"provider": record.provider, "model": record.model, "agent_type": record.agent_type}
+            LLM_TOKENS.inc(record.prompt_tokens, direction="prompt", **labels)
+            LLM_TOKENS.inc(record.completion_tokens, direction="completion", **labels)
+        if self.path:
+            self._start_writer()
+            self.queue.put(row)
+
+    def summary(self) -> List[Dict]:
+        """Live totals since start, most expensive (by tokens) first."""
+        with self.lock:
+            rows = [{"provider": p, "model": m, "agent_type": a, "prompt": pr, **t}
+                    for (p, m, a, pr), t in self.totals.items()]
+        for row in rows:
+            calls = row["calls"] or 1
+            row["avg_latency"] = round(row.pop("latency") / calls, 3)
+            row["avg_ttfb"] = round(row.pop("ttfb") / calls, 3)
+            row["max_latency"] = round(row["max_latency"], 3)
+        return sorted(rows, key=lambda r: r["prompt_tokens"] + r["completion_tokens"], reverse=True)
+
+    def query(self, group_by: Iterable[str] = ("agent_type",), since: float = None,
+              session_id: str = None) -> List[Dict]:
+        """Aggregate persisted records by any of GROUP_COLUMNS."""
+        columns = [c for c in group_by if c in GROUP_COLUMNS] or ["agent_type"]
+        self.flush()
+        where, params = [], []
+        if since is not None:
+            where.append("started_at >= ?")
+            params.append(since)
+        if session_id:
+            where.append("session_id = ?")
+            params.append(session_id)
+        sql = (f"SELECT {', '.join(columns)}, COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), "
+               f"AVG(latency), AVG(ttfb), MAX(latency), SUM(retries), SUM(cached) FROM usage"
+               f"{' WHERE ' + ' AND '.join(where) if where else ''} GROUP BY {', '.join(columns)} "
+               f"ORDER BY SUM(prompt_tokens) + SUM(completion_tokens) DESC")
+        if not self.path or not os.path.exists(self.path):
+            return []
+        with sqlite3.connect(self.path) as db:
+            rows = db.execute(sql, params).fetchall()
+        names = ["calls", "prompt_tokens", "completion_tokens", "avg_latency", "avg_ttfb", "max_latency",
+                 "retries", "cache_hits"]
+        return [{**dict(zip(columns, row)), **dict(zip(names, row[len(columns):]))} for row in rows]
+
+    def _start_writer(self) -> None:
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._run, name="usage-writer", daemon=True)
+            self.thread.start()
+
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        db = sqlite3.connect(path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("""CREATE TABLE IF NOT EXISTS usage (
+            started_at REAL, provider TEXT, model TEXT, agent_type TEXT, prompt TEXT, session_id TEXT,
+            plan TEXT, plan_step TEXT, stream INTEGER, prompt_tokens INTEGER, completion_tokens INTEGER,
+            estimated INTEGER, ttfb REAL, latency REAL, retries INTEGER, cached INTEGER, outcome TEXT)""")
+        db.execute("CREATE INDEX IF NOT EXISTS usage_started ON usage(started_at)")
+        return db
+
+    def _run(self) -> None:
+        db, db_path = None, None
+        columns = ("started_at", "provider", "model", "agent_type", "prompt", "session_id", "plan", "plan_step",
+                   "stream", "prompt_tokens", "completion_tokens", "estimated", "ttfb", "latency", "retries",
+                   "cached", "outcome")
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.time() + self.flush_interval
+            while True:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.time())))
+                except queue.Empty:
+                    break
+            try:
+                if db_path != self.path:
+                    if db is not None:
+                        db.close()
+                    db, db_path = self._connect(self.path), self.path
+                db.executemany(f"INSERT INTO usage VALUES ({', '.join('?' * len(columns))})",
+                               [tuple(row[c] for c in columns) for row in batch])
+                db.commit()
+                self.stats["persisted"] += len(batch)
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.logger.error(f"Failed to persist {len(batch)} usage records: {str(e)}")
+            for _ in batch:
+                self.queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every record so far is in SQLite."""
+        if self.thread is not None:
+            self.queue.join()
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "pending": self.queue.unfinished_tasks, "path": self.path}
+
+
+usage_tracker = UsageTracker()
+atexit.register(usage_tracker.flush)
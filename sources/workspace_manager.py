@@ -6,6 +6,8 @@ import datetime
 from typing import Optional, Dict, List
 from dataclasses import dataclass, field, asdict
 from sources.logger import Logger
+from sources.file_index import get_file_index
+from sources.metrics import timed, scan_labeler, FILE_SCAN_SECONDS
 
 
 @dataclass
@@ -29,6 +31,7 @@ class WorkspaceManager:
         self.logger = Logger("workspace_manager.log")
         self.sessions_file = os.path.join(base_dir, ".workspace_sessions.json")
         os.makedirs(base_dir, exist_ok=True)
+        self.file_index = get_file_index(base_dir)
         self._load_sessions()
 
     def _load_sessions(self):
@@ -97,11 +100,18 @@ class WorkspaceManager:
             })
         return result
 
+    @timed(FILE_SCAN_SECONDS, scan_labeler("workspace"))
     def _scan_files(self, directory: str) -> List[str]:
         files = []
         skip_dirs = {'__pycache__', 'node_modules', '.git', '.cache', '.venv', 'venv'}
         if not os.path.isdir(directory):
             return files
+        abs_dir = os.path.abspath(directory)
+        if abs_dir == self.file_index.root or abs_dir.startswith(self.file_index.root + os.sep):
+            prefix = os.path.relpath(abs_dir, self.file_index.root)
+            if prefix == ".":
+                return self.file_index.paths()
+            return [os.path.relpath(p, prefix) for p in self.file_index.paths(prefix)]
         for root, dirs, filenames in os.walk(directory):
             dirs[:] = [d for d in dirs if d not in skip_dirs]
             for fname in filenames:
@@ -0,0 +1,141 @@
+import time
+import asyncio
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Union
+from sources.metrics import (WS_CLIENT_LAG_SECONDS, WS_CLIENT_QUEUED, WS_CLIENT_DROPPED,
+                             WS_MESSAGES_DROPPED, WS_MESSAGES_COALESCED, WS_SEND_LAG_SECONDS)
+
+WS_CLOSE_TRY_AGAIN_LATER = 1013
+
+
+class QueuedMessage:
+    __slots__ = ("payload", "coalesce_key", "enqueued_at")
+
+    def __init__(self, payload: Union[str, bytes], coalesce_key: Optional[str], enqueued_at: float):
+        self.payload = payload
+        self.coalesce_key = coalesce_key
+        self.enqueued_at = enqueued_at
+
+
+class ClientConnection:
+    """
+    One WebSocket client with a bounded send queue drained by its own writer task.
+    Enqueueing never waits on the socket: a message with a coalesce key replaces the queued
+    message with the same key, a full queue drops its oldest message, and a client whose
+    oldest queued message is older than max_lag seconds is disconnected.
+    """
+    def __init__(self, websocket, client_id: str, max_queue: int = 256, max_lag: float = 10.0,
+                 send_timeout: float = 5.0, on_close: Optional[Callable[["ClientConnection", str], None]] = None,
+                 encoding: str = "json"):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.encoding = encoding
+        self.max_queue = max_queue
+        self.max_lag = max_lag
+        self.send_timeout = send_timeout
+        self.on_close = on_close
+        self.queue: Deque[QueuedMessage] = deque()
+        self.keyed: Dict[str, QueuedMessage] = {}
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.close_reason: Optional[str] = None
+        self.connected_at = time.time()
+        self.stats = {"sent": 0, "dropped": 0, "coalesced": 0}
+        WS_CLIENT_LAG_SECONDS.set_function(self.lag, client=client_id)
+        WS_CLIENT_QUEUED.set_function(lambda: len(self.queue), client=client_id)
+        WS_CLIENT_DROPPED.set_function(lambda: self.stats["dropped"], client=client_id)
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self.run())
+
+    def lag(self) -> float:
+        if not self.queue:
+            return 0.0
+        return time.time() - self.queue[0].enqueued_at
+
+    def enqueue(self, payload: Union[str, bytes], coalesce_key: Optional[str] = None) -> bool:
+        """Queue a serialized message (str as a text frame, bytes as binary); returns False if closed."""
+        if self.closed:
+            return False
+        if coalesce_key is not None and coalesce_key in self.keyed:
+            # Keep the original position and timestamp so lag still reflects the oldest pending state.
+            self.keyed[coalesce_key].payload = payload
+            self.stats["coalesced"] += 1
+            WS_MESSAGES_COALESCED.inc(type=coalesce_key.split(":", 1)[0])
+            return True
+        if len(self.queue) >= self.max_queue:
+            oldest = self.queue.popleft()
+            if oldest.coalesce_key is not None:
+                self.keyed.pop(oldest.coalesce_key, None)
+            self.stats["dropped"] += 1
+            WS_MESSAGES_DROPPED.inc()
+        message = QueuedMessage(payload, coalesce_key, time.time())
+        self.queue.append(message)
+        if coalesce_key is not None:
+            self.keyed[coalesce_key] = message
+        self.ready.set()
+        if self.lag() > self.max_lag:
+            self.close("lagging")
+            return False
+        return True
+
+    async def run(self) -> None:
+        while not self.closed:
+            if not self.queue:
+                self.ready.clear()
+                await self.ready.wait()
+                continue
+            message = self.queue.popleft()
+            if message.coalesce_key is not None:
+                self.keyed.pop(message.coalesce_key, None)
+            try:
+                if isinstance(message.payload, bytes):
+                    send = self.websocket.send_bytes(message.payload)
+                else:
+                    send = self.websocket.send_text(message.payload)
+                await asyncio.wait_for(send, self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                self.close("send_timeout")
+                return
+            except Exception:
+                self.close("send_error")
+                return
+            self.stats["sent"] += 1
+            WS_SEND_LAG_SECONDS.observe(time.time() - message.enqueued_at)
+
+    def close(self, reason: str) -> None:
+        """Stop the writer, drop pending messages and close the socket if we are the ones hanging up."""
+        if self.closed:
+            return
+        self.closed = True
+        self.close_reason = reason
+        self.queue.clear()
+        self.keyed.clear()
+        self.ready.set()
+        if self.task is not None and self.task is not asyncio.current_task():
+            self.task.cancel()
+        for gauge in (WS_CLIENT_LAG_SECONDS, WS_CLIENT_QUEUED, WS_CLIENT_DROPPED):
+            gauge.remove(client=self.client_id)
+        if reason != "client":
+            asyncio.ensure_future(self._close_socket())
+        if self.on_close is not None:
+            self.on_close(self, reason)
+
+    async def _close_socket(self) -> None:
+        try:
+            await asyncio.wait_for(self.websocket.close(code=WS_CLOSE_TRY_AGAIN_LATER), self.send_timeout)
+        except Exception:
+            pass
+
+    def get_stats(self) -> Dict:
+        return {
+            "id": self.client_id,
+            "encoding": self.encoding,
+            "queued": len(self.queue),
+            "lag": round(self.lag(), 3),
+            "connected_for": round(time.time() - self.connected_at, 1),
+            **self.stats,
+        }
@@ -0,0 +1,48 @@
+import json
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+try:
+    import msgpack
+    MSGPACK_FOUND = True
+except ImportError:
+    msgpack = None
+    MSGPACK_FOUND = False
+
+ENCODING_JSON = "json"
+ENCODING_MSGPACK = "msgpack"
+# WebSocket subprotocol names a client may offer instead of the ?encoding= parameter.
+SUBPROTOCOLS = {"agentic.msgpack": ENCODING_MSGPACK, "agentic.json": ENCODING_JSON}
+
+
+def available_encodings() -> list:
+    return [ENCODING_JSON, ENCODING_MSGPACK] if MSGPACK_FOUND else [ENCODING_JSON]
+
+
+def negotiate(requested: Optional[str] = None, subprotocols: Iterable[str] = ()) -> Tuple[str, Optional[str]]:
+    """
+    Pick the encoding for a connection and the subprotocol to echo back (or None).
+    An explicit ?encoding= wins over offered subprotocols; anything unavailable falls back to JSON.
+    """
+    if requested:
+        encoding = requested.strip().lower()
+        return (encoding if encoding in available_encodings() else ENCODING_JSON), None
+    for subprotocol in subprotocols:
+        encoding = SUBPROTOCOLS.get(subprotocol.strip().lower())
+        if encoding in available_encodings():
+            return encoding, subprotocol
+    return ENCODING_JSON, None
+
+
+def encode(message: Dict, encoding: str = ENCODING_JSON) -> Union[str, bytes]:
+    """Text frame payload for JSON, binary frame payload for MessagePack."""
+    if encoding == ENCODING_MSGPACK:
+        return msgpack.packb(message, use_bin_type=True, default=str)
+    return json.dumps(message, ensure_ascii=False)
+
+
+def decode(data: Union[str, bytes], encoding: str = ENCODING_JSON) -> Dict:
+    if isinstance(data, bytes) and encoding == ENCODING_MSGPACK:
+        return msgpack.unpackb(data, raw=False)
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    return json.loads(data)
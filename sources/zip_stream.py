@@ -0,0 +1,251 @@
+import os
+import time
+import zlib
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sources.logger import Logger
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP_FILECOUNT_LIMIT = 0xFFFF
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+VERSION_DEFAULT = 20
+VERSION_ZIP64 = 45
+
+STORED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico', '.woff', '.woff2',
+                     '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.mp3', '.mp4', '.webm', '.pdf'}
+
+
+@dataclass
+class CompressedEntry:
+    crc: int
+    file_size: int
+    compress_size: int
+    method: int
+    data: bytes
+
+
+class ZipEntryCache:
+    """
+    LRU cache of compressed ZIP entries keyed by (path, mtime, size), bounded by total compressed bytes.
+    """
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_entry_bytes: int = 16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.entries: "OrderedDict[Tuple[str, float, int], CompressedEntry]" = OrderedDict()
+        self.keys_by_path: Dict[str, Tuple[str, float, int]] = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: Tuple[str, float, int]) -> Optional[CompressedEntry]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple[str, float, int], entry: CompressedEntry) -> None:
+        if entry.compress_size > self.max_entry_bytes or entry.compress_size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                return
+            stale = self.keys_by_path.pop(key[0], None)
+            if stale is not None and stale in self.entries:
+                self.total_bytes -= self.entries.pop(stale).compress_size
+            self.entries[key] = entry
+            self.keys_by_path[key[0]] = key
+            self.total_bytes += entry.compress_size
+            while self.total_bytes > self.max_bytes and self.entries:
+                evicted_key, evicted = self.entries.popitem(last=False)
+                self.keys_by_path.pop(evicted_key[0], None)
+                self.total_bytes -= evicted.compress_size
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def dos_datetime(mtime: float) -> Tuple[int, int]:
+    t = time.localtime(mtime)
+    year = max(t.tm_year, 1980)
+    dos_date = ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    return dos_time, dos_date
+
+
+class ZipStreamWriter:
+    """
+    Produce a ZIP archive as a stream of byte chunks, one entry at a time.
+    Files up to the cache entry limit are compressed in one pass and reused from the cache
+    while unchanged; larger files are deflated chunk by chunk with a data descriptor.
+    """
+    def __init__(self, cache: Optional[ZipEntryCache] = None, compresslevel: int = 6,
+                 chunk_size: int = 64 * 1024):
+        self.cache = cache
+        self.compresslevel = compresslevel
+        self.chunk_size = chunk_size
+        self.logger = Logger("zip_stream.log")
+        self.offset = 0
+        self.central_directory: List[bytes] = []
+
+    def _method_for(self, arcname: str) -> int:
+        ext = os.path.splitext(arcname)[1].lower()
+        return ZIP_STORED if ext in STORED_EXTENSIONS else ZIP_DEFLATED
+
+    def _compress_file(self, path: str, method: int) -> CompressedEntry:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        crc = zlib.crc32(raw) & 0xFFFFFFFF
+        data = raw
+        if method == ZIP_DEFLATED:
+            compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -15)
+            data = compressor.compress(raw) + compressor.flush()
+            if len(data) >= len(raw):
+                method, data = ZIP_STORED, raw
+        return CompressedEntry(crc, len(raw), len(data), method, data)
+
+    def _load_entry(self, path: str, arcname: str, st: os.stat_result) -> CompressedEntry:
+        key = (path, st.st_mtime, st.st_size)
+        if self.cache is not None:
+            entry = self.cache.get(key)
+            if entry is not None:
+                return entry
+        entry = self._compress_file(path, self._method_for(arcname))
+        if self.cache is not None:
+            self.cache.put(key, entry)
+        return entry
+
+    def _local_header(self, name: bytes, flags: int, method: int, dos_time: int, dos_date: int,
+                      crc: int, compress_size: int, file_size: int, zip64: bool) -> bytes:
+        extra = b""
+        if zip64:
+            extra = struct.pack("<HHQQ", 0x0001, 16, file_size, compress_size)
+            compress_size = file_size = ZIP64_LIMIT
+        version = VERSION_ZIP64 if zip64 else VERSION_DEFAULT
+        header = struct.pack("<IHHHHHIIIHH", 0x04034b50, version, flags, method, dos_time, dos_date,
+                             crc, compress_size, file_size, len(name), len(extra))
+        return header + name + extra
+
+    def _central_record(self, name: bytes, flags: int, method: int, dos_time: int, dos_date: int,
+                        crc: int, compress_size: int, file_size: int, header_offset: int) -> bytes:
+        zip64_fields = []
+        if file_size >= ZIP64_LIMIT:
+            zip64_fields.append(file_size)
+            file_size = ZIP64_LIMIT
+        if compress_size >= ZIP64_LIMIT:
+            zip64_fields.append(compress_size)
+            compress_size = ZIP64_LIMIT
+        if header_offset >= ZIP64_LIMIT:
+            zip64_fields.append(header_offset)
+            header_offset = ZIP64_LIMIT
+        extra = b""
+        if zip64_fields:
+            extra = struct.pack("<HH" + "Q" * len(zip64_fields), 0x0001, 8 * len(zip64_fields), *zip64_fields)
+        version = VERSION_ZIP64 if zip64_fields else VERSION_DEFAULT
+        record = struct.pack("<IHHHHHHIIIHHHHHII", 0x02014b50, (3 << 8) | version, version, flags, method,
+                             dos_time, dos_date, crc, compress_size, file_size,
+                             len(name), len(extra), 0, 0, 0, 0o100644 << 16, header_offset)
+        return record + name + extra
+
+    def _emit(self, chunk: bytes) -> bytes:
+        self.offset += len(chunk)
+        return chunk
+
+    def _write_cached(self, name: bytes, entry: CompressedEntry, dos_time: int, dos_date: int) -> Iterator[bytes]:
+        header_offset = self.offset
+        zip64 = entry.file_size >= ZIP64_LIMIT or entry.compress_size >= ZIP64_LIMIT
+        yield self._emit(self._local_header(name, FLAG_UTF8, entry.method, dos_time, dos_date,
+                                            entry.crc, entry.compress_size, entry.file_size, zip64))
+        for start in range(0, len(entry.data), self.chunk_size):
+            yield self._emit(entry.data[start:start + self.chunk_size])
+        self.central_directory.append(self._central_record(name, FLAG_UTF8, entry.method, dos_time, dos_date,
+                                                           entry.crc, entry.compress_size, entry.file_size,
+                                                           header_offset))
+
+    def _write_streamed(self, name: bytes, path: str, st: os.stat_result,
+                        dos_time: int, dos_date: int) -> Iterator[bytes]:
+        header_offset = self.offset
+        flags = FLAG_UTF8 | FLAG_DATA_DESCRIPTOR
+        zip64 = st.st_size >= ZIP64_LIMIT
+        yield self._emit(self._local_header(name, flags, ZIP_DEFLATED, dos_time, dos_date, 0, 0, 0, zip64))
+        crc = 0
+        file_size = 0
+        compress_size = 0
+        compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -15)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                crc = zlib.crc32(chunk, crc)
+                file_size += len(chunk)
+                data = compressor.compress(chunk)
+                if data:
+                    compress_size += len(data)
+                    yield self._emit(data)
+        data = compressor.flush()
+        compress_size += len(data)
+        yield self._emit(data)
+        crc &= 0xFFFFFFFF
+        if zip64:
+            descriptor = struct.pack("<IIQQ", 0x08074b50, crc, compress_size, file_size)
+        else:
+            descriptor = struct.pack("<IIII", 0x08074b50, crc, compress_size, file_size)
+        yield self._emit(descriptor)
+        self.central_directory.append(self._central_record(name, flags, ZIP_DEFLATED, dos_time, dos_date,
+                                                           crc, compress_size, file_size, header_offset))
+
+    def _end_records(self) -> Iterator[bytes]:
+        cd_offset = self.offset
+        cd = b"".join(self.central_directory)
+        yield self._emit(cd)
+        count = len(self.central_directory)
+        if count >= ZIP_FILECOUNT_LIMIT or cd_offset >= ZIP64_LIMIT or len(cd) >= ZIP64_LIMIT:
+            zip64_end_offset = self.offset
+            yield self._emit(struct.pack("<IQHHIIQQQQ", 0x06064b50, 44, VERSION_ZIP64, VERSION_ZIP64,
+                                         0, 0, count, count, len(cd), cd_offset))
+            yield self._emit(struct.pack("<IIQI", 0x07064b50, 0, zip64_end_offset, 1))
+            count = min(count, ZIP_FILECOUNT_LIMIT)
+            cd_size = min(len(cd), ZIP64_LIMIT)
+            cd_offset = min(cd_offset, ZIP64_LIMIT)
+        else:
+            cd_size = len(cd)
+        yield self._emit(struct.pack("<IHHHHIIH", 0x06054b50, 0, 0, count, count, cd_size, cd_offset, 0))
+
+    def stream(self, files: Iterable[Tuple[str, str]]) -> Iterator[bytes]:
+        """
+        Yield the archive for (absolute path, archive name) pairs.
+        Unreadable files are skipped.
+        """
+        self.offset = 0
+        self.central_directory = []
+        max_entry = self.cache.max_entry_bytes if self.cache is not None else 16 * 1024 * 1024
+        for path, arcname in files:
+            try:
+                st = os.stat(path)
+                dos_time, dos_date = dos_datetime(st.st_mtime)
+                name = arcname.replace(os.sep, "/").encode("utf-8")
+                entry = self._load_entry(path, arcname, st) if st.st_size <= max_entry else None
+            except OSError as e:
+                self.logger.warning(f"Skipping {path}: {e}")
+                continue
+            if entry is None:
+                yield from self._write_streamed(name, path, st, dos_time, dos_date)
+            else:
+                yield from self._write_cached(name, entry, dos_time, dos_date)
+        yield from self._end_records()
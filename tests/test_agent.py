@@ -0,0 +1,169 @@
+import unittest
+import os
+import sys
+import asyncio
+import threading
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.agents.agent import Agent
+from sources.agents.browser_agent import BrowserAgent
+from sources.startup import LazyComponent
+
+PROMPT_PATH = os.path.join(os.path.dirname(__file__), '..', 'prompts', 'base', 'browser_agent.txt')
+
+class FakeMemory:
+    def __init__(self):
+        self.pushed = []
+
+    def get(self):
+        return [{"role": "user", "content": "halo"}]
+
+    def push(self, role, content):
+        self.pushed.append((role, content))
+
+    def needs_compression(self):
+        return False
+
+class HangingProvider:
+    provider_name = "test"
+    model = "test-model"
+
+    def __init__(self):
+        self.started = asyncio.Event()
+
+    def supports(self):
+        return True
+
+    async def respond_stream(self, history, verbose=True):
+        yield "Halo"
+        self.started.set()
+        await asyncio.sleep(60)
+        yield " dunia"
+
+class StreamingProvider:
+    provider_name = "test"
+    model = "test-model"
+
+    def supports(self):
+        return True
+
+    async def respond(self, history, verbose=True):
+        return "Halo dunia"
+
+    async def respond_stream(self, history, verbose=True):
+        for delta in ["Halo", " dunia"]:
+            yield delta
+
+class BlockingProvider:
+    provider_name = "test"
+    model = "test-model"
+
+    def respond(self, history, verbose=True):
+        return "Halo dunia"
+
+    def respond_stream(self, history, verbose=True):
+        yield from ["Halo", " dunia"]
+
+class TestAgentStreaming(unittest.TestCase):
+    def setUp(self):
+        self.tokens = []
+        self.agent = Agent("test", "", BlockingProvider())
+        self.agent.memory = FakeMemory()
+        self.agent.set_stream_handler(lambda agent, delta: self.tokens.append((agent.streamed_answer, delta)))
+
+    def test_dispatch_delta(self):
+        self.agent.dispatch_delta("Ha")
+        self.agent.dispatch_delta("lo")
+        self.assertEqual(self.tokens, [("Ha", "Ha"), ("Halo", "lo")])
+
+    def test_handler_failure_does_not_stop_the_stream(self):
+        def failing(agent, delta):
+            raise RuntimeError("client gone")
+        self.agent.set_stream_handler(failing)
+        self.agent.dispatch_delta("Ha")
+        self.agent.dispatch_delta("lo")
+        self.assertEqual(self.agent.streamed_answer, "Halo")
+
+    def test_only_opted_in_requests_stream(self):
+        for provider in [StreamingProvider(), None]:
+            with self.subTest(async_provider=provider is not None):
+                self.tokens.clear()
+                self.agent.set_async_provider(provider)
+                self.assertEqual(asyncio.run(self.agent.llm_request())[0], "Halo dunia")
+                self.assertEqual(self.tokens, [])
+                self.assertEqual(asyncio.run(self.agent.llm_request(stream=True))[0], "Halo dunia")
+                self.assertEqual(self.tokens, [("Halo", "Halo"), ("Halo dunia", " dunia")])
+
+    def test_memory_is_counted_off_the_event_loop(self):
+        threads = set()
+        memory = self.agent.memory
+        for name in ("get", "push", "needs_compression"):
+            method = getattr(memory, name)
+            def tracked(*args, method=method):
+                threads.add(threading.current_thread())
+                return method(*args)
+            setattr(memory, name, tracked)
+        self.agent.set_async_provider(StreamingProvider())
+        asyncio.run(self.agent.llm_request())
+        self.assertTrue(threads)
+        self.assertNotIn(threading.main_thread(), threads)
+
+    def test_stream_without_handler(self):
+        self.agent.set_stream_handler(None)
+        self.agent.set_async_provider(StreamingProvider())
+        self.assertEqual(asyncio.run(self.agent.llm_request(stream=True))[0], "Halo dunia")
+
+class TestAgentStop(unittest.TestCase):
+    def setUp(self):
+        self.agent = Agent("test", "", None)
+        self.agent.memory = FakeMemory()
+        self.agent.set_stream_handler(lambda agent, delta: None)
+
+    def test_stop_keeps_streamed_answer(self):
+        async def scenario():
+            provider = HangingProvider()
+            self.agent.set_async_provider(provider)
+            task = asyncio.ensure_future(self.agent.llm_request(stream=True))
+            await provider.started.wait()
+            self.agent.request_stop()
+            return await task
+        answer, _ = asyncio.run(scenario())
+        self.assertEqual(answer, "Halo")
+        self.assertEqual(self.agent.memory.pushed, [('assistant', "Halo")])
+        self.assertIsNone(self.agent.llm_task)
+
+    def test_outer_cancellation_propagates_after_stop(self):
+        async def scenario():
+            provider = HangingProvider()
+            self.agent.set_async_provider(provider)
+            self.agent.stop = True
+            task = asyncio.ensure_future(self.agent.llm_request(stream=True))
+            await provider.started.wait()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        asyncio.run(scenario())
+        self.assertEqual(self.agent.memory.pushed, [])
+
+class FakeBrowser:
+    def __init__(self):
+        self.session_lock = asyncio.Lock()
+
+class TestBrowserAgentLoading(unittest.TestCase):
+    def test_browser_starts_off_the_event_loop(self):
+        threads = []
+        def start_browser():
+            threads.append(threading.current_thread())
+            return FakeBrowser()
+        browser = LazyComponent("browser", start_browser)
+        agent = BrowserAgent("web", PROMPT_PATH, None, browser=browser)
+        async def browse(prompt, speech_module):
+            self.assertTrue(browser.session_lock.locked())
+            return "jawaban", ""
+        with patch.object(agent, 'browse', side_effect=browse):
+            self.assertEqual(asyncio.run(agent.process("cari", None)), ("jawaban", ""))
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import os
+import sys
+import time
+import asyncio
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.answer_state import AnswerState
+
+class TestAnswerState(unittest.TestCase):
+    def test_update_bumps_version_only_on_change(self):
+        changes = []
+        state = AnswerState(on_change=lambda version, changed: changes.append((version, changed)))
+        self.assertTrue(state.update(status="Berpikir", done="false"))
+        self.assertFalse(state.update(status="Berpikir"))
+        self.assertTrue(state.update(status="Selesai", done="false"))
+        self.assertEqual(state.version, 2)
+        self.assertEqual(changes, [(1, {"status": "Berpikir", "done": "false"}), (2, {"status": "Selesai"})])
+
+    def test_wait_returns_immediately_when_behind_or_ahead(self):
+        state = AnswerState()
+        state.update(status="a")
+        start = time.time()
+        self.assertEqual(asyncio.run(state.wait(0, 5))[0], 1)
+        self.assertEqual(asyncio.run(state.wait(7, 5))[0], 1)
+        self.assertLess(time.time() - start, 1)
+
+    def test_wait_times_out(self):
+        state = AnswerState()
+        start = time.time()
+        version, _ = asyncio.run(state.wait(0, 0.1))
+        self.assertEqual(version, 0)
+        self.assertGreaterEqual(time.time() - start, 0.1)
+        self.assertEqual(state.waiters, [])
+
+    def test_wait_wakes_on_update_from_thread(self):
+        state = AnswerState()
+
+        async def scenario():
+            threading.Timer(0.05, lambda: state.update(answer="halo")).start()
+            start = time.time()
+            version, snapshot = await state.wait(0, 5)
+            return version, snapshot, time.time() - start
+
+        version, snapshot, elapsed = asyncio.run(scenario())
+        self.assertEqual(version, 1)
+        self.assertEqual(snapshot["answer"], "halo")
+        self.assertLess(elapsed, 1)
+
+if __name__ == '__main__':
+    unittest.main()
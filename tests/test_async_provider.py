@@ -0,0 +1,139 @@
+import unittest
+import os
+import sys
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.async_provider import AsyncProvider
+from sources.hedging import hedge_policy
+from sources.usage import usage_tracker, usage_scope
+
+class FakeProvider:
+    provider_name = "test"
+    model = "test-model"
+    server_ip = "127.0.0.1"
+    api_key = "key"
+
+    def test_fn(self, history, verbose=True):
+        return "plan"
+
+class TestAsyncProvider(unittest.TestCase):
+    def setUp(self):
+        self.provider = AsyncProvider(FakeProvider())
+
+    def test_respond_and_stream_fallback(self):
+        async def scenario():
+            answer = await self.provider.respond([{"role": "user", "content": "hi"}])
+            deltas = [d async for d in self.provider.respond_stream([{"role": "user", "content": "hi"}])]
+            return answer, deltas
+        self.assertEqual(asyncio.run(scenario()), ("plan", ["plan"]))
+
+    def test_retries_with_async_sleep(self):
+        calls = []
+        async def flaky(history, verbose=False):
+            calls.append(1)
+            if len(calls) < 3:
+                raise Exception("503 overloaded")
+            return "ok"
+        self.provider.async_providers["test"] = flaky
+        with patch("sources.async_provider.asyncio.sleep", new_callable=AsyncMock) as sleep:
+            self.assertEqual(asyncio.run(self.provider.respond([])), "ok")
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [2, 2])
+
+    def test_rate_limit_answer_after_retries(self):
+        async def limited(history, verbose=False):
+            raise Exception("429 rate limit")
+        self.provider.async_providers["test"] = limited
+        with patch("sources.async_provider.rate_limiter.record_rate_limited", return_value=0.0) as limited_call, \
+             patch("sources.async_provider.asyncio.sleep", new_callable=AsyncMock) as sleep:
+            answer = asyncio.run(self.provider.respond([]))
+        self.assertIn("Batas penggunaan API", answer)
+        self.assertEqual([c.args[3] for c in limited_call.call_args_list], [3, 6])
+        sleep.assert_not_called()
+
+    def test_rate_limit_backs_off_with_limiter_disabled(self):
+        async def limited(history, verbose=False):
+            raise Exception("429 rate limit")
+        self.provider.async_providers["test"] = limited
+        with patch("sources.async_provider.rate_limiter.enabled", False), \
+             patch("sources.async_provider.rate_limiter.record_rate_limited", side_effect=lambda p, m, e, d: d), \
+             patch("sources.async_provider.asyncio.sleep", new_callable=AsyncMock) as sleep:
+            answer = asyncio.run(self.provider.respond([]))
+        self.assertIn("Batas penggunaan API", answer)
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [3, 6])
+
+    def test_huggingface_fallback_leaves_shared_model(self):
+        async def create(model, messages, max_tokens):
+            if model == "Qwen/Qwen2.5-72B-Instruct":
+                raise Exception("402 payment required")
+            return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content=model))])
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        record = SimpleNamespace(model="test-model")
+        with patch("sources.async_provider.client_pool.async_huggingface", return_value=client):
+            answer = asyncio.run(self.provider._try_huggingface_fallback([], record))
+        self.assertEqual(answer, "Qwen/Qwen2.5-3B-Instruct")
+        self.assertEqual(record.model, "Qwen/Qwen2.5-3B-Instruct")
+        self.assertEqual(self.provider.model, "test-model")
+
+    def test_cancellation_aborts_call(self):
+        async def slow(history, verbose=False):
+            await asyncio.sleep(10)
+        self.provider.async_providers["test"] = slow
+        async def scenario():
+            task = asyncio.ensure_future(self.provider.respond([]))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        asyncio.run(scenario())
+
+    def test_usage_recorded_per_call(self):
+        async def flaky(history, verbose=False):
+            if not calls:
+                calls.append(1)
+                raise Exception("503 overloaded")
+            return "ok"
+        calls = []
+        self.provider.async_providers["test"] = flaky
+        with patch("sources.async_provider.asyncio.sleep", new_callable=AsyncMock), \
+             usage_scope(agent_type="code", prompt="unit"):
+            asyncio.run(self.provider.respond([{"role": "user", "content": "x" * 80}]))
+        record = usage_tracker.recent[-1]
+        self.assertEqual((record["agent_type"], record["prompt"], record["retries"]), ("code", "unit", 1))
+        self.assertEqual((record["prompt_tokens"], record["estimated"], record["outcome"]), (20, True, "ok"))
+
+    def test_stream_failure_falls_back_with_one_quota_and_a_fallback_record(self):
+        async def broken_stream(history, verbose=False):
+            raise Exception("503 overloaded")
+            yield
+        self.provider.stream_providers["test"] = broken_stream
+        async def scenario():
+            return [d async for d in self.provider.respond_stream([{"role": "user", "content": "x" * 80}])]
+        with patch("sources.async_provider.rate_limiter.acquire_async", new_callable=AsyncMock) as acquire:
+            self.assertEqual(asyncio.run(scenario()), ["plan"])
+        self.assertEqual(acquire.call_count, 1)
+        stream_record, fallback_record = usage_tracker.recent[-2:]
+        self.assertEqual((stream_record["stream"], stream_record["outcome"]), (True, "fallback"))
+        self.assertEqual(stream_record["prompt_tokens"], 0)
+        self.assertEqual((fallback_record["stream"], fallback_record["outcome"]), (False, "ok"))
+
+    def test_stream_hedged_on_slow_first_token(self):
+        async def slow_stream(history, verbose=False):
+            await asyncio.sleep(10)
+            yield "late"
+        async def fast_stream(history, verbose=False):
+            yield "cepat"
+            yield " sekali"
+        self.provider.stream_providers["test"] = slow_stream
+        alternate = AsyncProvider(FakeProvider())
+        alternate.stream_providers["test"] = fast_stream
+        async def scenario():
+            return [d async for d in self.provider.respond_stream([])]
+        with patch.object(self.provider, "alternate", return_value=alternate), \
+             patch.object(hedge_policy.config, "default_delay", 0.01), \
+             patch.object(hedge_policy.config, "min_delay", 0.0):
+            self.assertEqual(asyncio.run(scenario()), ["cepat", " sekali"])
+
+if __name__ == '__main__':
+    unittest.main()
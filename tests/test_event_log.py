@@ -0,0 +1,37 @@
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.event_log import EventLog
+
+class TestEventLog(unittest.TestCase):
+    def test_sequences_and_replays_per_session(self):
+        log = EventLog()
+        log.append({"type": "status", "status": "a"})
+        log.append({"type": "answer_update", "session_id": "s1", "version": 1})
+        log.append({"type": "answer_update", "session_id": "s2", "version": 1})
+        log.append({"type": "token", "session_id": "s1", "delta": "x"})
+        log.append({"type": "plan", "plan": []})
+        self.assertEqual(log.seq, 5)
+        self.assertEqual([m["seq"] for m in log.since(0, ["s1"])], [1, 2, 5])
+        self.assertEqual([m["seq"] for m in log.since(2, ["s1"])], [5])
+        self.assertEqual(log.since(5, ["s1"]), [])
+        self.assertEqual([m["seq"] for m in log.since(0, every_session=True)], [1, 2, 3, 5])
+
+    def test_gap_and_future_seq_require_resync(self):
+        log = EventLog(max_per_session=2)
+        for i in range(4):
+            log.append({"type": "status", "status": str(i)})
+        self.assertIsNone(log.since(1))
+        self.assertEqual([m["status"] for m in log.since(2)], ["2", "3"])
+        self.assertIsNone(log.since(10))
+
+    def test_evicted_session_stream_requires_resync(self):
+        log = EventLog(max_sessions=1)
+        log.append({"type": "answer_update", "session_id": "s1"})
+        log.append({"type": "answer_update", "session_id": "s2"})
+        self.assertIsNone(log.since(0, ["s1"]))
+        self.assertEqual(len(log.since(1, ["s2"])), 1)
+
+if __name__ == '__main__':
+    unittest.main()
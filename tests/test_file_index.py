@@ -0,0 +1,71 @@
+import unittest
+import os
+import sys
+import time
+import shutil
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.file_index import FileIndex
+
+class TestFileIndex(unittest.TestCase):
+    use_inotify = True
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.write("index.html", "<html></html>")
+        self.write("css/style.css", "body {}")
+        self.write("node_modules/lib/index.js", "skip me")
+        self.index = FileIndex(self.root, use_inotify=self.use_inotify, poll_interval=0)
+        self.index.start()
+
+    def tearDown(self):
+        self.index.stop()
+        shutil.rmtree(self.root)
+
+    def write(self, rel, content):
+        path = os.path.join(self.root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def settle(self):
+        time.sleep(0.05)
+        self.index.sync(force=True)
+
+    def test_initial_scan_skips_excluded_dirs(self):
+        self.assertEqual(self.index.paths(), ["css/style.css", "index.html"])
+
+    def test_secondary_indexes(self):
+        self.assertEqual(self.index.by_extension(".css"), ["css/style.css"])
+        self.assertEqual(self.index.by_basename("index.html"), ["index.html"])
+        self.assertEqual(self.index.find("style"), "css/style.css")
+        self.assertIsNone(self.index.find("missing"))
+
+    def test_tracks_changes(self):
+        version = self.index.version
+        self.write("js/app.js", "console.log(1)")
+        self.write("index.html", "<html>changed</html>")
+        os.remove(os.path.join(self.root, "css", "style.css"))
+        self.settle()
+        _, changes = self.index.changes_since(version)
+        self.assertIn(("create", "js/app.js"), changes)
+        self.assertIn(("modify", "index.html"), changes)
+        self.assertIn(("delete", "css/style.css"), changes)
+        self.assertEqual(self.index.paths(), ["index.html", "js/app.js"])
+
+    def test_removed_directory(self):
+        shutil.rmtree(os.path.join(self.root, "css"))
+        self.settle()
+        self.assertEqual(self.index.by_extension(".css"), [])
+
+    def test_file_hash_follows_content(self):
+        first = self.index.file_hash("index.html")
+        self.write("index.html", "<html>other content</html>")
+        self.settle()
+        self.assertNotEqual(first, self.index.file_hash("index.html"))
+
+class TestFileIndexPolling(TestFileIndex):
+    use_inotify = False
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.file_reader import file_etag, etag_matches, parse_range, read_text_page, iter_bytes, LineIndex
+
+class TestFileReader(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, "data.txt")
+        self.lines = [f"baris {i} é" for i in range(5000)]
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.lines))
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_etag(self):
+        etag = file_etag(os.stat(self.path))
+        self.assertTrue(etag_matches(etag, etag))
+        self.assertTrue(etag_matches(f'"other", W/{etag}', etag))
+        self.assertTrue(etag_matches("*", etag))
+        self.assertFalse(etag_matches('"other"', etag))
+        self.assertFalse(etag_matches(None, etag))
+        with open(self.path, "a") as f:
+            f.write("x")
+        self.assertNotEqual(file_etag(os.stat(self.path)), etag)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=0-9", 50), (0, 9))
+        self.assertEqual(parse_range("bytes=40-100", 50), (40, 49))
+        self.assertEqual(parse_range("bytes=-5", 50), (45, 49))
+        self.assertEqual(parse_range("bytes=5-", 50), (5, 49))
+        self.assertIsNone(parse_range("bytes=0-1,3-4", 50))
+        self.assertIsNone(parse_range("items=0-1", 50))
+        self.assertIsNone(parse_range("bytes=abc-", 50))
+        with self.assertRaises(ValueError):
+            parse_range("bytes=50-", 50)
+
+    def test_iter_bytes(self):
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        self.assertEqual(b"".join(iter_bytes(self.path, 10, 999, chunk_size=7)), raw[10:1000])
+
+    def test_text_pages_cover_file(self):
+        with open(self.path, encoding="utf-8") as f:
+            expected = f.read()
+        parts = []
+        offset = 0
+        while True:
+            page = read_text_page(self.path, offset, 1001)
+            self.assertNotIn("�", page.content)
+            parts.append(page.content)
+            offset = page.next_offset
+            if page.eof:
+                break
+        self.assertEqual("".join(parts), expected)
+
+    def test_line_pages(self):
+        index = LineIndex()
+        page = index.read_lines(self.path, 0, 3)
+        self.assertEqual(page.content, "\n".join(self.lines[:3]) + "\n")
+        self.assertEqual(page.next_line, 3)
+        page = index.read_lines(self.path, 3000, 2)
+        self.assertEqual(page.content, "\n".join(self.lines[3000:3002]) + "\n")
+        page = index.read_lines(self.path, 2100, 1)
+        self.assertEqual(page.content, self.lines[2100] + "\n")
+        page = index.read_lines(self.path, 4998, 10)
+        self.assertEqual(page.content, "\n".join(self.lines[4998:]))
+        self.assertTrue(page.eof)
+        self.assertEqual(page.line_count, 2)
+
+    def test_line_pages_are_capped_in_bytes(self):
+        index = LineIndex()
+        line_size = len((self.lines[10] + "\n").encode("utf-8"))
+        page = index.read_lines(self.path, 10, 500, max_bytes=line_size * 3 + 1)
+        self.assertEqual(page.content, "\n".join(self.lines[10:13]) + "\n")
+        self.assertEqual(page.next_line, 13)
+        long_path = os.path.join(self.root, "minified.js")
+        with open(long_path, "w", encoding="utf-8") as f:
+            f.write("é" * 1000 + "\nvar a;\n")
+        page = index.read_lines(long_path, 0, 500, max_bytes=101)
+        self.assertEqual(page.content, "é" * 50)
+        self.assertEqual((page.line_count, page.next_line, page.next_offset, page.eof), (0, None, 100, False))
+        rest = read_text_page(long_path, page.next_offset, 4000)
+        self.assertEqual(page.content + rest.content, "é" * 1000 + "\nvar a;\n")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import os
+import sys
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.hedging import HedgeConfig, HedgePolicy, HedgeBudget, LatencyTracker, parse_alternates
+
+def answer_after(delay, value, calls=None):
+    async def call():
+        if calls is not None:
+            calls.append(value)
+        await asyncio.sleep(delay)
+        return value
+    return call
+
+def fail_after(delay):
+    async def call():
+        await asyncio.sleep(delay)
+        raise Exception("503 overloaded")
+    return call
+
+class TestHedging(unittest.TestCase):
+    def policy(self, **settings):
+        return HedgePolicy(HedgeConfig(**{"default_delay": 0.05, "min_delay": 0.0, **settings}))
+
+    def test_parse_alternates(self):
+        self.assertEqual(parse_alternates("groq:llama-3.1-8b-instant, huggingface:Qwen/Qwen2.5-3B-Instruct, bad"),
+                         [("groq", "llama-3.1-8b-instant"), ("huggingface", "Qwen/Qwen2.5-3B-Instruct")])
+
+    def test_delay_uses_observed_quantile(self):
+        policy = self.policy(min_samples=10)
+        self.assertEqual(policy.delay("groq", "m", "response"), 0.05)
+        for i in range(1, 11):
+            policy.tracker.observe("groq", "m", "response", i / 10)
+        self.assertAlmostEqual(policy.delay("groq", "m", "response"), 1.0)
+        self.assertEqual(LatencyTracker().quantile("groq", "m", "response", 0.9), None)
+
+    def test_alternate_skips_primary(self):
+        policy = self.policy(alternates=[("groq", "a"), ("groq", "b")])
+        self.assertEqual(policy.alternate_for("groq", "a"), ("groq", "b"))
+        self.assertEqual(self.policy().alternate_for("huggingface", "x", [("huggingface", "x"), ("huggingface", "y")]),
+                         ("huggingface", "y"))
+        self.assertIsNone(self.policy(enabled=False).alternate_for("groq", "c", [("groq", "d")]))
+
+    def test_fast_primary_is_not_hedged(self):
+        policy = self.policy()
+        calls = []
+        result = asyncio.run(policy.race("groq", "m", "response", answer_after(0, "primary"),
+                                         answer_after(0, "hedge", calls)))
+        self.assertEqual(result, "primary")
+        self.assertEqual(calls, [])
+        self.assertEqual(policy.get_stats()["hedged"], 0)
+
+    def test_slow_primary_loses_to_hedge_and_is_cancelled(self):
+        policy = self.policy()
+        cancelled = []
+        async def slow_primary():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        result = asyncio.run(policy.race("groq", "m", "response", slow_primary, answer_after(0, "hedge")))
+        self.assertEqual(result, "hedge")
+        self.assertEqual(cancelled, [True])
+        self.assertEqual(policy.get_stats()["won"], 1)
+
+    def test_failed_primary_waits_for_hedge(self):
+        policy = self.policy()
+        result = asyncio.run(policy.race("groq", "m", "response", fail_after(0.1), answer_after(0.2, "hedge")))
+        self.assertEqual(result, "hedge")
+
+    def test_both_failing_raises_primary_error(self):
+        policy = self.policy()
+        with self.assertRaises(Exception):
+            asyncio.run(policy.race("groq", "m", "response", fail_after(0.1), fail_after(0.1)))
+
+    def test_budget_caps_hedges(self):
+        budget = HedgeBudget(ratio=0.5, burst=1.0)
+        self.assertTrue(budget.try_acquire())
+        self.assertFalse(budget.try_acquire())
+        budget.record_request()
+        budget.record_request()
+        self.assertTrue(budget.try_acquire())
+        policy = self.policy(budget_burst=1.0, budget_ratio=0.0)
+        async def run_twice():
+            return [await policy.race("groq", "m", "response", answer_after(0.1, "primary"), answer_after(0, "hedge"))
+                    for _ in range(2)]
+        self.assertEqual(asyncio.run(run_twice()), ["hedge", "primary"])
+        self.assertEqual(policy.get_stats()["over_budget"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
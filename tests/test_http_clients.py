@@ -0,0 +1,38 @@
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.http_clients import ProviderClientPool
+
+class FakeClient:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class TestProviderClientPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = ProviderClientPool()
+
+    def test_reuses_client_per_provider_endpoint_and_key(self):
+        first = self.pool.get("openai", "https://api.groq.com/openai/v1", "key-a", FakeClient)
+        again = self.pool.get("openai", "https://api.groq.com/openai/v1", "key-a", FakeClient)
+        other_key = self.pool.get("openai", "https://api.groq.com/openai/v1", "key-b", FakeClient)
+        self.assertIs(first, again)
+        self.assertIsNot(first, other_key)
+        stats = self.pool.get_stats()
+        self.assertEqual((stats["created"], stats["reused"]), (2, 1))
+        self.assertNotIn("key-a", str(stats))
+
+    def test_configure_closes_cached_clients(self):
+        client = self.pool.get("huggingface", "", "key", FakeClient)
+        self.pool.configure(max_connections=4, read_timeout=30.0)
+        self.assertTrue(client.closed)
+        self.assertEqual(self.pool.config.max_connections, 4)
+        self.assertIsNot(self.pool.get("huggingface", "", "key", FakeClient), client)
+        with self.assertRaises(ValueError):
+            self.pool.configure(pool_size=3)
+
+if __name__ == '__main__':
+    unittest.main()
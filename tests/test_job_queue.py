@@ -0,0 +1,95 @@
+import unittest
+import os
+import sys
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.job_queue import JobQueue
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.updates = []
+        self.release = None
+
+    async def runner(self, job):
+        await self.release.wait()
+        if job.query == "fail":
+            raise ValueError("boom")
+        return job.query != "bad", {"answer": job.query.upper()}
+
+    async def on_update(self, job):
+        self.updates.append((job.job_id, job.status))
+
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_runs_jobs_with_bounded_concurrency(self):
+        async def scenario():
+            self.release = asyncio.Event()
+            queue = JobQueue(self.runner, concurrency=2, max_queue=10, on_update=self.on_update)
+            jobs = [await queue.submit("s", q) for q in ("a", "b", "bad", "fail")]
+            await asyncio.sleep(0.05)
+            self.assertEqual(queue.get_stats()["running"], 2)
+            self.assertEqual(queue.position(jobs[2]), 1)
+            self.release.set()
+            await queue.queue.join()
+            await queue.stop()
+            return queue, jobs
+        queue, jobs = self.run_async(scenario())
+        self.assertEqual([j.status for j in jobs], ["done", "done", "failed", "failed"])
+        self.assertEqual(jobs[0].result, {"answer": "A"})
+        self.assertEqual(jobs[3].error, "boom")
+        stats = queue.get_stats()
+        self.assertEqual(stats["done"], 2)
+        self.assertEqual(stats["failed"], 2)
+        self.assertEqual(stats["queue_wait"]["samples"], 4)
+        self.assertIn((jobs[0].job_id, "running"), self.updates)
+
+    def test_rejects_when_full(self):
+        async def scenario():
+            self.release = asyncio.Event()
+            queue = JobQueue(self.runner, concurrency=1, max_queue=1)
+            await queue.submit("s", "a")
+            await asyncio.sleep(0.01)
+            await queue.submit("s", "b")
+            with self.assertRaises(RuntimeError):
+                await queue.submit("s", "c")
+            self.assertEqual(queue.get_stats()["rejected"], 1)
+            await queue.stop()
+        self.run_async(scenario())
+
+    def test_cancelled_jobs_free_their_slot(self):
+        async def scenario():
+            self.release = asyncio.Event()
+            queue = JobQueue(self.runner, concurrency=1, max_queue=2)
+            await queue.submit("s", "a")
+            await asyncio.sleep(0.01)
+            queued = [await queue.submit("s", q) for q in ("b", "c")]
+            for job in queued:
+                self.assertTrue(await queue.cancel(job.job_id))
+            replacements = [await queue.submit("s", q) for q in ("d", "e")]
+            self.release.set()
+            await queue.queue.join()
+            await queue.stop()
+            return replacements
+        self.assertEqual([j.status for j in self.run_async(scenario())], ["done", "done"])
+
+    def test_cancel_queued_and_running(self):
+        async def scenario():
+            self.release = asyncio.Event()
+            queue = JobQueue(self.runner, concurrency=1, max_queue=5)
+            running = await queue.submit("s", "a")
+            queued = await queue.submit("s", "b")
+            await asyncio.sleep(0.01)
+            self.assertTrue(await queue.cancel(queued.job_id))
+            self.assertTrue(await queue.cancel(running.job_id))
+            await asyncio.sleep(0.01)
+            self.assertFalse(await queue.cancel(running.job_id))
+            await queue.stop()
+            return running, queued
+        running, queued = self.run_async(scenario())
+        self.assertEqual(running.status, "cancelled")
+        self.assertEqual(queued.status, "cancelled")
+        self.assertIsNone(queued.started_at)
+
+if __name__ == '__main__':
+    unittest.main()
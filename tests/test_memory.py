@@ -79,6 +79,31 @@ class TestMemory(unittest.TestCase):
         self.memory.reset(new_memory)
         self.assertEqual(self.memory.memory, new_memory)
 
+    def test_trim_text_to_model_budget(self):
+        self.memory.model_provider = "Qwen/Qwen2.5-3B-Instruct"
+        text = "word " * 100000
+        trimmed = self.memory.trim_text_to_max_ctx(text)
+        self.assertTrue(text.startswith(trimmed))
+        self.assertLess(len(trimmed), len(text))
+        self.assertEqual(self.memory.trim_text_to_max_ctx("Hello"), "Hello")
+
+    def test_get_fits_context_budget_without_compression(self):
+        self.memory.model_provider = "unknown-model"
+        budget = self.memory.context_budget()
+        for i in range(40):
+            self.memory.push("user" if i % 2 == 0 else "assistant", f"{i} " + "kata " * 300)
+        messages = self.memory.get()
+        self.assertEqual(len(self.memory.memory), 41)
+        self.assertEqual(messages[0]['content'], self.system_prompt)
+        self.assertEqual(messages[-1]['content'], self.memory.memory[-1]['content'])
+        self.assertLess(len(messages), 41)
+        self.assertLessEqual(sum(len(m['content']) for m in messages) // 4, budget)
+        self.memory.push("user", "besar " * 100000)
+        messages = self.memory.get()
+        self.assertEqual(len(messages), 2)
+        self.assertTrue(messages[1]['content'].startswith("besar"))
+        self.assertGreater(len(self.memory.trim_text_to_max_ctx("halaman " * 100000)), 0)
+
     def test_save_and_load_memory(self):
         self.memory.push("user", "Hello")
         self.memory.push("assistant", "Hi")
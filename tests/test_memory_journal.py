@@ -0,0 +1,55 @@
+import unittest
+import os
+import sys
+import json
+import shutil
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.memory_journal import MemoryJournal, replay
+
+class TestMemoryJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "casual_agent", "memory.txt")
+        self.journal = MemoryJournal(flush_interval=0.01, compact_every=10)
+
+    def tearDown(self):
+        self.journal.flush()
+        shutil.rmtree(self.tmpdir)
+
+    def read_records(self):
+        with open(self.path, 'r') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def test_append_and_replay(self):
+        self.journal.append(self.path, [{'role': 'user', 'content': 'hi'}])
+        self.journal.append(self.path, [{'role': 'assistant', 'content': 'hello'}])
+        self.journal.flush()
+        self.assertEqual([m['content'] for m in replay(self.path)], ['hi', 'hello'])
+        self.assertEqual(len(self.read_records()), 2)
+
+    def test_snapshot_replaces_earlier_records(self):
+        self.journal.append(self.path, [{'role': 'user', 'content': 'old'}])
+        self.journal.snapshot(self.path, [{'role': 'system', 'content': 'summary'}])
+        self.journal.append(self.path, [{'role': 'user', 'content': 'new'}])
+        self.journal.flush()
+        self.assertEqual([m['content'] for m in replay(self.path)], ['summary', 'new'])
+        self.assertEqual(self.read_records()[0]['op'], 'snapshot')
+
+    def test_compacts_after_threshold(self):
+        for i in range(12):
+            self.journal.append(self.path, [{'role': 'user', 'content': str(i)}])
+            self.journal.flush()
+        self.assertLess(len(self.read_records()), 10)
+        self.assertEqual([m['content'] for m in replay(self.path)], [str(i) for i in range(12)])
+        self.assertGreaterEqual(self.journal.get_stats()['compactions'], 1)
+
+    def test_replay_ignores_torn_last_line(self):
+        self.journal.append(self.path, [{'role': 'user', 'content': 'kept'}])
+        self.journal.flush()
+        with open(self.path, 'a') as f:
+            f.write('{"op": "append", "msg": {"role": "us')
+        self.assertEqual([m['content'] for m in replay(self.path)], ['kept'])
+
+if __name__ == '__main__':
+    unittest.main()
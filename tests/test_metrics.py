@@ -0,0 +1,53 @@
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.metrics import MetricsRegistry, timed, outcome
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_histogram_exposition(self):
+        hist = self.registry.histogram("stage_seconds", "Stage time.", ["tool"], buckets=[0.1, 1.0])
+        hist.observe(0.05, tool="python")
+        hist.observe(0.5, tool="python")
+        hist.observe(5, tool="python")
+        text = self.registry.expose()
+        self.assertIn("# TYPE stage_seconds histogram", text)
+        self.assertIn('stage_seconds_bucket{tool="python",le="0.1"} 1', text)
+        self.assertIn('stage_seconds_bucket{tool="python",le="1"} 2', text)
+        self.assertIn('stage_seconds_bucket{tool="python",le="+Inf"} 3', text)
+        self.assertIn('stage_seconds_count{tool="python"} 3', text)
+        self.assertIn('stage_seconds_sum{tool="python"} 5.55', text)
+
+    def test_counter_and_gauge(self):
+        counter = self.registry.counter("errors_total", "Errors.", ["model"])
+        counter.inc(model='a"b')
+        counter.inc(2, model='a"b')
+        gauge = self.registry.gauge("queued", "Queued.")
+        gauge.set_function(lambda: 7)
+        text = self.registry.expose()
+        self.assertIn('errors_total{model="a\\"b"} 3', text)
+        self.assertIn("queued 7", text)
+        with self.assertRaises(ValueError):
+            self.registry.counter("errors_total", "Again.")
+
+    def test_timed_decorator(self):
+        hist = self.registry.histogram("call_seconds", "Calls.", ["outcome"])
+
+        @timed(hist, lambda args, result, error: {"outcome": outcome(result, error)})
+        def call(ok):
+            if ok is None:
+                raise RuntimeError("boom")
+            return ok
+
+        call(True)
+        call(False)
+        with self.assertRaises(RuntimeError):
+            call(None)
+        self.assertEqual(sum(hist.labels(outcome="ok").counts), 1)
+        self.assertEqual(sum(hist.labels(outcome="error").counts), 2)
+
+if __name__ == '__main__':
+    unittest.main()
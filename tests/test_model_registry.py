@@ -0,0 +1,72 @@
+import unittest
+import os
+import sys
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.model_registry import ModelRegistry, ModelInfo, DEFAULT_CONTEXT_WINDOW, OUTPUT_RESERVE
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ModelRegistry()
+
+    def test_known_and_unknown_models(self):
+        self.assertEqual(self.registry.get("llama-3.3-70b-versatile").context_window, 131072)
+        self.assertEqual(self.registry.get("Qwen/Qwen2.5-72B-Instruct").context_window, 32768)
+        self.assertEqual(self.registry.get("qwen/qwen2.5-72b-instruct").context_window, 32768)
+        self.assertEqual(self.registry.get("groq/llama-3.1-8b-instant").context_window, 131072)
+        self.assertEqual(self.registry.get("deepseek-r1:14b").context_window, DEFAULT_CONTEXT_WINDOW)
+        self.assertEqual(self.registry.get(None).context_window, DEFAULT_CONTEXT_WINDOW)
+
+    def test_input_budget_leaves_room_for_completion(self):
+        self.assertEqual(ModelInfo("m", 32768, 8192).input_budget, 32768 - OUTPUT_RESERVE)
+        self.assertEqual(ModelInfo("m", 8192, 1024).input_budget, 8192 - 1024)
+        self.assertEqual(ModelInfo("m", 2048).input_budget, 1024)
+
+    def test_overrides(self):
+        self.registry.load_overrides({"deepseek-r1:14b": "65536", "Qwen/Qwen2.5-3B-Instruct": "16384",
+                                      "broken": "many"})
+        self.assertEqual(self.registry.get("deepseek-r1:14b").context_window, 65536)
+        override = self.registry.get("qwen/qwen2.5-3b-instruct")
+        self.assertEqual((override.context_window, override.max_output), (16384, 8192))
+        self.assertEqual(self.registry.get("broken").context_window, DEFAULT_CONTEXT_WINDOW)
+        self.registry.load_overrides(None)
+
+    def test_counting_and_trimming(self):
+        self.registry.preload()
+        text = "lorem ipsum dolor sit amet " * 200
+        count = self.registry.count_tokens(text, "llama-3.3-70b-versatile")
+        self.assertGreater(count, 0)
+        self.assertEqual(self.registry.count_tokens(text, "llama-3.3-70b-versatile"), count)
+        self.assertEqual(self.registry.count_tokens(""), 0)
+        messages = [{"role": "system", "content": text}, {"role": "user", "content": ""}]
+        self.assertEqual(self.registry.count_messages(messages, "llama-3.3-70b-versatile"), count + 8)
+
+        self.assertEqual(self.registry.trim_to_tokens("short", 100), "short")
+        self.assertEqual(self.registry.trim_to_tokens(text, 0), "")
+        trimmed = self.registry.trim_to_tokens(text, 50, "llama-3.3-70b-versatile")
+        self.assertTrue(text.startswith(trimmed))
+        self.assertLessEqual(self.registry.count_tokens(trimmed, "llama-3.3-70b-versatile"), 50)
+        self.assertGreater(len(trimmed), 50)
+
+    def test_encoder_loads_in_background(self):
+        release = threading.Event()
+        class Encoding:
+            def encode(self, text, disallowed_special=()):
+                return text.split()
+        def get_encoding(name):
+            release.wait(5)
+            return Encoding()
+        with patch('sources.model_registry.TIKTOKEN_FOUND', True), \
+             patch('sources.model_registry.tiktoken', SimpleNamespace(get_encoding=get_encoding)):
+            text = "satu dua tiga empat lima enam tujuh delapan"
+            self.assertEqual(self.registry.count_tokens(text), 11)
+            self.assertEqual(self.registry.get_stats()["approximate"], 1)
+            release.set()
+            self.registry.preload(["llama-3.3-70b-versatile"])
+            self.assertEqual(self.registry.count_tokens(text), 8)
+            self.assertEqual(self.registry.get_stats()["encoders"], ["o200k_base"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,10 +5,12 @@ import socket
 import subprocess
 from urllib.parse import urlparse
 import platform
+from types import SimpleNamespace
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
 
 from sources.llm_provider import Provider
+from sources.usage import usage_tracker
 
 class TestIsIpOnline(unittest.TestCase):
     def setUp(self):
@@ -66,5 +68,82 @@ class TestIsIpOnline(unittest.TestCase):
             result = self.checker.is_ip_online(address)
             self.assertTrue(result)
 
+class TestRespondStream(unittest.TestCase):
+    def setUp(self):
+        self.provider = Provider("test", "test-model")
+        self.provider.respond = MagicMock(return_value="blocking answer")
+        patcher = patch('sources.llm_provider.get_response_cache', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_failure_before_first_delta_falls_back(self):
+        def stream_fn(history, verbose):
+            raise Exception("503 overloaded")
+            yield
+        self.provider.stream_providers["test"] = stream_fn
+        with patch('sources.llm_provider.rate_limiter.acquire') as acquire:
+            self.assertEqual(list(self.provider.respond_stream([])), ["blocking answer"])
+        self.provider.respond.assert_called_once_with([], False, quota_acquired=True)
+        self.assertEqual(acquire.call_count, 1)
+        record = usage_tracker.recent[-1]
+        self.assertEqual((record["stream"], record["outcome"], record["prompt_tokens"]), (True, "fallback", 0))
+
+    def test_respond_skips_quota_already_taken(self):
+        provider = Provider("test", "test-model")
+        with patch('sources.llm_provider.get_response_cache', return_value=None), \
+             patch('sources.llm_provider.rate_limiter.acquire') as acquire:
+            provider.respond([], quota_acquired=True)
+            self.assertEqual(acquire.call_count, 0)
+            provider.respond([])
+            self.assertEqual(acquire.call_count, 1)
+
+    def test_failure_after_first_delta_raises(self):
+        def stream_fn(history, verbose):
+            yield "Halo"
+            raise Exception("connection reset")
+        self.provider.stream_providers["test"] = stream_fn
+        deltas = []
+        with self.assertRaisesRegex(Exception, "gagal saat streaming"):
+            for delta in self.provider.respond_stream([]):
+                deltas.append(delta)
+        self.assertEqual(deltas, ["Halo"])
+        self.provider.respond.assert_not_called()
+
+    def test_streams_deltas(self):
+        self.provider.stream_providers["test"] = lambda history, verbose: iter(["Ha", "", "lo"])
+        self.assertEqual(list(self.provider.respond_stream([])), ["Ha", "lo"])
+        self.provider.respond.assert_not_called()
+
+    def test_without_stream_support_uses_respond(self):
+        self.assertEqual(list(self.provider.respond_stream([])), ["blocking answer"])
+
+class TestHuggingfaceFallback(unittest.TestCase):
+    def test_fallback_leaves_shared_model(self):
+        provider = Provider("test", "test-model")
+        provider.api_key = "key"
+        def create(model, messages, max_tokens):
+            if model == "Qwen/Qwen2.5-72B-Instruct":
+                raise Exception("402 payment required")
+            return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content=model))])
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        record = SimpleNamespace(model="test-model")
+        with patch('sources.llm_provider.client_pool.huggingface', return_value=client):
+            answer = provider._try_huggingface_fallback([], False, record)
+        self.assertEqual(answer, "Qwen/Qwen2.5-3B-Instruct")
+        self.assertEqual(record.model, "Qwen/Qwen2.5-3B-Instruct")
+        self.assertEqual(provider.model, "test-model")
+
+class TestRateLimitRetry(unittest.TestCase):
+    def test_backs_off_with_limiter_disabled(self):
+        provider = Provider("test", "test-model")
+        provider.available_providers["test"] = MagicMock(side_effect=Exception("429 rate limit"))
+        with patch('sources.llm_provider.get_response_cache', return_value=None), \
+             patch('sources.llm_provider.rate_limiter.enabled', False), \
+             patch('sources.llm_provider.rate_limiter.record_rate_limited', side_effect=lambda p, m, e, d: d), \
+             patch('sources.llm_provider.time.sleep') as sleep:
+            answer = provider.respond([])
+        self.assertIn("Batas penggunaan API", answer)
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [3, 6])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,37 @@
+import unittest
+import os, sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+
+from sources.provider_registry import ProviderRegistry
+
+class TestProviderRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ProviderRegistry(max_cached=2)
+        self.swapped = []
+        self.registry.on_swap.append(lambda provider: self.swapped.append(provider.get_model_name()))
+
+    def test_swap_keeps_handle(self):
+        handle = self.registry.activate("test", "model-a", "127.0.0.1:5000")
+        self.assertEqual(handle.get_model_name(), "model-a")
+        same = self.registry.activate("test", "model-b", "127.0.0.1:5000")
+        self.assertIs(same, handle)
+        self.assertEqual(handle.get_model_name(), "model-b")
+        self.assertEqual(self.swapped, ["model-b"])
+
+    def test_providers_are_reused(self):
+        first = self.registry.get_or_create("test", "model-a", "127.0.0.1:5000")
+        self.assertIs(self.registry.get_or_create("test", "model-a", "127.0.0.1:5000"), first)
+        self.registry.get_or_create("test", "model-b", "127.0.0.1:5000")
+        self.registry.get_or_create("test", "model-c", "127.0.0.1:5000")
+        self.assertIsNot(self.registry.get_or_create("test", "model-a", "127.0.0.1:5000"), first)
+
+    def test_failed_activation_keeps_active_provider(self):
+        handle = self.registry.activate("test", "model-a", "127.0.0.1:5000")
+        with self.assertRaises(ValueError):
+            self.registry.activate("unknown", "model-x", "127.0.0.1:5000")
+        self.assertEqual(handle.get_model_name(), "model-a")
+        self.assertEqual(self.swapped, [])
+
+if __name__ == '__main__':
+    unittest.main()
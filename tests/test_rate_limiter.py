@@ -0,0 +1,110 @@
+import unittest
+import os
+import sys
+import time
+import asyncio
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.rate_limiter import RateLimiter, parse_duration, parse_retry_after, headers_from_error, request_session
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+class FakeHTTPError(Exception):
+    def __init__(self, message, headers):
+        super().__init__(message)
+        self.response = FakeResponse(headers)
+
+class TestRateLimiter(unittest.TestCase):
+    def test_parse_durations_and_retry_after(self):
+        self.assertEqual(parse_duration("12"), 12.0)
+        self.assertAlmostEqual(parse_duration("2m59.56s"), 179.56)
+        self.assertAlmostEqual(parse_duration("250ms"), 0.25)
+        self.assertIsNone(parse_duration("soon"))
+        self.assertEqual(parse_retry_after({"retry-after": "3"}), 3.0)
+        self.assertEqual(parse_retry_after({"Retry-After-Ms": "1500"}), 1.5)
+
+    def test_headers_found_through_wrapped_error(self):
+        try:
+            try:
+                raise FakeHTTPError("429", {"retry-after": "1"})
+            except Exception as e:
+                raise Exception("Groq API error: 429") from e
+        except Exception as wrapped:
+            self.assertEqual(headers_from_error(wrapped), {"retry-after": "1"})
+
+    def test_requests_per_minute_bucket(self):
+        limiter = RateLimiter(rpm={"groq": 120})
+        limit = limiter.limit("groq", "m")
+        limit.bucket = 1.0
+        self.assertEqual(limiter.acquire("groq", "m"), 0.0)
+        waited = limiter.acquire("groq", "m")
+        self.assertGreater(waited, 0.3)
+        self.assertLess(waited, 1.5)
+        self.assertEqual(limiter.get_stats()["limits"]["groq/m"]["waited"], 1)
+
+    def test_headers_exhausted_quota_and_retry_after(self):
+        limiter = RateLimiter()
+        limiter.record_response("groq", "m", {"x-ratelimit-remaining-requests": "0",
+                                              "x-ratelimit-reset-requests": "0.3s",
+                                              "x-ratelimit-remaining-tokens": "5000"})
+        self.assertGreater(limiter.acquire("groq", "m", cost=100), 0.2)
+        self.assertEqual(limiter.limit("groq", "m").remaining_tokens, 4900)
+        delay = limiter.record_rate_limited("groq", "m", FakeHTTPError("429", {"retry-after": "0.3"}), 5)
+        self.assertEqual(delay, 0.3)
+        self.assertGreater(limiter.acquire("groq", "m"), 0.2)
+
+    def test_token_quota_blocks_large_prompt(self):
+        limiter = RateLimiter()
+        limiter.record_response("groq", "m", {"x-ratelimit-remaining-tokens": "50",
+                                              "x-ratelimit-reset-tokens": "0.3s"})
+        self.assertEqual(limiter.acquire("groq", "m", cost=10), 0.0)
+        self.assertGreater(limiter.acquire("groq", "m", cost=100), 0.2)
+
+    def test_sessions_are_served_round_robin(self):
+        limiter = RateLimiter(rpm={"groq": 600})
+        limiter.limit("groq", "m").bucket = 0.0
+        order = []
+        async def call(session):
+            request_session.set(session)
+            await limiter.acquire_async("groq", "m")
+            order.append(session)
+        async def scenario():
+            tasks = [asyncio.create_task(call(s)) for s in ["a", "a", "a", "b"]]
+            await asyncio.gather(*tasks)
+        asyncio.run(scenario())
+        self.assertEqual(order, ["a", "b", "a", "a"])
+
+    def test_cancelled_waiter_leaves_queue(self):
+        limiter = RateLimiter()
+        limiter.record_rate_limited("groq", "m", Exception("429"), 0.2)
+        async def scenario():
+            task = asyncio.create_task(limiter.acquire_async("groq", "m"))
+            await asyncio.sleep(0.05)
+            self.assertEqual(limiter.limit("groq", "m").queued(), 1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        asyncio.run(scenario())
+        self.assertEqual(limiter.limit("groq", "m").queued(), 0)
+
+    def test_sync_and_async_callers_share_quota(self):
+        limiter = RateLimiter()
+        limiter.record_rate_limited("groq", "m", Exception("429"), 0.2)
+        waits = []
+        thread = threading.Thread(target=lambda: waits.append(limiter.acquire("groq", "m")))
+        thread.start()
+        waits.append(asyncio.run(limiter.acquire_async("groq", "m")))
+        thread.join()
+        self.assertTrue(all(w > 0.1 for w in waits))
+
+    def test_disabled_limiter_never_waits(self):
+        limiter = RateLimiter(enabled=False)
+        limiter.record_rate_limited("groq", "m", Exception("429"), 10)
+        start = time.monotonic()
+        self.assertEqual(limiter.acquire("groq", "m"), 0.0)
+        self.assertLess(time.monotonic() - start, 0.1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import unittest
+import os
+import sys
+import json
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.realtime import ConnectionManager
+from sources.subscriptions import Subscription
+from sources.orchestrator import AutonomousOrchestrator, ExecutionPlan, TaskStep
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    def events(self):
+        return [m for m in self.sent if m["type"] != "hello"]
+
+    async def close(self, code=1000):
+        pass
+
+class TestConnectionManager(unittest.TestCase):
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_status_is_rate_limited_last_value_wins(self):
+        async def scenario():
+            manager = ConnectionManager()
+            manager.min_intervals["status"] = 0.05
+            ws = FakeSocket()
+            await manager.connect(ws)
+            for i in range(10):
+                await manager.send_status("planner", f"step {i}", i / 10)
+            await asyncio.sleep(0.1)
+            manager.disconnect(ws)
+            return manager, ws
+        manager, ws = self.run_async(scenario())
+        self.assertEqual([m["status"] for m in ws.events()], ["step 0", "step 9"])
+        self.assertEqual(manager.stats["merged"], 8)
+
+    def test_quiet_coalesce_keys_are_forgotten(self):
+        async def scenario():
+            manager = ConnectionManager()
+            manager.min_intervals["status"] = 0.02
+            ws = FakeSocket()
+            await manager.connect(ws)
+            for session in ("alice", "bob", "carol"):
+                await manager.send_status("planner", "mulai", 0.0, session_id=session)
+                await manager.send_status("planner", "selesai", 1.0, session_id=session)
+            self.assertEqual(len(manager.last_sent), 3)
+            await asyncio.sleep(0.1)
+            manager.disconnect(ws)
+            return manager, ws
+        manager, ws = self.run_async(scenario())
+        self.assertEqual(len(ws.events()), 6)
+        self.assertEqual((manager.last_sent, manager.pending, manager.flush_handles), ({}, {}, {}))
+
+    def test_file_updates_are_batched(self):
+        async def scenario():
+            manager = ConnectionManager()
+            ws = FakeSocket()
+            await manager.connect(ws)
+            await manager.send_file_updates([("create", f"src/{i}.js") for i in range(500)])
+            await manager.send_file_update("save", "index.html")
+            await manager.send_file_update("save", "style.css")
+            await asyncio.sleep(0.35)
+            manager.disconnect(ws)
+            return ws
+        events = self.run_async(scenario()).events()
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0]["count"], 500)
+        self.assertTrue(events[0]["truncated"])
+        self.assertEqual(events[1]["action"], "batch")
+        self.assertEqual([f["filepath"] for f in events[1]["files"]], ["index.html", "style.css"])
+
+    def test_reconnect_replays_missed_events(self):
+        async def scenario():
+            manager = ConnectionManager()
+            first = FakeSocket()
+            await manager.connect(first)
+            await manager.send_agent_switch("Coder", "code_agent")
+            await asyncio.sleep(0.01)
+            hello, seen = first.sent[0], first.sent[-1]["seq"]
+            manager.disconnect(first)
+            await manager.send_agent_switch("Browser", "browser_agent")
+            await manager.send_token("Browser", "x", "default")
+            second = FakeSocket()
+            await manager.connect(second, resume_from=seen, epoch=hello["epoch"],
+                                  subscription=Subscription(sessions={"default"}))
+            stale = FakeSocket()
+            await manager.connect(stale, resume_from=seen, epoch="old-epoch")
+            await asyncio.sleep(0.01)
+            return second, stale
+        second, stale = self.run_async(scenario())
+        self.assertEqual([m["type"] for m in second.sent], ["hello", "agent_switch"])
+        self.assertEqual(second.sent[1]["agent_name"], "Browser")
+        self.assertEqual(stale.sent[1]["type"], "resync")
+
+    def test_routes_session_events_to_subscribers(self):
+        async def scenario():
+            manager = ConnectionManager()
+            mine, other, watcher = FakeSocket(), FakeSocket(), FakeSocket()
+            await manager.connect(mine, subscription=Subscription(sessions={"a"}))
+            await manager.connect(other, subscription=Subscription(sessions={"b"}, types={"token"}))
+            await manager.connect(watcher)
+            await manager.send_token("Coder", "x", "a")
+            await manager.send_agent_switch("Coder", "code_agent", session_id="b")
+            await manager.send_preview_ready("/api/preview/index.html", "static_html")
+            await asyncio.sleep(0.01)
+            return mine, other, watcher
+        mine, other, watcher = self.run_async(scenario())
+        self.assertEqual([m["type"] for m in mine.events()], ["token", "preview_ready"])
+        self.assertEqual(other.events(), [])
+        self.assertEqual(len(watcher.events()), 3)
+
+    def test_plan_events_reach_only_owning_session(self):
+        async def scenario():
+            manager = ConnectionManager()
+            owner, other = FakeSocket(), FakeSocket()
+            await manager.connect(owner, subscription=Subscription(sessions={"a"}))
+            await manager.connect(other, subscription=Subscription(sessions={"b"}))
+            orchestrator = AutonomousOrchestrator({}, None, ws_manager=manager, session_id="a")
+            orchestrator.plan = ExecutionPlan(goal="web", steps=[TaskStep(1, "buat halaman", "coder")])
+            await orchestrator._notify_plan(1)
+            await orchestrator._send_peor("execute", 1, "buat halaman")
+            await orchestrator._send_progress(1, "buat halaman")
+            await manager.send_execution_log("success", "Langkah 1 berhasil", "coder", session_id="a")
+            await asyncio.sleep(0.01)
+            return owner, other
+        owner, other = self.run_async(scenario())
+        self.assertEqual([m["type"] for m in owner.events()], ["plan", "peor", "plan_progress", "execution_log"])
+        self.assertTrue(all(m["session_id"] == "a" for m in owner.events()))
+        self.assertEqual(other.events(), [])
+
+    def test_coalescing_keeps_each_sessions_final_state(self):
+        async def scenario():
+            manager = ConnectionManager()
+            manager.min_intervals["plan"] = 0.05
+            manager.min_intervals["plan_progress"] = 0.05
+            ws = FakeSocket()
+            await manager.connect(ws)
+            for step in range(4):
+                for session_id in ("a", "b"):
+                    await manager.send_plan_update([{"id": step}], step, session_id=session_id)
+                    await manager.send_plan_progress(4, step, 0, session_id=session_id)
+                    await manager.send_peor_update("execute", step % 2, f"{session_id}{step}", session_id=session_id)
+            await asyncio.sleep(0.15)
+            return ws
+        events = self.run_async(scenario()).events()
+        def last(event_type, session_id, **match):
+            found = [m for m in events if m["type"] == event_type and m["session_id"] == session_id
+                     and all(m[k] == v for k, v in match.items())]
+            return found[-1]
+        for session_id in ("a", "b"):
+            self.assertEqual(last("plan", session_id)["current_step"], 3)
+            self.assertEqual(last("plan_progress", session_id)["completed_steps"], 3)
+            self.assertEqual(last("peor", session_id, step_id=0)["details"], f"{session_id}2")
+            self.assertEqual(last("peor", session_id, step_id=1)["details"], f"{session_id}3")
+
+if __name__ == '__main__':
+    unittest.main()
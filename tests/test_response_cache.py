@@ -0,0 +1,63 @@
+import unittest
+import os
+import sys
+import time
+import shutil
+import tempfile
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.response_cache import ResponseCache, cache_keys
+
+HISTORY = [{'role': 'system', 'content': 'Kamu asisten.'}, {'role': 'user', 'content': 'Halo  dunia\n'}]
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "llm_cache.sqlite3")
+        self.cache = ResponseCache(self.path, ttl=60)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_keys_depend_on_model_and_params(self):
+        base = cache_keys("groq", "llama", HISTORY)
+        self.assertNotEqual(base, cache_keys("groq", "other", HISTORY))
+        self.assertNotEqual(base, cache_keys("groq", "llama", HISTORY, {"max_tokens": 10}))
+        self.assertTrue(base[1].startswith("n:"))
+
+    def test_exact_and_normalized_hits(self):
+        self.assertIsNone(self.cache.get("groq", "llama", HISTORY))
+        self.cache.put("groq", "llama", HISTORY, "jawaban")
+        self.assertEqual(self.cache.get("groq", "llama", HISTORY), "jawaban")
+        reformatted = [{'role': 'system', 'content': ' Kamu asisten. '}, {'role': 'user', 'content': 'Halo dunia'}]
+        self.assertEqual(self.cache.get("groq", "llama", reformatted), "jawaban")
+        self.assertIsNone(self.cache.get("groq", "other", HISTORY))
+        self.assertEqual(self.cache.get_stats()["hits"], 2)
+
+    def test_disk_tier_survives_restart(self):
+        self.cache.put("groq", "llama", HISTORY, "jawaban")
+        self.cache.close()
+        self.cache = ResponseCache(self.path, ttl=60)
+        self.assertEqual(self.cache.get_stats()["memory_entries"], 0)
+        self.assertEqual(self.cache.get("groq", "llama", HISTORY), "jawaban")
+        self.assertGreater(self.cache.get_stats()["memory_entries"], 0)
+
+    def test_expired_entries_miss(self):
+        self.cache.put("groq", "llama", HISTORY, "jawaban")
+        with patch("sources.response_cache.time.time", return_value=time.time() + 120):
+            self.assertIsNone(self.cache.get("groq", "llama", HISTORY))
+        self.assertEqual(self.cache.get_stats()["disk_entries"], 0)
+
+    def test_disk_trimmed_to_max_bytes(self):
+        self.cache.close()
+        self.cache = ResponseCache(self.path, ttl=60, max_bytes=250)
+        for i in range(5):
+            self.cache.put("groq", "llama", [{'role': 'user', 'content': str(i)}], "x" * 50)
+        stats = self.cache.get_stats()
+        self.assertLessEqual(stats["disk_bytes"], 250)
+        self.assertGreater(stats["evictions"], 0)
+        self.assertEqual(self.cache.get("groq", "llama", [{'role': 'user', 'content': '4'}]), "x" * 50)
+
+if __name__ == '__main__':
+    unittest.main()
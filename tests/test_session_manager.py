@@ -0,0 +1,162 @@
+import unittest
+import os
+import sys
+import time
+import asyncio
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.session_manager import SessionManager, DEFAULT_SESSION_ID
+
+class FakeAgent:
+    def __init__(self):
+        self.stop = False
+
+    def request_stop(self):
+        self.stop = True
+
+class FakeInteraction:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.agents = [FakeAgent()]
+        self.saved = False
+
+    def save_session(self):
+        self.saved = True
+
+class TestSessionManager(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+        self.evicted = []
+        self.factory_threads = []
+        def factory(session_id):
+            self.created.append(session_id)
+            self.factory_threads.append(threading.current_thread())
+            return FakeInteraction(session_id)
+        self.manager = SessionManager(factory, max_sessions=3, idle_timeout=60,
+                                      on_evict=lambda session: self.evicted.append(session.session_id))
+        self.manager.register(DEFAULT_SESSION_ID, FakeInteraction(DEFAULT_SESSION_ID))
+
+    def test_get_or_create_reuses_session(self):
+        first = self.manager.get_or_create("alice")
+        second = self.manager.get_or_create("alice")
+        self.assertIs(first, second)
+        self.assertEqual(self.created, ["alice"])
+
+    def test_sessions_are_isolated(self):
+        alice = self.manager.get_or_create("alice")
+        bob = self.manager.get_or_create("bob")
+        alice.is_generating = True
+        self.assertFalse(bob.is_generating)
+        self.assertIsNot(alice.interaction, bob.interaction)
+
+    def test_empty_id_maps_to_default(self):
+        self.assertIs(self.manager.get_or_create(""), self.manager.get(DEFAULT_SESSION_ID))
+
+    def test_evicts_least_recent_when_full(self):
+        self.manager.get_or_create("alice")
+        bob = self.manager.get_or_create("bob")
+        self.manager.sessions["alice"].last_active = time.time() - 10
+        self.manager.get_or_create("carol")
+        self.assertNotIn("alice", self.manager.sessions)
+        self.assertIn("bob", self.manager.sessions)
+        self.assertIn(DEFAULT_SESSION_ID, self.manager.sessions)
+        self.assertEqual(self.evicted, ["alice"])
+
+    def test_async_create_builds_once_off_the_event_loop(self):
+        async def scenario():
+            return await asyncio.gather(*[self.manager.get_or_create_async("alice") for _ in range(3)])
+        sessions = asyncio.run(scenario())
+        self.assertTrue(all(session is sessions[0] for session in sessions))
+        self.assertEqual(self.created.count("alice"), 1)
+        self.assertIsNot(self.factory_threads[-1], threading.main_thread())
+        self.assertEqual(self.manager.creating, {})
+
+    def test_async_create_rejects_when_full(self):
+        for session_id in ("alice", "bob"):
+            self.manager.get_or_create(session_id).set_generating(True)
+        with self.assertRaises(RuntimeError):
+            asyncio.run(self.manager.get_or_create_async("carol"))
+        self.assertNotIn("carol", self.created)
+
+    def test_generating_sessions_are_not_evicted(self):
+        alice = self.manager.get_or_create("alice")
+        bob = self.manager.get_or_create("bob")
+        alice.is_generating = True
+        bob.is_generating = True
+        with self.assertRaises(RuntimeError):
+            self.manager.get_or_create("carol")
+
+    def test_evict_idle(self):
+        alice = self.manager.get_or_create("alice")
+        alice.last_active = time.time() - 120
+        self.manager.sessions[DEFAULT_SESSION_ID].last_active = time.time() - 120
+        self.assertEqual(self.manager.evict_idle(), 1)
+        self.assertIn(DEFAULT_SESSION_ID, self.manager.sessions)
+        self.assertTrue(alice.interaction.agents[0].stop)
+
+    def test_wait_idle_resumes_one_waiter_per_turn(self):
+        async def scenario():
+            alice = self.manager.get_or_create("alice")
+            alice.set_generating(True)
+            order = []
+            async def job(name):
+                await alice.wait_idle()
+                alice.set_generating(True)
+                order.append(name)
+                await asyncio.sleep(0.01)
+                order.append(name)
+                alice.set_generating(False)
+            tasks = [asyncio.create_task(job(n)) for n in ("first", "second")]
+            await asyncio.sleep(0.01)
+            self.assertEqual(order, [])
+            alice.set_generating(False)
+            await asyncio.wait_for(asyncio.gather(*tasks), 1)
+            return order
+        order = asyncio.run(scenario())
+        self.assertEqual(len(order), 4)
+        self.assertEqual(order[0], order[1])
+        self.assertEqual(order[2], order[3])
+        self.assertTrue(self.manager.get("alice").idle.is_set())
+
+    def test_stream_events_sends_tokens_then_done(self):
+        async def scenario():
+            alice = self.manager.get_or_create("alice")
+            async def run():
+                for queue in alice.token_queues:
+                    queue.put_nowait(("token", {"agent_name": "casual", "delta": "Halo"}))
+                return {"done": "true", "answer": "Halo"}
+            events = [event async for event in alice.stream_events(run)]
+            return events, alice.token_queues
+        events, queues = asyncio.run(scenario())
+        self.assertEqual(events, [
+            'event: token\ndata: {"agent_name": "casual", "delta": "Halo"}\n\n',
+            'event: done\ndata: {"done": "true", "answer": "Halo"}\n\n',
+        ])
+        self.assertEqual(queues, [])
+
+    def test_stream_events_reports_errors_and_survives_disconnect(self):
+        async def scenario():
+            alice = self.manager.get_or_create("alice")
+            async def failing():
+                raise RuntimeError("boom")
+            events = [event async for event in alice.stream_events(failing)]
+            finished = asyncio.Event()
+            async def slow():
+                await asyncio.sleep(0.01)
+                finished.set()
+                return {"done": "true"}
+            stream = alice.stream_events(slow)
+            pending = asyncio.ensure_future(stream.__anext__())
+            await asyncio.sleep(0)
+            pending.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await pending
+            self.assertEqual(alice.token_queues, [])
+            await asyncio.wait_for(finished.wait(), 1)
+            return events
+        events = asyncio.run(scenario())
+        self.assertEqual(len(events), 1)
+        self.assertIn('"answer": "Error: boom"', events[0])
+
+if __name__ == '__main__':
+    unittest.main()
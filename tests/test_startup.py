@@ -0,0 +1,60 @@
+import unittest
+import os
+import sys
+import time
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.startup import StartupProfiler, LazyComponent
+
+class TestStartupProfiler(unittest.TestCase):
+    def setUp(self):
+        self.profiler = StartupProfiler()
+
+    def test_run_parallel(self):
+        def slow(value):
+            time.sleep(0.2)
+            return value
+        start = time.time()
+        results = self.profiler.run_parallel({"a": lambda: slow(1), "b": lambda: slow(2)})
+        self.assertLess(time.time() - start, 0.35)
+        self.assertEqual(results, {"a": 1, "b": 2})
+        status = self.profiler.get_status()
+        self.assertEqual(status["a"]["state"], "ready")
+        self.assertGreaterEqual(status["b"]["duration"], 0.2)
+        self.assertIn("total (wall)", self.profiler.report())
+
+    def test_failure_is_recorded(self):
+        def broken():
+            raise ValueError("no model")
+        with self.assertRaises(ValueError):
+            self.profiler.run_parallel({"ok": lambda: 1, "broken": broken})
+        status = self.profiler.get_status()
+        self.assertEqual(status["ok"]["state"], "ready")
+        self.assertEqual(status["broken"]["state"], "failed")
+        self.assertEqual(status["broken"]["error"], "no model")
+
+    def test_lazy_component_loads_once(self):
+        calls = []
+
+        class Thing:
+            value = 42
+
+        def factory():
+            calls.append(1)
+            time.sleep(0.05)
+            return Thing()
+
+        lazy = LazyComponent("thing", factory, self.profiler)
+        self.assertFalse(lazy.is_loaded)
+        self.assertEqual(self.profiler.get_status()["thing"], {"state": "pending", "lazy": True, "duration": None, "error": None})
+        threads = [threading.Thread(target=lambda: lazy.value) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(lazy.value, 42)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.profiler.get_status()["thing"]["state"], "ready")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.subscriptions import Subscription, SubscriptionIndex, parse_topics
+
+class TestSubscriptionIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SubscriptionIndex()
+        self.index.subscribe("a", Subscription(sessions={"s1"}))
+        self.index.subscribe("b", Subscription(sessions={"s2"}, types={"status"}, agents={"Coder"}))
+        self.index.subscribe("all", Subscription(sessions={"*", "s1"}))
+
+    def test_session_events_reach_only_interested_clients(self):
+        self.assertEqual(sorted(self.index.match({"type": "token", "session_id": "s1"})), ["a", "all"])
+        self.assertEqual(self.index.match({"type": "token", "session_id": "s2"}), ["all"])
+        self.assertEqual(sorted(self.index.match({"type": "status", "session_id": "s2", "agent_name": "Coder"})), ["all", "b"])
+        self.assertEqual(self.index.match({"type": "status", "session_id": "s2", "agent_name": "Browser"}), ["all"])
+
+    def test_workspace_events_filtered_by_type(self):
+        self.assertEqual(sorted(self.index.match({"type": "file_update"})), ["a", "all"])
+        self.assertEqual(sorted(self.index.match({"type": "status", "agent_name": "system"})), ["a", "all"])
+
+    def test_resubscribe_and_unsubscribe(self):
+        self.index.subscribe("a", Subscription(sessions={"s2"}))
+        self.assertEqual(self.index.match({"type": "token", "session_id": "s1"}), ["all"])
+        self.index.unsubscribe("all")
+        self.index.unsubscribe("missing")
+        self.assertEqual(self.index.match({"type": "token", "session_id": "s1"}), [])
+        self.assertNotIn("*", self.index.by_session)
+        self.assertEqual(parse_topics("a, b,"), {"a", "b"})
+        self.assertIsNone(parse_topics(""))
+
+if __name__ == '__main__':
+    unittest.main()
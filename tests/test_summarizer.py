@@ -0,0 +1,124 @@
+import unittest
+import os
+import sys
+import time
+import asyncio
+import threading
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.summarizer import Summarizer
+from sources.memory import Memory
+
+class FakeTokenizer:
+    def __call__(self, text, **kwargs):
+        return {'input_ids': FakeTensor(text)}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return ids
+
+class FakeTensor(str):
+    def to(self, device):
+        return self
+
+class FakeModel:
+    def __init__(self):
+        self.active = 0
+        self.overlapped = False
+
+    def generate(self, input_ids, **kwargs):
+        self.active += 1
+        self.overlapped |= self.active > 1
+        time.sleep(0.01)
+        self.active -= 1
+        return [input_ids[:kwargs["max_length"]]]
+
+class CountingSummarizer(Summarizer):
+    def __init__(self, fail=False):
+        super().__init__("fake-model")
+        self.loads = 0
+        self.fail = fail
+
+    def _load_model(self):
+        self.loads += 1
+        time.sleep(0.02)
+        if self.fail:
+            raise OSError("model not found")
+        return FakeTokenizer(), FakeModel(), "cpu"
+
+class TestSummarizer(unittest.TestCase):
+    def test_loads_once_across_threads(self):
+        summarizer = CountingSummarizer()
+        threads = [threading.Thread(target=summarizer.load) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(summarizer.loads, 1)
+        self.assertTrue(summarizer.get_stats()["loaded"])
+
+    def test_generation_is_serialized(self):
+        summarizer = CountingSummarizer()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(summarizer.generate("summarize: abcdef", 4, 1)))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, ["summ"] * 4)
+        self.assertFalse(summarizer.model.overlapped)
+        self.assertEqual(summarizer.get_stats()["calls"], 4)
+
+    def test_failed_load_is_not_retried(self):
+        summarizer = CountingSummarizer(fail=True)
+        self.assertFalse(summarizer.load())
+        self.assertIsNone(summarizer.generate("text", 4, 1))
+        self.assertEqual(summarizer.loads, 1)
+        self.assertIn("model not found", summarizer.get_stats()["error"])
+
+class GatedModel(FakeModel):
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+
+    def generate(self, input_ids, **kwargs):
+        self.gate.wait(5)
+        return super().generate(input_ids, **kwargs)
+
+class TestBackgroundCompression(unittest.TestCase):
+    def setUp(self):
+        self.summarizer = CountingSummarizer()
+        self.summarizer.load()
+        self.summarizer.model = GatedModel()
+        patcher = patch('sources.memory.summarizer', self.summarizer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.summarizer.model.gate.set)
+        self.memory = Memory("system", memory_compression=True, model_provider="llama-3.3-70b-versatile")
+
+    def test_get_serves_original_until_summary_is_ready(self):
+        long_text = "a" * 2000
+        self.memory.push('user', long_text)
+        self.memory.compress()
+        self.assertEqual(self.memory.get()[1]['content'], long_text)
+        self.assertEqual(len(self.memory.pending_compressions()), 1)
+        self.memory.compress()
+        self.assertEqual(self.summarizer.get_stats()["background"], 1)
+        self.assertFalse(self.memory.needs_compression())
+        self.assertFalse(self.memory.wait_for_compression(timeout=0.01))
+
+        self.summarizer.model.gate.set()
+        self.assertTrue(asyncio.run(self.memory.wait_for_compression_async(timeout=5)))
+        self.assertLess(len(self.memory.get()[1]['content']), len(long_text))
+        self.assertEqual(self.memory.pending_compressions(), [])
+
+    def test_rewritten_message_is_not_overwritten(self):
+        self.memory.push('user', "b" * 2000)
+        self.memory.compress()
+        self.memory.memory[1]['content'] = "edited"
+        self.summarizer.model.gate.set()
+        self.assertTrue(self.memory.wait_for_compression(timeout=5))
+        self.assertEqual(self.memory.get()[1]['content'], "edited")
+
+if __name__ == '__main__':
+    unittest.main()
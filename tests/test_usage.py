@@ -0,0 +1,69 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from types import SimpleNamespace
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.usage import UsageTracker, usage_scope, current_usage, note_usage
+from sources.rate_limiter import request_session
+
+HISTORY = [{'role': 'user', 'content': 'x' * 400}]
+
+class TestUsageTracker(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.tracker = UsageTracker(os.path.join(self.tmpdir, "usage.sqlite3"), flush_interval=0.01)
+
+    def tearDown(self):
+        self.tracker.flush()
+        shutil.rmtree(self.tmpdir)
+
+    def test_labels_come_from_scope_and_session(self):
+        token = request_session.set("s1")
+        try:
+            with usage_scope(agent_type="web", prompt="make_navigation_prompt", plan="p1"):
+                with usage_scope(plan_step=2):
+                    record = self.tracker.start("groq", "llama")
+        finally:
+            request_session.reset(token)
+        self.assertEqual((record.agent_type, record.prompt, record.plan, record.plan_step, record.session_id),
+                         ("web", "make_navigation_prompt", "p1", "2", "s1"))
+        self.assertEqual(self.tracker.start("groq", "llama").agent_type, "")
+
+    def test_reported_tokens_win_over_estimate(self):
+        record = self.tracker.start("groq", "llama")
+        token = current_usage.set(record)
+        note_usage(SimpleNamespace(prompt_tokens=120, completion_tokens=30))
+        current_usage.reset(token)
+        self.tracker.finish(record, HISTORY, "jawaban")
+        self.assertEqual((record.prompt_tokens, record.completion_tokens, record.estimated), (120, 30, False))
+        self.assertEqual(record.ttfb, record.latency)
+
+        estimated = self.tracker.finish(self.tracker.start("groq", "llama"), HISTORY, "y" * 40)
+        self.assertEqual((estimated.prompt_tokens, estimated.completion_tokens, estimated.estimated), (100, 10, True))
+
+    def test_cached_and_failed_calls(self):
+        cached = self.tracker.start("groq", "llama")
+        cached.cached = True
+        self.tracker.finish(cached, HISTORY, "jawaban")
+        self.assertEqual(cached.prompt_tokens, 0)
+        failed = self.tracker.finish(self.tracker.start("groq", "llama"), HISTORY, error=Exception("503"))
+        self.assertEqual(failed.outcome, "error")
+        totals = self.tracker.summary()[0]
+        self.assertEqual((totals["calls"], totals["cache_hits"], totals["errors"]), (2, 1, 1))
+
+    def test_summary_and_persisted_groups(self):
+        for agent, step in [("web", "1"), ("web", "2"), ("code", "2")]:
+            with usage_scope(agent_type=agent, plan="p1", plan_step=step):
+                self.tracker.finish(self.tracker.start("groq", "llama"), HISTORY, "z" * 40)
+        summary = self.tracker.summary()
+        self.assertEqual(summary[0]["agent_type"], "web")
+        self.assertEqual(summary[0]["calls"], 2)
+        groups = self.tracker.query(["plan_step", "bogus"])
+        self.assertEqual({g["plan_step"]: g["calls"] for g in groups}, {"1": 1, "2": 2})
+        self.assertEqual(self.tracker.query(["agent_type"], since=0)[0]["prompt_tokens"], 200)
+        self.assertEqual(self.tracker.get_stats()["persisted"], 3)
+
+if __name__ == '__main__':
+    unittest.main()
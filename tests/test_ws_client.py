@@ -0,0 +1,80 @@
+import unittest
+import os
+import sys
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.ws_client import ClientConnection
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.closed_with = None
+
+    async def send_text(self, text):
+        await self.gate.wait()
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+class TestClientConnection(unittest.TestCase):
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_drops_oldest_and_coalesces_when_slow(self):
+        async def scenario():
+            ws = FakeSocket()
+            ws.gate.clear()
+            client = ClientConnection(ws, "slow", max_queue=3)
+            client.start()
+            client.enqueue("a")
+            await asyncio.sleep(0.01)  # writer is now blocked sending "a"
+            client.enqueue("status-1", coalesce_key="status:x")
+            client.enqueue("b")
+            client.enqueue("status-2", coalesce_key="status:x")
+            client.enqueue("c")
+            client.enqueue("d")
+            ws.gate.set()
+            await asyncio.sleep(0.01)
+            client.close("client")
+            return ws, client
+        ws, client = self.run_async(scenario())
+        self.assertEqual(ws.sent, ["a", "b", "c", "d"])
+        self.assertEqual(client.stats["coalesced"], 1)
+        self.assertEqual(client.stats["dropped"], 1)
+        self.assertIsNone(ws.closed_with)
+
+    def test_disconnects_lagging_client(self):
+        closed = []
+        async def scenario():
+            ws = FakeSocket()
+            ws.gate.clear()
+            client = ClientConnection(ws, "lagging", max_lag=0.02, on_close=lambda c, reason: closed.append(reason))
+            client.start()
+            client.enqueue("a")
+            client.enqueue("b")
+            await asyncio.sleep(0.05)
+            self.assertFalse(client.enqueue("c"))
+            await asyncio.sleep(0.01)
+            return ws, client
+        ws, client = self.run_async(scenario())
+        self.assertEqual(closed, ["lagging"])
+        self.assertTrue(client.closed)
+        self.assertEqual(ws.closed_with, 1013)
+
+    def test_send_timeout_closes_client(self):
+        async def scenario():
+            ws = FakeSocket()
+            ws.gate.clear()
+            client = ClientConnection(ws, "dead", send_timeout=0.02)
+            client.start()
+            client.enqueue("a")
+            await asyncio.sleep(0.05)
+            return client
+        client = self.run_async(scenario())
+        self.assertEqual(client.close_reason, "send_timeout")
+
+if __name__ == '__main__':
+    unittest.main()
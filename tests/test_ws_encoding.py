@@ -0,0 +1,29 @@
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.ws_encoding import MSGPACK_FOUND, negotiate, encode, decode
+
+class TestWsEncoding(unittest.TestCase):
+    def test_json_is_default(self):
+        self.assertEqual(negotiate(), ("json", None))
+        self.assertEqual(negotiate("cbor"), ("json", None))
+        payload = encode({"type": "status", "status": "Selesai ✓"})
+        self.assertIsInstance(payload, str)
+        self.assertEqual(decode(payload)["status"], "Selesai ✓")
+
+    @unittest.skipIf(MSGPACK_FOUND, "msgpack installed")
+    def test_msgpack_falls_back_when_missing(self):
+        self.assertEqual(negotiate("msgpack"), ("json", None))
+        self.assertEqual(negotiate(None, ["agentic.msgpack"]), ("json", None))
+
+    @unittest.skipUnless(MSGPACK_FOUND, "msgpack not installed")
+    def test_msgpack_round_trip(self):
+        self.assertEqual(negotiate(None, ["other", "agentic.msgpack"]), ("msgpack", "agentic.msgpack"))
+        message = {"type": "execution", "result": "x" * 5000, "success": True}
+        payload = encode(message, "msgpack")
+        self.assertIsInstance(payload, bytes)
+        self.assertEqual(decode(payload, "msgpack"), message)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import os
+import io
+import sys
+import shutil
+import zipfile
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add project root to Python path
+from sources.zip_stream import ZipStreamWriter, ZipEntryCache
+
+class TestZipStream(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.files = {
+            "index.html": b"<html>" + b"hello " * 500 + b"</html>",
+            "css/style.css": b"body { color: red; }",
+            "img/logo.png": os.urandom(2048),
+            "data/big.bin": b"abc" * 200000,
+        }
+        for rel, data in self.files.items():
+            path = os.path.join(self.root, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def build(self, cache):
+        pairs = [(os.path.join(self.root, rel), rel) for rel in self.files]
+        pairs.append((os.path.join(self.root, "missing.txt"), "missing.txt"))
+        return b"".join(ZipStreamWriter(cache=cache, chunk_size=4096).stream(pairs))
+
+    def test_roundtrip(self):
+        cache = ZipEntryCache(max_entry_bytes=100 * 1024)
+        with zipfile.ZipFile(io.BytesIO(self.build(cache))) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(sorted(zf.namelist()), sorted(self.files))
+            for rel, data in self.files.items():
+                self.assertEqual(zf.read(rel), data)
+
+    def test_cache_reused_until_file_changes(self):
+        cache = ZipEntryCache(max_entry_bytes=100 * 1024)
+        first = self.build(cache)
+        self.assertEqual(cache.get_stats()["hits"], 0)
+        second = self.build(cache)
+        self.assertEqual(first, second)
+        self.assertEqual(cache.get_stats()["hits"], 3)
+        path = os.path.join(self.root, "css/style.css")
+        with open(path, "wb") as f:
+            f.write(b"body { color: blue; margin: 0; }")
+        os.utime(path, (1, 1))
+        self.files["css/style.css"] = b"body { color: blue; margin: 0; }"
+        with zipfile.ZipFile(io.BytesIO(self.build(cache))) as zf:
+            self.assertEqual(zf.read("css/style.css"), self.files["css/style.css"])
+        self.assertEqual(cache.get_stats()["entries"], 3)
+
+if __name__ == '__main__':
+    unittest.main()